@@ -0,0 +1,35 @@
+"""Add like_count to Tweets; create index for feed ordering
+
+Revision ID: 8b2e4f6a1c3d
+Revises: 3f1c9a7d2b4e
+Create Date: 2026-10-18 13:47:05.902316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b2e4f6a1c3d'
+down_revision: Union[str, None] = '3f1c9a7d2b4e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tweets', sa.Column('like_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        'UPDATE tweets SET like_count = ('
+        'SELECT count(*) FROM likes WHERE likes.tweet_id = tweets.tweet_id'
+        ')'
+    )
+    op.create_index('ix_tweets_user_id_like_count', 'tweets', ['user_id', sa.text('like_count DESC'), 'tweet_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tweets_user_id_like_count', table_name='tweets')
+    op.drop_column('tweets', 'like_count')
@@ -0,0 +1,46 @@
+"""Create table timelines; backfill from followers and own tweets
+
+Revision ID: c4d7a9e2f1b6
+Revises: 8b2e4f6a1c3d
+Create Date: 2026-10-18 15:21:43.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4d7a9e2f1b6'
+down_revision: Union[str, None] = '8b2e4f6a1c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('timelines',
+    sa.Column('owner_id', sa.Integer(), nullable=False),
+    sa.Column('tweet_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['tweet_id'], ['tweets.tweet_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('owner_id', 'tweet_id')
+    )
+    op.create_index(op.f('ix_timelines_tweet_id'), 'timelines', ['tweet_id'], unique=False)
+    # Ленты существующих пользователей заполняются
+    # по текущим подпискам и собственным твитам
+    op.execute(
+        'INSERT INTO timelines (owner_id, tweet_id) '
+        'SELECT user_id, tweet_id FROM tweets '
+        'UNION '
+        'SELECT followers_association.follower_id, tweets.tweet_id '
+        'FROM followers_association JOIN tweets '
+        'ON tweets.user_id = followers_association.following_id'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_timelines_tweet_id'), table_name='timelines')
+    op.drop_table('timelines')
@@ -0,0 +1,28 @@
+"""Add index on medias.media_path for content-addressed media references
+
+Revision ID: d5e8b1c3a7f9
+Revises: c4d7a9e2f1b6
+Create Date: 2026-10-18 16:44:12.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd5e8b1c3a7f9'
+down_revision: Union[str, None] = 'c4d7a9e2f1b6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_medias_media_path'), 'medias', ['media_path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_medias_media_path'), table_name='medias')
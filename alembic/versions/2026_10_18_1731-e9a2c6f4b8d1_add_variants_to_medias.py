@@ -0,0 +1,28 @@
+"""Add variants to Medias
+
+Revision ID: e9a2c6f4b8d1
+Revises: d5e8b1c3a7f9
+Create Date: 2026-10-18 17:31:27.004419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9a2c6f4b8d1'
+down_revision: Union[str, None] = 'd5e8b1c3a7f9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('medias', sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('medias', 'variants')
@@ -0,0 +1,35 @@
+"""Create table pending_deletions; add created_at to Medias
+
+Revision ID: f1b3d5a7c9e2
+Revises: e9a2c6f4b8d1
+Create Date: 2026-10-18 18:12:51.377920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b3d5a7c9e2'
+down_revision: Union[str, None] = 'e9a2c6f4b8d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('pending_deletions',
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('media_path', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.add_column('medias', sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('medias', 'created_at')
+    op.drop_table('pending_deletions')
@@ -0,0 +1,28 @@
+"""Add partial index on medias.created_at for orphan uploads
+
+Revision ID: a3c5e7f9b1d4
+Revises: f1b3d5a7c9e2
+Create Date: 2026-10-18 19:03:08.614522
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f9b1d4'
+down_revision: Union[str, None] = 'f1b3d5a7c9e2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_medias_orphans_created_at', 'medias', ['created_at'], unique=False, postgresql_where=sa.text('tweet_id IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_medias_orphans_created_at', table_name='medias', postgresql_where=sa.text('tweet_id IS NULL'))
@@ -0,0 +1,30 @@
+"""Add indexes on followers_association.following_id and medias.tweet_id
+
+Revision ID: b7d9f1a3c5e8
+Revises: a3c5e7f9b1d4
+Create Date: 2026-10-18 19:48:21.305617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d9f1a3c5e8'
+down_revision: Union[str, None] = 'a3c5e7f9b1d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_followers_association_following_id_follower_id', 'followers_association', ['following_id', 'follower_id'], unique=False)
+    op.create_index('ix_medias_tweet_id', 'medias', ['tweet_id'], unique=False, postgresql_where=sa.text('tweet_id IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_medias_tweet_id', table_name='medias', postgresql_where=sa.text('tweet_id IS NOT NULL'))
+    op.drop_index('ix_followers_association_following_id_follower_id', table_name='followers_association')
@@ -0,0 +1,37 @@
+"""Add fanned_out to Tweets
+
+Revision ID: c2e4a6b8d0f1
+Revises: b7d9f1a3c5e8
+Create Date: 2026-10-18 21:05:37.418206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c2e4a6b8d0f1'
+down_revision: Union[str, None] = 'b7d9f1a3c5e8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tweets', sa.Column('fanned_out', sa.Boolean(), server_default=sa.false(), nullable=False))
+    # Разосланными считаются твиты, которые уже лежат в лентах
+    # подписчиков (заполнены миграцией c4d7a9e2f1b6 или при записи);
+    # остальные будут добавляться в ленты при чтении
+    op.execute(
+        'UPDATE tweets SET fanned_out = true WHERE tweet_id IN ('
+        'SELECT timelines.tweet_id FROM timelines '
+        'WHERE timelines.owner_id != tweets.user_id'
+        ')'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tweets', 'fanned_out')
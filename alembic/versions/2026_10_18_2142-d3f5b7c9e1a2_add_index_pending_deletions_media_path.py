@@ -0,0 +1,28 @@
+"""Add index on pending_deletions.media_path for media re-uploads
+
+Revision ID: d3f5b7c9e1a2
+Revises: c2e4a6b8d0f1
+Create Date: 2026-10-18 21:42:09.117342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f5b7c9e1a2'
+down_revision: Union[str, None] = 'c2e4a6b8d0f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(op.f('ix_pending_deletions_media_path'), 'pending_deletions', ['media_path'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_pending_deletions_media_path'), table_name='pending_deletions')
@@ -0,0 +1,58 @@
+"""Resync timelines with current follows
+
+Revision ID: e5a7c9b1d3f6
+Revises: d3f5b7c9e1a2
+Create Date: 2026-10-18 22:19:26.503817
+
+До этой ревизии ленты обновлялись только при TIMELINE_ENABLED=true,
+поэтому подписки, отписки, твиты и их удаления, сделанные с
+выключенными лентами, в таблицу timelines не попали. Теперь ленты
+ведутся при записи всегда, а таблица один раз приводится
+к текущим подпискам и разосланным твитам (tweets.fanned_out).
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a7c9b1d3f6'
+down_revision: Union[str, None] = 'd3f5b7c9e1a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Твиты авторов, на которых пользователь больше не подписан
+    op.execute(
+        'DELETE FROM timelines WHERE NOT EXISTS ('
+        'SELECT 1 FROM tweets '
+        'WHERE tweets.tweet_id = timelines.tweet_id AND ('
+        'tweets.user_id = timelines.owner_id OR ('
+        'tweets.fanned_out AND EXISTS ('
+        'SELECT 1 FROM followers_association '
+        'WHERE followers_association.follower_id = timelines.owner_id '
+        'AND followers_association.following_id = tweets.user_id'
+        '))))'
+    )
+    # Собственные твиты и разосланные твиты авторов, на которых
+    # пользователь подписан, но которых ещё нет в его ленте
+    op.execute(
+        'INSERT INTO timelines (owner_id, tweet_id) '
+        'SELECT user_id, tweet_id FROM tweets '
+        'UNION '
+        'SELECT followers_association.follower_id, tweets.tweet_id '
+        'FROM followers_association JOIN tweets '
+        'ON tweets.user_id = followers_association.following_id '
+        'WHERE tweets.fanned_out '
+        'EXCEPT '
+        'SELECT owner_id, tweet_id FROM timelines'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    pass
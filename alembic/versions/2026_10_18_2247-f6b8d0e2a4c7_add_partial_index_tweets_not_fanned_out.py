@@ -0,0 +1,28 @@
+"""Add partial index on tweets.user_id for tweets not fanned out
+
+Revision ID: f6b8d0e2a4c7
+Revises: e5a7c9b1d3f6
+Create Date: 2026-10-18 22:47:51.209364
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6b8d0e2a4c7'
+down_revision: Union[str, None] = 'e5a7c9b1d3f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_tweets_user_id_not_fanned_out', 'tweets', ['user_id'], unique=False, postgresql_where=sa.text('fanned_out IS false'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tweets_user_id_not_fanned_out', table_name='tweets', postgresql_where=sa.text('fanned_out IS false'))
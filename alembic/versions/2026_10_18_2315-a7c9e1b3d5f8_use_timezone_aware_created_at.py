@@ -0,0 +1,46 @@
+"""Use timezone-aware created_at in medias and pending_deletions
+
+Revision ID: a7c9e1b3d5f8
+Revises: f6b8d0e2a4c7
+Create Date: 2026-10-18 23:15:04.731592
+
+Колонки created_at были TIMESTAMP без часового пояса с server_default
+now(): значение записывалось в часовом поясе сервера бд, а фоновая
+задача сравнивала его с временем в UTC (crud_medias.reclaim_orphan_medias).
+Теперь это TIMESTAMP WITH TIME ZONE - момент времени хранится
+однозначно. Уже записанные значения при приведении типа считаются
+временем в часовом поясе сессии (TimeZone), тем же, в котором
+их записал now().
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7c9e1b3d5f8'
+down_revision: Union[str, None] = 'f6b8d0e2a4c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table_name in ('medias', 'pending_deletions'):
+        op.alter_column(table_name, 'created_at',
+                   existing_type=sa.DateTime(),
+                   type_=sa.DateTime(timezone=True),
+                   existing_server_default=sa.text('now()'),
+                   existing_nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in ('medias', 'pending_deletions'):
+        op.alter_column(table_name, 'created_at',
+                   existing_type=sa.DateTime(timezone=True),
+                   type_=sa.DateTime(),
+                   existing_server_default=sa.text('now()'),
+                   existing_nullable=False)
@@ -0,0 +1,194 @@
+"""Бенчмарк запроса ленты твитов (crud_tweets.get_tweets)
+
+Сравнивает прежний запрос (joinedload лайков и медиа + GROUP BY по всей
+сущности Tweets) с текущим (сортировка по счётчику Tweets.like_count
+и пакетная подгрузка связанных данных только для одной страницы).
+
+Для каждого количества лайков на твит выводятся:
+- rows - суммарное количество строк, которые вернула база данных
+на все SQL-запросы, выполненные при получении страницы ленты
+- ms - медианное время получения страницы ленты
+
+В прежнем запросе количество строк растёт как
+твиты x лайки x медиа, в текущем - как твиты + лайки + медиа,
+т.е. только за счёт данных, которые действительно попадают в ответ.
+
+Запуск (из корня проекта, при наличии .env файла):
+    python -m benchmarks.bench_feed_query
+"""
+
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from sqlalchemy import desc, event, func, insert, select
+from sqlalchemy.orm import joinedload
+
+from server.api.crud import crud_tweets, crud_users
+from server.core.models import (
+    Base,
+    DatabaseHelper,
+    Likes,
+    Medias,
+    Tweets,
+    Users,
+    followers_association_table,
+)
+
+AUTHORS = 20
+TWEETS_PER_AUTHOR = 5
+MEDIAS_PER_TWEET = 3
+LIKES_PER_TWEET = (0, 10, 50, 200)
+PAGE_SIZE = 50
+REPEATS = 5
+
+
+async def legacy_get_tweets(session, current_user, offset, limit):
+    """Запрос ленты в том виде, в котором он был до оптимизации"""
+
+    following_ids = [user.id for user in current_user.following]
+    following_ids.append(current_user.id)
+
+    stmt = (
+        select(Tweets)
+        .filter(Tweets.user_id.in_(following_ids))
+        .options(
+            joinedload(Tweets.user),
+            joinedload(Tweets.likes).subqueryload(Likes.user),
+            joinedload(Tweets.medias),
+        )
+        .outerjoin(Tweets.likes)
+        .group_by(Tweets)
+        .order_by(desc(func.count(Tweets.likes)), Tweets.tweet_id)
+        .slice(offset, offset + limit)
+    )
+    db_response = await session.execute(stmt)
+    return list(db_response.unique().scalars().all())
+
+
+async def seed(db_helper: DatabaseHelper, likes_per_tweet: int) -> None:
+    """Заполнение базы: читатель подписан на AUTHORS авторов,
+    у каждого твита likes_per_tweet лайков и MEDIAS_PER_TWEET медиа
+    """
+
+    async with db_helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    users_count = 1 + AUTHORS + likes_per_tweet
+    users = [
+        {"id": idx, "name": f"user_{idx}", "api_key": f"key_{idx}"}
+        for idx in range(1, users_count + 1)
+    ]
+    follows = [
+        {"follower_id": 1, "following_id": author_id}
+        for author_id in range(2, AUTHORS + 2)
+    ]
+    tweets = [
+        {
+            "tweet_id": (author_id - 2) * TWEETS_PER_AUTHOR + number + 1,
+            "tweet_data": f"tweet {number} by {author_id}",
+            "user_id": author_id,
+            "like_count": likes_per_tweet,
+        }
+        for author_id in range(2, AUTHORS + 2)
+        for number in range(TWEETS_PER_AUTHOR)
+    ]
+    likes = [
+        {"tweet_id": tweet["tweet_id"], "user_id": user_id}
+        for tweet in tweets
+        for user_id in range(AUTHORS + 2, AUTHORS + 2 + likes_per_tweet)
+    ]
+    medias = [
+        {
+            "media_path": f"/medias/{tweet['tweet_id']}_{number}.jpg",
+            "tweet_id": tweet["tweet_id"],
+        }
+        for tweet in tweets
+        for number in range(MEDIAS_PER_TWEET)
+    ]
+
+    async with db_helper.session_factory() as session:
+        await session.execute(insert(Users), users)
+        await session.execute(insert(followers_association_table), follows)
+        await session.execute(insert(Tweets), tweets)
+        if likes:
+            await session.execute(insert(Likes), likes)
+        await session.execute(insert(Medias), medias)
+        await session.commit()
+
+
+async def measure(db_helper: DatabaseHelper, get_tweets) -> tuple[int, float]:
+    """Возвращает количество строк, полученных из базы данных,
+    и медианное время получения одной страницы ленты
+    """
+
+    statements: list[tuple[str, tuple]] = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    timings: list[float] = []
+    for _ in range(REPEATS):
+        statements.clear()
+        # Подписки читателя каждый раз запрашиваются из базы данных
+        crud_users.following_ids_cache.clear()
+        event.listen(
+            db_helper.engine.sync_engine, "before_cursor_execute", capture
+        )
+
+        async with db_helper.session_factory() as session:
+            reader: Users | None = await session.get(
+                Users, 1, options=[joinedload(Users.following)]
+            )
+            started = time.perf_counter()
+            tweets = await get_tweets(
+                session=session, current_user=reader, offset=0, limit=PAGE_SIZE
+            )
+            timings.append((time.perf_counter() - started) * 1000)
+
+        event.remove(
+            db_helper.engine.sync_engine, "before_cursor_execute", capture
+        )
+        assert len(tweets) == PAGE_SIZE
+
+    # Первый запрос - загрузка читателя, он не относится к ленте
+    rows = 0
+    async with db_helper.engine.connect() as conn:
+        for statement, parameters in statements[1:]:
+            db_response = await conn.exec_driver_sql(statement, parameters)
+            rows += len(db_response.fetchall())
+
+    return rows, statistics.median(timings)
+
+
+async def main() -> None:
+    print(
+        f"{'likes/tweet':>11} | {'legacy rows':>11} | {'legacy ms':>9} "
+        f"| {'rows':>6} | {'ms':>7}"
+    )
+
+    for likes_per_tweet in LIKES_PER_TWEET:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_helper = DatabaseHelper(
+                url=f"sqlite+aiosqlite:///{Path(tmp_dir) / 'bench.db'}"
+            )
+            await seed(db_helper=db_helper, likes_per_tweet=likes_per_tweet)
+
+            legacy_rows, legacy_ms = await measure(
+                db_helper=db_helper, get_tweets=legacy_get_tweets
+            )
+            rows, ms = await measure(
+                db_helper=db_helper, get_tweets=crud_tweets.get_tweets
+            )
+            await db_helper.engine.dispose()
+
+        print(
+            f"{likes_per_tweet:>11} | {legacy_rows:>11} | {legacy_ms:>9.2f} "
+            f"| {rows:>6} | {ms:>7.2f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+"""Бенчмарк сериализации страницы ленты (GET /api/tweets)
+
+Сравнивает сериализацию через схему TweetsRead (валидация каждого
+объекта Pydantic, field_validator медиа, алиасы, orjson) с быстрой
+сериализацией dump_tweets_read (словари из атрибутов объектов
+Tweets и orjson).
+
+Для каждого количества лайков на твит выводятся медианные времена
+сериализации одной страницы и их отношение. Перед замером
+проверяется, что оба способа дают одинаковые байты.
+
+Запуск (из корня проекта, при наличии .env файла):
+    python -m benchmarks.bench_feed_serialization
+"""
+
+import statistics
+import time
+
+import orjson
+
+from server.core.models import Likes, Medias, Tweets, Users
+from server.core.schemas.schemas_tweets import TweetsRead, dump_tweets_read
+
+MEDIAS_PER_TWEET = 3
+LIKES_PER_TWEET = (0, 10, 50, 200)
+PAGE_SIZE = 50
+REPEATS = 50
+
+
+def make_page(likes_per_tweet: int) -> list[Tweets]:
+    """Страница ленты из PAGE_SIZE твитов, без базы данных"""
+
+    likers = [
+        Users(id=idx, name=f"user_{idx}")
+        for idx in range(2, likes_per_tweet + 2)
+    ]
+    author = Users(id=1, name="author")
+
+    return [
+        Tweets(
+            tweet_id=tweet_id,
+            tweet_data=f"tweet {tweet_id}",
+            user=author,
+            likes=[Likes(user=liker) for liker in likers],
+            medias=[
+                Medias(
+                    media_path=f"/medias/{tweet_id}_{number}.jpg",
+                    variants={
+                        "webp": f"/medias/{tweet_id}_{number}_webp.webp",
+                        "w320": f"/medias/{tweet_id}_{number}_w320.webp",
+                    },
+                )
+                for number in range(MEDIAS_PER_TWEET)
+            ],
+        )
+        for tweet_id in range(1, PAGE_SIZE + 1)
+    ]
+
+
+def dump_with_schema(tweets: list[Tweets]) -> bytes:
+    """Сериализация через схему TweetsRead"""
+
+    page = TweetsRead.model_validate(
+        {"tweets": tweets, "next_cursor": None}, from_attributes=True
+    )
+    return orjson.dumps(page.model_dump(mode="json", by_alias=True))
+
+
+def dump_fast(tweets: list[Tweets]) -> bytes:
+    """Быстрая сериализация dump_tweets_read"""
+
+    return dump_tweets_read(tweets=tweets, next_cursor=None)
+
+
+def measure(dump, tweets: list[Tweets]) -> float:
+    """Медианное время сериализации страницы, мс"""
+
+    timings: list[float] = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        dump(tweets)
+        timings.append((time.perf_counter() - started) * 1000)
+
+    return statistics.median(timings)
+
+
+def main() -> None:
+    print(
+        f"{'likes/tweet':>11} | {'schema ms':>9} | {'fast ms':>7} "
+        f"| {'speedup':>7}"
+    )
+
+    for likes_per_tweet in LIKES_PER_TWEET:
+        tweets = make_page(likes_per_tweet=likes_per_tweet)
+        assert dump_with_schema(tweets) == dump_fast(tweets)
+
+        schema_ms = measure(dump_with_schema, tweets)
+        fast_ms = measure(dump_fast, tweets)
+
+        print(
+            f"{likes_per_tweet:>11} | {schema_ms:>9.2f} | {fast_ms:>7.2f} "
+            f"| {schema_ms / fast_ms:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
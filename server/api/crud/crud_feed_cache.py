@@ -0,0 +1,160 @@
+import hashlib
+import logging
+import time
+from typing import Iterable, NamedTuple
+
+from server.core.config import settings
+from server.utils.feed_cache import (
+    FeedCache,
+    MemoryFeedCache,
+    RedisFeedCache,
+    aioredis,
+)
+
+log = logging.getLogger(__name__)
+
+_memory_cache = MemoryFeedCache(
+    maxsize=settings.feed_cache.feed_cache_size,
+    ttl=settings.feed_cache.feed_cache_ttl,
+)
+_redis_cache: RedisFeedCache | None = None
+
+
+class ResourceVersion(NamedTuple):
+    """Версия страницы ленты или профиля
+
+    - value - хэш версий, ключ страницы в кэше и ETag
+    - fresh - версии увеличивались за последние
+    db_read_your_writes_window секунд: реплики могли ещё не получить
+    изменения, поэтому данные для этой версии читаются из основной бд
+    """
+
+    value: str
+    fresh: bool
+
+
+def feed_cache_enabled() -> bool:
+    """Включён ли кэш страниц ленты
+
+    Версии ведутся и при выключенном кэше - по ним вычисляются ETag.
+    """
+    return settings.feed_cache.feed_cache_enabled
+
+
+def get_feed_cache() -> FeedCache:
+    """Хранилище кэша, выбранное в настройках
+
+    Если выбран Redis, но пакет redis не установлен -
+    используется память процесса.
+    """
+
+    global _redis_cache
+
+    if settings.feed_cache.feed_cache_backend == "memory":
+        return _memory_cache
+
+    if aioredis is None:
+        log.warning("redis is not installed, feed cache is kept in memory")
+        return _memory_cache
+
+    if _redis_cache is None:
+        _redis_cache = RedisFeedCache(
+            url=settings.feed_cache.feed_cache_redis_url,
+            ttl=settings.feed_cache.feed_cache_ttl,
+        )
+    return _redis_cache
+
+
+async def _get_version(names: list[str], *params: object) -> ResourceVersion:
+    """Хэш эпохи хранилища, текущих версий names и параметров"""
+
+    feed_cache: FeedCache = get_feed_cache()
+    versions: list[int] = await feed_cache.get_versions(names)
+    changed_at: float = await feed_cache.get_changed_at(names)
+
+    version = hashlib.blake2b(digest_size=16)
+    version.update(f"{await feed_cache.get_epoch()};".encode())
+    for name, value in zip(names, versions):
+        version.update(f"{name}={value};".encode())
+    for param in params:
+        version.update(f"{param};".encode())
+
+    return ResourceVersion(
+        value=version.hexdigest(),
+        fresh=(
+            time.time() - changed_at < settings.db.db_read_your_writes_window
+        ),
+    )
+
+
+async def get_feed_version(
+    user_id: int,
+    author_ids: Iterable[int],
+    offset: int,
+    limit: int,
+    cursor: str | None,
+) -> ResourceVersion:
+    """Версия страницы ленты читателя user_id
+
+    Вычисляется из параметров пагинации и текущих версий подписок
+    читателя (меняется при подписке и отписке) и авторов ленты -
+    его самого и тех, на кого он подписан (меняются при создании
+    и удалении их твитов и лайков к ним). Используется как ключ
+    страницы в кэше и как ETag. Если версия свежая (fresh), страница
+    для неё читается из основной бд - иначе в кэш и ETag попала бы
+    страница с отстающей реплики под новой версией.
+
+    Используется в эндпоинте:
+    - GET /api/tweets - получить информацию о всех твитах
+    """
+
+    names: list[str] = [f"graph:{user_id}"]
+    names.extend(
+        f"author:{author_id}" for author_id in sorted({*author_ids, user_id})
+    )
+    return await _get_version(names, user_id, offset, limit, cursor or "")
+
+
+async def get_profile_version(user_id: int, compact: bool) -> ResourceVersion:
+    """Версия профиля пользователя (подписчики и подписки),
+    используется как ETag
+
+    Используется в эндпоинтах:
+    - GET /api/users/me - получить информацию о себе
+    - GET /api/users/{user_id} - получить информацию о пользователе
+    """
+
+    return await _get_version([f"graph:{user_id}"], user_id, compact)
+
+
+async def get_page(user_id: int, version: str) -> bytes | None:
+    """Сериализованная страница ленты из кэша"""
+    return await get_feed_cache().get(f"{user_id}:{version}")
+
+
+async def set_page(user_id: int, version: str, content: bytes) -> None:
+    """Сохранение сериализованной страницы ленты в кэш"""
+    await get_feed_cache().set(f"{user_id}:{version}", content)
+
+
+async def invalidate_authors(*author_ids: int) -> None:
+    """Устаревание страниц лент, в которые входят твиты авторов
+
+    Вызывается после фиксации изменений твитов и лайков.
+    """
+
+    await get_feed_cache().bump_versions(
+        f"author:{author_id}" for author_id in author_ids
+    )
+
+
+async def invalidate_graph(*user_ids: int) -> None:
+    """Устаревание профилей пользователей и страниц их лент
+
+    Вызывается после фиксации подписки и отписки - для обоих
+    пользователей.
+    """
+
+    await get_feed_cache().bump_versions(
+        f"graph:{user_id}" for user_id in user_ids
+    )
@@ -1,46 +1,278 @@
+from collections import Counter
+from typing import Any, Iterable, Literal
+
 from fastapi import HTTPException, status
-from sqlalchemy import Result, select
+from sqlalchemy import case, delete, exists, literal, select, tuple_, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.core.models import Likes, Tweets, Users
+from server.api.crud import crud_feed_cache
+from server.core.dependencies.principal import Principal
+from server.core.models import Likes, Tweets
+from server.core.schemas.schemas_likes import LikeAction
+from server.utils.upsert import insert_ignore
+
+LikeStatus = Literal["applied", "unchanged", "not_found"]
+
+
+async def _change_like_counts(
+    session: AsyncSession, deltas: dict[int, int]
+) -> list[int]:
+    """Изменение счётчиков лайков (Tweets.like_count) нескольких
+    твитов одним запросом UPDATE
+
+    Возвращает id авторов изменённых твитов.
+    """
+
+    if not deltas:
+        return []
+
+    delta = case(deltas, value=Tweets.tweet_id, else_=0)
+    stmt = (
+        update(Tweets)
+        .where(Tweets.tweet_id.in_(deltas))
+        .values(like_count=Tweets.like_count + delta)
+        .returning(Tweets.user_id)
+    )
+    return list((await session.scalars(stmt)).all())
+
+
+async def _insert_likes(
+    session: AsyncSession, user_id: int, tweet_ids: Iterable[int]
+) -> set[int]:
+    """Добавление лайков пользователя к существующим твитам
+    одним запросом INSERT ... ON CONFLICT DO NOTHING
+
+    Уже поставленные лайки и лайки к несуществующим твитам
+    пропускаются. Возвращает id твитов, к которым лайк добавлен.
+    """
+
+    stmt = (
+        insert_ignore(session, Likes)
+        .from_select(
+            ["tweet_id", "user_id"],
+            select(Tweets.tweet_id, literal(user_id)).where(
+                Tweets.tweet_id.in_(list(tweet_ids))
+            ),
+        )
+        .returning(Likes.tweet_id)
+    )
+    return set((await session.scalars(stmt)).all())
+
+
+async def _remove_likes(
+    session: AsyncSession, user_id: int, tweet_ids: Iterable[int]
+) -> set[int]:
+    """Удаление лайков пользователя одним запросом DELETE ... RETURNING
+
+    Возвращает id твитов, с которых лайк удалён.
+    """
+
+    stmt = (
+        delete(Likes)
+        .where(Likes.user_id == user_id, Likes.tweet_id.in_(list(tweet_ids)))
+        .returning(Likes.tweet_id)
+    )
+    return set((await session.scalars(stmt)).all())
 
 
 async def create_like(
-    session: AsyncSession, tweet_id: int, current_user: Users
+    session: AsyncSession, tweet_id: int, current_user: Principal
 ) -> None:
     """Добавляет лайк к твиту от текущего пользователя в таблице Likes
 
+    Лайк вставляется одним запросом без предварительной проверки
+    твита, повторный лайк ничего не меняет. В той же транзакции
+    увеличивается счётчик лайков твита (Tweets.like_count),
+    по которому сортируется лента.
+
+    Если лайк не вставлен и твита нет - возникает ошибка.
+
     Используется в эндпоинте:
     - POST /api/tweets/{tweet_id}/likes - создать лайк на твит
     """
 
-    tweet: Tweets | None = await session.get(Tweets, tweet_id)
-    if not tweet:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Tweet '{tweet_id}' not found!",
+    if not await _insert_likes(
+        session=session, user_id=current_user.id, tweet_ids=[tweet_id]
+    ):
+        tweet_exists: bool | None = await session.scalar(
+            select(exists().where(Tweets.tweet_id == tweet_id))
         )
+        if not tweet_exists:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Tweet '{tweet_id}' not found!",
+            )
+        return
 
-    new_like = Likes(tweet_id=tweet_id, user_id=current_user.id)
-
-    session.add(new_like)
+    author_ids: list[int] = await _change_like_counts(
+        session=session, deltas={tweet_id: 1}
+    )
     await session.commit()
+    await crud_feed_cache.invalidate_authors(*author_ids)
 
 
 async def delete_like(
-    session: AsyncSession, tweet_id: int, current_user: Users
+    session: AsyncSession, tweet_id: int, current_user: Principal
 ) -> None:
     """Удаляет лайк с твита от текущего пользователя в таблице Likes
 
+    Лайк удаляется одним запросом DELETE ... RETURNING, удаление
+    отсутствующего лайка ничего не меняет. В той же транзакции
+    уменьшается счётчик лайков твита (Tweets.like_count),
+    по которому сортируется лента.
+
     Используется в эндпоинте:
     - DELETE /api/tweets/{tweet_id}/likes - удалить лайк с твита
     """
 
-    stmt = select(Likes).where(
-        Likes.tweet_id == tweet_id, Likes.user_id == current_user.id
+    if not await _remove_likes(
+        session=session, user_id=current_user.id, tweet_ids=[tweet_id]
+    ):
+        return
+
+    author_ids: list[int] = await _change_like_counts(
+        session=session, deltas={tweet_id: -1}
+    )
+    await session.commit()
+    await crud_feed_cache.invalidate_authors(*author_ids)
+
+
+async def apply_like_actions(
+    session: AsyncSession, current_user: Principal, actions: list[LikeAction]
+) -> list[dict[str, Any]]:
+    """Применение пакета лайков и удалений лайков текущего пользователя
+
+    Для каждого твита применяется последнее действие из пакета
+    (так повторяются действия, накопленные клиентом офлайн).
+    Независимо от размера пакета выполняется не больше четырёх
+    запросов: выборка твитов, INSERT лайков, DELETE лайков
+    и UPDATE счётчиков - в одной транзакции.
+
+    Возвращает для каждого твита (в порядке первого упоминания)
+    итоговое действие и результат (status): applied - изменено,
+    unchanged - уже было в нужном состоянии, not_found - твита нет.
+
+    Используется в эндпоинте:
+    - POST /api/tweets/likes/batch - применить пакет лайков
+    """
+
+    final_actions: dict[int, str] = {}
+    for like_action in actions:
+        final_actions[like_action.tweet_id] = like_action.action
+
+    existing_ids: set[int] = set(
+        (
+            await session.scalars(
+                select(Tweets.tweet_id).where(
+                    Tweets.tweet_id.in_(list(final_actions))
+                )
+            )
+        ).all()
     )
-    db_response: Result = await session.execute(stmt)
-    like: Likes | None = db_response.scalar_one_or_none()
+    like_ids: list[int] = [
+        tweet_id
+        for tweet_id, action in final_actions.items()
+        if action == "like" and tweet_id in existing_ids
+    ]
+    unlike_ids: list[int] = [
+        tweet_id
+        for tweet_id, action in final_actions.items()
+        if action == "unlike" and tweet_id in existing_ids
+    ]
+
+    liked: set[int] = set()
+    if like_ids:
+        liked = await _insert_likes(
+            session=session, user_id=current_user.id, tweet_ids=like_ids
+        )
+    unliked: set[int] = set()
+    if unlike_ids:
+        unliked = await _remove_likes(
+            session=session, user_id=current_user.id, tweet_ids=unlike_ids
+        )
+
+    deltas: dict[int, int] = {tweet_id: 1 for tweet_id in liked}
+    deltas.update({tweet_id: -1 for tweet_id in unliked})
+    author_ids: list[int] = await _change_like_counts(
+        session=session, deltas=deltas
+    )
+    await session.commit()
+    if author_ids:
+        await crud_feed_cache.invalidate_authors(*set(author_ids))
 
-    await session.delete(like)
+    results: list[dict[str, Any]] = []
+    for tweet_id, action in final_actions.items():
+        like_status: LikeStatus = "unchanged"
+        if tweet_id not in existing_ids:
+            like_status = "not_found"
+        elif tweet_id in deltas:
+            like_status = "applied"
+        results.append(
+            {"tweet_id": tweet_id, "action": action, "status": like_status}
+        )
+
+    return results
+
+
+async def apply_like_events(
+    session: AsyncSession, events: dict[tuple[int, int], str]
+) -> None:
+    """Запись пачки событий лайков разных пользователей
+    из буфера отложенной записи
+
+    events - последнее действие (like или unlike) для каждой пары
+    (tweet_id, user_id). Независимо от размера пачки выполняется
+    не больше четырёх запросов: выборка существующих твитов,
+    INSERT лайков, DELETE лайков и UPDATE счётчиков -
+    в одной транзакции. События к несуществующим твитам
+    отбрасываются, повторная запись пачки ничего не меняет.
+
+    Используется в буфере лайков (server/utils/like_buffer.py).
+    """
+
+    like_pairs: list[tuple[int, int]] = [
+        pair for pair, action in events.items() if action == "like"
+    ]
+    unlike_pairs: list[tuple[int, int]] = [
+        pair for pair, action in events.items() if action == "unlike"
+    ]
+    deltas: Counter[int] = Counter()
+
+    if like_pairs:
+        existing_ids: set[int] = set(
+            (
+                await session.scalars(
+                    select(Tweets.tweet_id).where(
+                        Tweets.tweet_id.in_({pair[0] for pair in like_pairs})
+                    )
+                )
+            ).all()
+        )
+        rows: list[dict[str, int]] = [
+            {"tweet_id": tweet_id, "user_id": user_id}
+            for tweet_id, user_id in like_pairs
+            if tweet_id in existing_ids
+        ]
+        if rows:
+            stmt = insert_ignore(session, Likes).values(rows)
+            deltas.update(
+                (await session.scalars(stmt.returning(Likes.tweet_id))).all()
+            )
+
+    if unlike_pairs:
+        stmt = (
+            delete(Likes)
+            .where(tuple_(Likes.tweet_id, Likes.user_id).in_(unlike_pairs))
+            .returning(Likes.tweet_id)
+        )
+        deltas.subtract((await session.scalars(stmt)).all())
+
+    author_ids: list[int] = await _change_like_counts(
+        session=session,
+        deltas={
+            tweet_id: delta for tweet_id, delta in deltas.items() if delta
+        },
+    )
     await session.commit()
+    if author_ids:
+        await crud_feed_cache.invalidate_authors(*set(author_ids))
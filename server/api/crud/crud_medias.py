@@ -1,10 +1,19 @@
+import asyncio
+from datetime import UTC, datetime, timedelta
 from pathlib import Path
+from typing import Iterable, Sequence
 
 from fastapi import UploadFile
-from sqlalchemy import update
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.core.models import Medias, Tweets
+from server.core.metrics import (
+    MEDIA_BYTES_RECLAIMED,
+    MEDIA_FILES_DELETED,
+    MEDIA_ORPHANS_RECLAIMED,
+)
+from server.core.models import Medias, PendingDeletions, Tweets
+from server.utils.media_variants import get_variant_paths
 from server.utils.media_writer import save_media
 
 
@@ -16,11 +25,22 @@ async def create_media(session: AsyncSession, file: UploadFile) -> Medias:
     пути до медиа-файла (media_path) на сервере, чтобы в дальнейшем
     при get-запросах подгрузить те самые медиа-файлы, зная их путь.
 
+    Путь до медиа-файла определяется его содержимым, поэтому при
+    повторной загрузке того же файла новая запись ссылается
+    на уже сохранённый файл.
+
+    Перед записью файла путь захватывается в транзакции создания
+    записи (_claim_media_path), поэтому фоновая задача не удалит
+    файл, пока запись не зафиксирована.
+
     Используется в эндпоинте:
     - POST /api/medias - загрузить медиа-файлы
     """
 
-    file_path: Path | None = await save_media(file=file)
+    async def claim(file_path: Path) -> None:
+        await _claim_media_path(session=session, media_path=str(file_path))
+
+    file_path: Path | None = await save_media(file=file, before_replace=claim)
     new_media = Medias(media_path=str(file_path))
     session.add(new_media)
     await session.commit()
@@ -34,6 +54,9 @@ async def update_media(
     """Обновление записи в таблице Medias - привязка медиа-файлов
     к твитам через колонку tweet_id в таблице Medias
 
+    Изменения не фиксируются: они сохраняются в одной транзакции
+    с созданием твита.
+
     Используется в crud-методе по созданию твита - create_tweet
     """
 
@@ -44,4 +67,158 @@ async def update_media(
     )
 
     await session.execute(stmt)
+
+
+async def enqueue_media_deletions(
+    session: AsyncSession, media_paths: Iterable[str]
+) -> None:
+    """Постановка медиа-файлов в очередь на удаление - таблицу
+    PendingDeletions
+
+    Вызывается в той же транзакции, что и удаление записей Medias,
+    сами файлы удаляет фоновая задача (sweep_pending_deletions).
+
+    Используется в crud-методе по удалению твита - delete_tweet
+    """
+
+    values = [{"media_path": media_path} for media_path in set(media_paths)]
+    if values:
+        await session.execute(insert(PendingDeletions), values)
+
+
+async def _claim_media_path(session: AsyncSession, media_path: str) -> None:
+    """Захват пути медиа-файла перед его повторной записью
+
+    1. Блокировка записей Medias с этим путём: удаление твита
+    с тем же файлом дождётся фиксации новой записи и не поставит
+    файл в очередь, пока на него ссылается загружаемое медиа
+    2. Удаление пути из очереди PendingDeletions: если фоновая задача
+    уже удаляет файл (держит блокировку строки очереди), удаление
+    строки дождётся фиксации её транзакции - файл будет записан
+    заново уже после удаления; иначе удаление файла отменяется
+
+    Используется в create_media
+    """
+
+    await session.execute(
+        select(Medias.media_id)
+        .where(Medias.media_path == media_path)
+        .with_for_update()
+    )
+    await session.execute(
+        delete(PendingDeletions).where(
+            PendingDeletions.media_path == media_path
+        )
+    )
+
+
+def _delete_media_files(file_path: Path) -> int:
+    """Удаление медиа-файла и его копий (блокирующая функция)
+
+    Возвращает количество освобождённых байт.
+    """
+
+    reclaimed_bytes = 0
+    for path in [*get_variant_paths(file_path), file_path]:
+        try:
+            reclaimed_bytes += path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            continue
+
+    return reclaimed_bytes
+
+
+async def sweep_pending_deletions(
+    session: AsyncSession, batch_size: int
+) -> int:
+    """Удаление с диска пачки медиа-файлов из очереди PendingDeletions
+
+    Файл, на который всё ещё ссылается запись в таблице Medias
+    (то же содержимое загружено повторно), не удаляется.
+    Проверка ссылок и удаление файла выполняются под блокировкой
+    строк очереди: загрузка того же содержимого (create_media)
+    захватывает эти строки и записывает файл только после
+    фиксации этой транзакции.
+    Файлы удаляются в отдельном потоке, не блокируя event loop.
+
+    Возвращает количество обработанных записей очереди.
+
+    Используется в фоновой задаче utils/media_sweeper.py
+    """
+
+    stmt = (
+        select(PendingDeletions)
+        .order_by(PendingDeletions.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    pending: Sequence[PendingDeletions] = (await session.scalars(stmt)).all()
+    if not pending:
+        return 0
+
+    media_paths: set[str] = {item.media_path for item in pending}
+    stmt_referenced = select(Medias.media_path).where(
+        Medias.media_path.in_(media_paths)
+    )
+    referenced_paths = set((await session.scalars(stmt_referenced)).all())
+
+    for media_path in media_paths - referenced_paths:
+        reclaimed_bytes: int = await asyncio.to_thread(
+            _delete_media_files, Path(media_path)
+        )
+        MEDIA_FILES_DELETED.inc()
+        MEDIA_BYTES_RECLAIMED.inc(reclaimed_bytes)
+
+    await session.execute(
+        delete(PendingDeletions).where(
+            PendingDeletions.id.in_([item.id for item in pending])
+        )
+    )
+    await session.commit()
+
+    return len(pending)
+
+
+async def reclaim_orphan_medias(
+    session: AsyncSession, grace_period: float, batch_size: int
+) -> int:
+    """Удаление медиа, которые были загружены, но так и не привязаны
+    к твиту дольше grace_period секунд
+
+    Записи выбираются по частичному индексу ix_medias_orphans_created_at
+    не больше batch_size за раз, удаляются из таблицы Medias,
+    а их файлы ставятся в очередь на удаление. Медиа, привязанное
+    к твиту между выборкой и удалением, не удаляется.
+
+    Возвращает количество удалённых записей.
+
+    Используется в фоновой задаче utils/media_sweeper.py
+    """
+
+    created_before: datetime = datetime.now(UTC) - timedelta(
+        seconds=grace_period
+    )
+
+    stmt = (
+        select(Medias.media_id)
+        .where(Medias.tweet_id.is_(None), Medias.created_at < created_before)
+        .order_by(Medias.created_at)
+        .limit(batch_size)
+    )
+    media_ids: Sequence[int] = (await session.scalars(stmt)).all()
+    if not media_ids:
+        return 0
+
+    stmt_delete = (
+        delete(Medias)
+        .where(Medias.media_id.in_(media_ids), Medias.tweet_id.is_(None))
+        .returning(Medias.media_path)
+    )
+    media_paths: Sequence[str] = (await session.scalars(stmt_delete)).all()
+
+    await enqueue_media_deletions(session=session, media_paths=media_paths)
     await session.commit()
+    MEDIA_ORPHANS_RECLAIMED.inc(len(media_paths))
+
+    return len(media_paths)
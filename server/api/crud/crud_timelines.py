@@ -0,0 +1,176 @@
+from typing import Iterable, Sequence
+
+from sqlalchemy import ColumnElement, and_, exists, literal, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.core.config import settings
+from server.core.models import Tweets, followers_association_table
+from server.utils.timeline_store import (
+    DbTimelineStore,
+    MemoryTimelineStore,
+    TimelineStore,
+)
+
+_stores: dict[str, TimelineStore] = {
+    "db": DbTimelineStore(),
+    "memory": MemoryTimelineStore(),
+}
+
+
+def timelines_enabled() -> bool:
+    """Читается ли лента из материализованных лент
+
+    Ленты ведутся при записи независимо от этой настройки,
+    поэтому её можно включать и выключать в любой момент.
+    """
+    return settings.timeline.timeline_enabled
+
+
+def get_timeline_store() -> TimelineStore:
+    """Хранилище лент, выбранное в настройках, из которого
+    читается лента
+    """
+    return _stores[settings.timeline.timeline_store]
+
+
+def _get_write_stores() -> Iterable[TimelineStore]:
+    """Хранилища лент, в которых ведутся изменения лент
+
+    Изменения записываются во все хранилища, а не только
+    в выбранное: таблица timelines остаётся актуальной при смене
+    timeline_store, а лента в памяти обновляет только уже
+    загруженные ленты и без них ничего не делает.
+    """
+    return _stores.values()
+
+
+def fans_out(author_id: int) -> ColumnElement[bool]:
+    """Условие рассылки нового твита автора в ленты подписчиков
+    при записи (fan-out-on-write)
+
+    Твиты авторов, у которых больше подписчиков, чем
+    timeline_fanout_max_followers, не рассылаются - подписчики
+    получают их при чтении ленты. Условие вычисляется в самом
+    INSERT твита (подписчики перебираются по индексу не дальше
+    timeline_fanout_max_followers + 1), а решение сохраняется в твите
+    (Tweets.fanned_out), поэтому изменение количества подписчиков
+    после публикации не влияет на то, как твит попадает в ленты.
+
+    Используется в crud_tweets.create_tweet
+    """
+
+    # Подписчиков больше max_followers, если существует
+    # подписчик с номером max_followers + 1
+    extra_followers = (
+        select(literal(1))
+        .where(followers_association_table.c.following_id == author_id)
+        .offset(settings.timeline.timeline_fanout_max_followers)
+    )
+    return ~exists(extra_followers)
+
+
+async def push_tweet(session: AsyncSession, tweet: Tweets) -> None:
+    """Рассылка нового твита в ленты (fan-out-on-write)
+
+    Твит всегда попадает в ленту самого автора, а в ленты
+    подписчиков - только если он помечен разосланным (см. fans_out).
+
+    Используется в crud_tweets.create_tweet
+    """
+
+    for store in _get_write_stores():
+        await store.push(session=session, tweet=tweet)
+
+
+async def remove_tweet(session: AsyncSession, tweet_id: int) -> None:
+    """Удаление твита из всех лент
+
+    Используется в crud_tweets.delete_tweet
+    """
+
+    for store in _get_write_stores():
+        await store.remove_tweet(session=session, tweet_id=tweet_id)
+
+
+async def follow(session: AsyncSession, owner_id: int, author_id: int) -> None:
+    """Добавление твитов автора в ленту нового подписчика
+
+    Используется в crud_users.create_follow
+    """
+
+    for store in _get_write_stores():
+        await store.add_author(
+            session=session, owner_id=owner_id, author_id=author_id
+        )
+
+
+async def unfollow(
+    session: AsyncSession, owner_id: int, author_id: int
+) -> None:
+    """Удаление твитов автора из ленты бывшего подписчика
+
+    Используется в crud_users.delete_follow
+    """
+
+    for store in _get_write_stores():
+        await store.remove_author(
+            session=session, owner_id=owner_id, author_id=author_id
+        )
+
+
+async def get_pull_author_ids(
+    session: AsyncSession, following_ids: Sequence[int]
+) -> list[int]:
+    """Авторы из following_ids, у которых есть неразосланные твиты
+    (Tweets.fanned_out) - они добавляются в ленту при чтении
+
+    Выбираются по частичному индексу ix_tweets_user_id_not_fanned_out,
+    в который входят только неразосланные твиты.
+    """
+
+    if not following_ids:
+        return []
+
+    stmt = (
+        select(Tweets.user_id)
+        .where(
+            Tweets.fanned_out.is_(False),
+            Tweets.user_id.in_(following_ids),
+        )
+        .distinct()
+    )
+    return list((await session.scalars(stmt)).all())
+
+
+async def timeline_filter(
+    session: AsyncSession, owner_id: int, following_ids: Sequence[int]
+) -> ColumnElement[bool]:
+    """Условие выборки твитов ленты пользователя
+
+    Собственные и разосланные твиты лежат в материализованной ленте.
+    Если все авторы, на которых подписан пользователь, разосланы
+    целиком, лента читается только по ней - одним диапазоном
+    индекса. Иначе она дополняется неразосланными твитами только
+    тех авторов, у которых они есть (fan-out-on-read). Список
+    подписок following_ids берётся из кэша
+    (crud_users.get_following_ids).
+
+    Используется в crud_tweets.get_tweets
+    """
+
+    stored = await get_timeline_store().tweet_filter(
+        session=session, owner_id=owner_id
+    )
+    pull_author_ids: list[int] = await get_pull_author_ids(
+        session=session, following_ids=following_ids
+    )
+    if not pull_author_ids:
+        return stored
+
+    return or_(
+        stored,
+        and_(
+            Tweets.fanned_out.is_(False),
+            Tweets.user_id.in_(pull_author_ids),
+        ),
+    )
@@ -1,19 +1,23 @@
-from pathlib import Path
 from typing import Sequence
 
 from fastapi import HTTPException, status
-from sqlalchemy import Result, desc, func, select
+from sqlalchemy import Result, and_, desc, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
-
-from server.api.crud import crud_medias
-from server.core.models import Likes, Tweets, Users
+from sqlalchemy.orm import joinedload, selectinload
+
+from server.api.crud import (
+    crud_feed_cache,
+    crud_medias,
+    crud_timelines,
+    crud_users,
+)
+from server.core.dependencies.principal import Principal
+from server.core.models import Likes, Tweets
 from server.core.schemas.schemas_tweets import TweetCreate
-from server.utils.media_writer import delete_media
 
 
 async def create_tweet(
-    session: AsyncSession, user: Users, tweet_in: TweetCreate
+    session: AsyncSession, user: Principal, tweet_in: TweetCreate
 ) -> Tweets:
     """Создание нового твита в таблице Tweets
 
@@ -26,26 +30,34 @@ async def create_tweet(
     - POST /api/tweets - создать твит
     """
 
-    new_tweet = Tweets(tweet_data=tweet_in.tweet_data, user_id=user.id)
+    new_tweet = Tweets(
+        tweet_data=tweet_in.tweet_data,
+        user_id=user.id,
+        fanned_out=crud_timelines.fans_out(author_id=user.id),
+    )
     session.add(new_tweet)
+    await session.flush()
 
     if tweet_in.tweet_media_ids:
-        await session.flush()
         await crud_medias.update_media(
             session=session,
             tweet=new_tweet,
             tweet_media_ids=tweet_in.tweet_media_ids,
         )
 
+    await crud_timelines.push_tweet(session=session, tweet=new_tweet)
+
     await session.commit()
+    await crud_feed_cache.invalidate_authors(user.id)
     return new_tweet
 
 
 async def get_tweets(
     session: AsyncSession,
-    current_user: Users,
+    current_user: Principal,
     offset: int,
     limit: int,
+    cursor: tuple[int, ...] | None = None,
 ) -> list[Tweets | None]:
     """Получение списка всех твитов из таблицы Tweets
 
@@ -53,60 +65,95 @@ async def get_tweets(
     отсортированных в порядке убывания по популярности
     от пользователей, на которых он подписан
 
+    Если передан курсор (like_count, tweet_id) последнего твита
+    предыдущей страницы, то вместо offset используется keyset-пагинация:
+    выбираются limit твитов, следующих за курсором в порядке сортировки.
+
+    Если включены материализованные ленты, то твиты выбираются
+    по ленте пользователя (см. crud_timelines) вместо списка подписок.
+
     Используется в эндпоинте:
     - GET /api/tweets - получить информации о всех твитах
     """
 
-    following_ids: list[int] = [user.id for user in current_user.following]
-    following_ids.append(current_user.id)
-
-    # Логика пагинации:
-    #
-    # Если пользователь включил пагинацию на сайте,
-    # то есть передал Query-параметры offset и limit:
-    # - start - начало диапазона выборки = (номер_стр - 1) * размер_стр
-    # - stop - конец диапазона выборки = (номер_стр * размер_стр)
-    #
-    # Пример для offset=2, limit=10:
-    # - start = (2 - 1) * 10 = 10 (получим элементы массива с индекса 10)
-    # - stop = 2 * 10 = 20 (по индекс 20)
-    #
-    # В данном случае start и stop это индексы элементов из массива
-    # с выдачей твитов, пример (аналогия): tweets_massive[start:stop]
-    if offset != 0:
-        start = (offset - 1) * limit
-        stop = offset * limit
-
-    # Если пагинация не используется (Query-параметры offset и limit
-    # не переданы), то по умолчанию в эту функцию передаются
-    # offset=0 и limit=50, то есть из бд получим
-    # первые 50 твитов (start=0, stop=50)
+    following_ids: tuple[int, ...] = await crud_users.get_following_ids(
+        session=session, user_id=current_user.id
+    )
+    if crud_timelines.timelines_enabled():
+        feed_filter = await crud_timelines.timeline_filter(
+            session=session,
+            owner_id=current_user.id,
+            following_ids=following_ids,
+        )
     else:
-        start = offset
-        stop = limit
+        feed_filter = Tweets.user_id.in_((*following_ids, current_user.id))
 
+    # Твиты сортируются по денормализованному счётчику лайков
+    # (индекс ix_tweets_user_id_like_count), а авторы, лайки и медиа
+    # подгружаются отдельными запросами только для твитов текущей
+    # страницы - поэтому LIMIT/OFFSET применяются именно к твитам
     stmt = (
         select(Tweets)
-        .filter(Tweets.user_id.in_(following_ids))
+        .filter(feed_filter)
         .options(
-            joinedload(Tweets.user),
-            joinedload(Tweets.likes).subqueryload(Likes.user),
-            joinedload(Tweets.medias),
+            selectinload(Tweets.user),
+            selectinload(Tweets.likes).joinedload(Likes.user),
+            selectinload(Tweets.medias),
         )
-        .outerjoin(Tweets.likes)
-        .group_by(Tweets)
-        .order_by(desc(func.count(Tweets.likes)), Tweets.tweet_id)
-        .slice(start, stop)
+        .order_by(desc(Tweets.like_count), Tweets.tweet_id)
     )
 
+    if cursor:
+        # Keyset-пагинация: стоимость запроса не зависит от глубины
+        # страницы, а новые твиты и лайки у уже показанных твитов
+        # не сдвигают следующие страницы, как это происходит с offset
+        cursor_like_count, cursor_tweet_id = cursor
+        stmt = stmt.filter(
+            or_(
+                Tweets.like_count < cursor_like_count,
+                and_(
+                    Tweets.like_count == cursor_like_count,
+                    Tweets.tweet_id > cursor_tweet_id,
+                ),
+            )
+        ).limit(limit)
+
+    else:
+        # Логика пагинации:
+        #
+        # Если пользователь включил пагинацию на сайте,
+        # то есть передал Query-параметры offset и limit:
+        # - start - начало диапазона выборки = (номер_стр - 1) * размер_стр
+        # - stop - конец диапазона выборки = (номер_стр * размер_стр)
+        #
+        # Пример для offset=2, limit=10:
+        # - start = (2 - 1) * 10 = 10 (получим элементы массива с индекса 10)
+        # - stop = 2 * 10 = 20 (по индекс 20)
+        #
+        # В данном случае start и stop это индексы элементов из массива
+        # с выдачей твитов, пример (аналогия): tweets_massive[start:stop]
+        if offset != 0:
+            start = (offset - 1) * limit
+            stop = offset * limit
+
+        # Если пагинация не используется (Query-параметры offset и limit
+        # не переданы), то по умолчанию в эту функцию передаются
+        # offset=0 и limit=50, то есть из бд получим
+        # первые 50 твитов (start=0, stop=50)
+        else:
+            start = offset
+            stop = limit
+
+        stmt = stmt.offset(start).limit(stop - start)
+
     db_response: Result = await session.execute(stmt)
-    tweets: Sequence[Tweets] = db_response.unique().scalars().all()
+    tweets: Sequence[Tweets] = db_response.scalars().all()
 
     return list(tweets)
 
 
 async def delete_tweet(
-    session: AsyncSession, tweet_id: int, current_user: Users
+    session: AsyncSession, tweet_id: int, current_user: Principal
 ) -> None:
     """Удаление твита из таблицы Tweets
 
@@ -120,8 +167,9 @@ async def delete_tweet(
     возвращается сообщение об ошибке.
 
     Применяется каскадное удаление записей из дочерних таблиц,
-    связанных с конкретным твитом. Также удаляются и медиа-файлы
-    из директории хранения на сервере.
+    связанных с конкретным твитом. Медиа-файлы ставятся в очередь
+    на удаление в той же транзакции и удаляются с диска фоновой
+    задачей, если на них не ссылаются медиа других твитов.
 
     Используется в эндпоинте:
     - DELETE /api/tweets/{tweet_id} - удалить твит
@@ -149,10 +197,11 @@ async def delete_tweet(
             f"to delete the tweet '{tweet_id}'!",
         )
 
-    if tweet.medias:
-        for media in tweet.medias:
-            media_path = Path(media.media_path)
-            await delete_media(file_path=media_path)
-
+    await crud_medias.enqueue_media_deletions(
+        session=session,
+        media_paths=[media.media_path for media in tweet.medias],
+    )
+    await crud_timelines.remove_tweet(session=session, tweet_id=tweet_id)
     await session.delete(tweet)
     await session.commit()
+    await crud_feed_cache.invalidate_authors(current_user.id)
@@ -1,20 +1,104 @@
+import asyncio
+from typing import Any, Literal, Sequence
+
 from fastapi import HTTPException, status
-from sqlalchemy import Result, delete, insert, select
+from sqlalchemy import Column, Result, delete, func, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import selectinload
 
+from server.api.crud import crud_feed_cache, crud_timelines
+from server.core.config import settings
+from server.core.dependencies.principal import Principal
 from server.core.models import Users, followers_association_table
-from server.utils.hashed_api_key import validate_api_key
+from server.core.schemas.schemas_users import FollowAction
+from server.utils.hashed_api_key import (
+    digest_api_key,
+    validate_api_key_async,
+)
+from server.utils.ttl_cache import TTLCache
+from server.utils.upsert import insert_ignore
+
+FollowStatus = Literal["applied", "unchanged", "not_found"]
+
+# Перебор bcrypt-хэшей пользователей без дайджеста выполняется
+# по одному за раз, чтобы поток неизвестных api_key не занимал
+# все воркеры хэширования
+_legacy_scan_lock = asyncio.Lock()
+
+# Кэш подписок: id пользователя -> id пользователей, на которых он подписан
+following_ids_cache: TTLCache[int, tuple[int, ...]] = TTLCache(
+    name="following_ids",
+    maxsize=settings.timeline.following_cache_size,
+    ttl=settings.timeline.following_cache_ttl,
+)
+
+
+async def find_user_by_api_key(
+    session: AsyncSession, api_key: str
+) -> Users | None:
+    """Поиск пользователя по его api_key в таблице Users
+
+    Пользователь ищется одним запросом по индексируемой колонке
+    api_key_digest, после чего api_key проверяется по bcrypt-хэшу
+    только у найденного пользователя.
+
+    Если включён api_key_legacy_fallback (по умолчанию) и пользователь
+    не найден по дайджесту, перебираются все записи без дайджеста
+    (созданные до его появления) страницами по
+    api_key_legacy_scan_batch_size записей, по одному перебору за раз.
+    При совпадении дайджест сохраняется - следующий запрос с этим
+    api_key уже будет выполнен через индекс, а сама запись выпадает
+    из перебора.
+
+    Если пользователь не найден - возвращается None.
+    """
+
+    api_key_digest: str = digest_api_key(api_key=api_key)
+
+    stmt = select(Users).where(Users.api_key_digest == api_key_digest)
+    db_response: Result = await session.execute(stmt)
+    user: Users | None = db_response.scalar_one_or_none()
+
+    if user:
+        if await validate_api_key_async(
+            api_key=api_key, hashed_api_key=user.api_key
+        ):
+            return user
+        return None
+
+    if not settings.auth.api_key_legacy_fallback:
+        return None
+
+    async with _legacy_scan_lock:
+        last_id: int = 0
+        while True:
+            stmt = (
+                select(Users)
+                .where(Users.api_key_digest.is_(None), Users.id > last_id)
+                .order_by(Users.id)
+                .limit(settings.auth.api_key_legacy_scan_batch_size)
+            )
+            db_response = await session.execute(stmt)
+            legacy_users: Sequence[Users] = db_response.scalars().all()
+            if not legacy_users:
+                return None
+
+            for legacy_user in legacy_users:
+
+                if await validate_api_key_async(
+                    api_key=api_key, hashed_api_key=legacy_user.api_key
+                ):
+                    legacy_user.api_key_digest = api_key_digest
+                    await session.commit()
+                    return legacy_user
+
+            last_id = legacy_users[-1].id
 
 
 async def get_user_by_api_key(session: AsyncSession, api_key: str) -> Users:
     """Получение данных пользователя по его api_key
     из таблицы Users
 
-    Вместе с получением данных о пользователе, из
-    интеграционной таблицы followers_association_table
-    подгружаются данные о подписчиках и подписках.
-
     Если пользователь не авторизован - возникает ошибка.
 
     Используется в зависимости по аутентификации пользователя,
@@ -24,12 +108,11 @@ async def get_user_by_api_key(session: AsyncSession, api_key: str) -> Users:
     Далее данные о текущем пользователе используются и в других методах.
     """
 
-    users: Result = await session.execute(select(Users))
-
-    for user in users.scalars().all():
-
-        if validate_api_key(api_key=api_key, hashed_api_key=user.api_key):
-            return user
+    user: Users | None = await find_user_by_api_key(
+        session=session, api_key=api_key
+    )
+    if user:
+        return user
 
     raise HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -40,40 +123,221 @@ async def get_user_by_api_key(session: AsyncSession, api_key: str) -> Users:
 async def get_user_by_id(session: AsyncSession, user_id: int) -> Users:
     """Получение данных о пользователе по его user_id из таблицы Users
 
+    Вместе с получением данных о пользователе, из
+    интеграционной таблицы followers_association_table
+    подгружаются данные о подписчиках и подписках - поэтому
+    функция используется только там, где они отдаются в ответе.
+
+    Если пользователь уже загружен в сессию запроса (например,
+    при аутентификации), он берётся из identity map без повторного
+    SELECT - догружаются только подписчики и подписки. Списки
+    загружаются отдельными запросами, а не JOIN-ом обоих списков,
+    чтобы не получать их декартово произведение.
+
     Если пользователь по текущему id не найден - возникает ошибка.
 
-    Используется в эндпоинте:
+    Используется в эндпоинтах:
+    - GET /api/users/me - получить информацию о себе
     - GET /api/users/{user_id} - получить информацию о пользователе по его id
     """
 
-    stmt = (
-        select(Users)
-        .where(Users.id == user_id)
-        .options(
-            joinedload(Users.followers),
-            joinedload(Users.following),
+    user: Users | None = await session.get(
+        Users,
+        user_id,
+        options=[selectinload(Users.followers), selectinload(Users.following)],
+    )
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User '{user_id}' not found!",
         )
+
+    await user.awaitable_attrs.followers
+    await user.awaitable_attrs.following
+
+    return user
+
+
+async def get_user_compact_by_id(
+    session: AsyncSession, user_id: int
+) -> dict[str, Any]:
+    """Получение компактной информации о пользователе по его user_id:
+    вместо списков подписчиков и подписок - только их количество
+
+    Количество считается подзапросами в том же SELECT, поэтому размер
+    ответа и стоимость запроса не зависят от количества подписок.
+
+    Если пользователь по текущему id не найден - возникает ошибка.
+
+    Используется в эндпоинтах (с Query-параметром compact=true):
+    - GET /api/users/me - получить информацию о себе
+    - GET /api/users/{user_id} - получить информацию о пользователе по его id
+    """
+
+    followers_count = (
+        select(func.count())
+        .where(followers_association_table.c.following_id == Users.id)
+        .scalar_subquery()
     )
+    following_count = (
+        select(func.count())
+        .where(followers_association_table.c.follower_id == Users.id)
+        .scalar_subquery()
+    )
+    stmt = select(
+        Users.id,
+        Users.name,
+        followers_count.label("followers_count"),
+        following_count.label("following_count"),
+    ).where(Users.id == user_id)
     db_response: Result = await session.execute(stmt)
 
-    user: Users | None = db_response.unique().scalar_one_or_none()
+    user = db_response.mappings().one_or_none()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"User '{user_id}' not found!",
         )
 
-    return user
+    return dict(user)
+
+
+async def _get_follow_page(
+    session: AsyncSession,
+    user_id: int,
+    limit: int,
+    cursor: int | None,
+    user_column: Column,
+    related_column: Column,
+) -> list[Users]:
+    """Получение страницы пользователей из followers_association_table,
+    связанных с user_id через related_column
+
+    Пользователи сортируются по id, следующая страница выбирается
+    по id последнего пользователя предыдущей (keyset-пагинация).
+
+    Если страница пуста и пользователя не существует - возникает ошибка.
+    """
+
+    stmt = (
+        select(Users)
+        .join(followers_association_table, user_column == Users.id)
+        .where(related_column == user_id)
+        .order_by(Users.id)
+        .limit(limit)
+    )
+    if cursor is not None:
+        stmt = stmt.where(Users.id > cursor)
+
+    db_response: Result = await session.execute(stmt)
+    users: Sequence[Users] = db_response.scalars().all()
+
+    if not users and not await session.get(Users, user_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"User '{user_id}' not found!",
+        )
+
+    return list(users)
+
+
+async def get_followers(
+    session: AsyncSession, user_id: int, limit: int, cursor: int | None = None
+) -> list[Users]:
+    """Получение страницы подписчиков пользователя
+
+    Используется в эндпоинте:
+    - GET /api/users/{user_id}/followers - получить подписчиков пользователя
+    """
+
+    return await _get_follow_page(
+        session=session,
+        user_id=user_id,
+        limit=limit,
+        cursor=cursor,
+        user_column=followers_association_table.c.follower_id,
+        related_column=followers_association_table.c.following_id,
+    )
+
+
+async def get_following(
+    session: AsyncSession, user_id: int, limit: int, cursor: int | None = None
+) -> list[Users]:
+    """Получение страницы пользователей, на которых подписан пользователь
+
+    Используется в эндпоинте:
+    - GET /api/users/{user_id}/following - получить подписки пользователя
+    """
+
+    return await _get_follow_page(
+        session=session,
+        user_id=user_id,
+        limit=limit,
+        cursor=cursor,
+        user_column=followers_association_table.c.following_id,
+        related_column=followers_association_table.c.follower_id,
+    )
+
+
+async def _insert_follows(
+    session: AsyncSession, follower_id: int, user_ids: Sequence[int]
+) -> set[int]:
+    """Добавление подписок пользователя follower_id одним запросом
+    INSERT ... ON CONFLICT DO NOTHING
+
+    Уже существующие подписки пропускаются. Возвращает id
+    пользователей, подписка на которых добавлена.
+    """
+
+    stmt = (
+        insert_ignore(session, followers_association_table)
+        .values(
+            [
+                {"follower_id": follower_id, "following_id": user_id}
+                for user_id in user_ids
+            ]
+        )
+        .returning(followers_association_table.c.following_id)
+    )
+    return set((await session.scalars(stmt)).all())
+
+
+async def get_following_ids(
+    session: AsyncSession, user_id: int, use_cache: bool = True
+) -> tuple[int, ...]:
+    """Получение id пользователей, на которых подписан пользователь
+
+    Выбираются только id из таблицы followers_association_table,
+    без загрузки объектов Users. Результат кэшируется и сбрасывается
+    при создании и удалении подписки. С use_cache=False подписки
+    читаются из бд, даже если они есть в кэше, и кэш обновляется.
+
+    Используется в crud_tweets.get_tweets для сборки ленты
+    """
+
+    following_ids: tuple[int, ...] | None = None
+    if use_cache:
+        following_ids = following_ids_cache.get(user_id)
+    if following_ids is not None:
+        return following_ids
+
+    stmt = select(followers_association_table.c.following_id).where(
+        followers_association_table.c.follower_id == user_id
+    )
+    following_ids = tuple((await session.scalars(stmt)).all())
+    following_ids_cache.set(user_id, following_ids)
+
+    return following_ids
 
 
 async def create_follow(
-    session: AsyncSession, current_user: Users, user_id: int
+    session: AsyncSession, current_user: Principal, user_id: int
 ) -> None:
     """Создание подписки текущего пользователя на другого
     в таблице followers_association_table
 
     Если второго пользователя не существует в системе -
-    возникает ошибка.
+    возникает ошибка. Повторная подписка ничего не меняет.
 
     Используется в эндпоинте:
     - POST /api/users/{user_id}/follow -
@@ -87,15 +351,21 @@ async def create_follow(
             detail=f"User '{user_id}' not found!",
         )
 
-    stmt = insert(followers_association_table).values(
-        follower_id=current_user.id, following_id=user_id
+    if not await _insert_follows(
+        session=session, follower_id=current_user.id, user_ids=[user_id]
+    ):
+        return
+
+    await crud_timelines.follow(
+        session=session, owner_id=current_user.id, author_id=user_id
     )
-    await session.execute(stmt)
     await session.commit()
+    following_ids_cache.delete(current_user.id)
+    await crud_feed_cache.invalidate_graph(current_user.id, user_id)
 
 
 async def delete_follow(
-    session: AsyncSession, current_user: Users, user_id: int
+    session: AsyncSession, current_user: Principal, user_id: int
 ) -> None:
     """Удаление подписки текущего пользователя на другого
     из таблицы followers_association_table
@@ -110,4 +380,97 @@ async def delete_follow(
         followers_association_table.c.following_id == user_id,
     )
     await session.execute(stmt)
+    await crud_timelines.unfollow(
+        session=session, owner_id=current_user.id, author_id=user_id
+    )
     await session.commit()
+    following_ids_cache.delete(current_user.id)
+    await crud_feed_cache.invalidate_graph(current_user.id, user_id)
+
+
+async def apply_follow_actions(
+    session: AsyncSession, current_user: Principal, actions: list[FollowAction]
+) -> list[dict[str, Any]]:
+    """Применение пакета подписок и отписок текущего пользователя
+
+    Для каждого пользователя применяется последнее действие из пакета.
+    Независимо от размера пакета выполняется не больше трёх
+    запросов: проверка существования пользователей, INSERT ...
+    ON CONFLICT DO NOTHING подписок и DELETE отписок - в одной
+    транзакции (при включённых материализованных лентах к ним
+    добавляется обновление ленты для каждого изменённого автора).
+
+    Возвращает для каждого пользователя (в порядке первого упоминания)
+    итоговое действие и результат (status): applied - изменено,
+    unchanged - уже было в нужном состоянии, not_found - пользователя нет.
+
+    Используется в эндпоинте:
+    - POST /api/users/follow/batch - применить пакет подписок
+    """
+
+    final_actions: dict[int, str] = {}
+    for follow_action in actions:
+        final_actions[follow_action.user_id] = follow_action.action
+
+    existing_ids: set[int] = set(
+        (
+            await session.scalars(
+                select(Users.id).where(Users.id.in_(list(final_actions)))
+            )
+        ).all()
+    )
+    follow_ids: list[int] = [
+        user_id
+        for user_id, action in final_actions.items()
+        if action == "follow" and user_id in existing_ids
+    ]
+    unfollow_ids: list[int] = [
+        user_id
+        for user_id, action in final_actions.items()
+        if action == "unfollow" and user_id in existing_ids
+    ]
+
+    followed: set[int] = set()
+    if follow_ids:
+        followed = await _insert_follows(
+            session=session, follower_id=current_user.id, user_ids=follow_ids
+        )
+    unfollowed: set[int] = set()
+    if unfollow_ids:
+        stmt = (
+            delete(followers_association_table)
+            .where(
+                followers_association_table.c.follower_id == current_user.id,
+                followers_association_table.c.following_id.in_(unfollow_ids),
+            )
+            .returning(followers_association_table.c.following_id)
+        )
+        unfollowed = set((await session.scalars(stmt)).all())
+
+    for author_id in followed:
+        await crud_timelines.follow(
+            session=session, owner_id=current_user.id, author_id=author_id
+        )
+    for author_id in unfollowed:
+        await crud_timelines.unfollow(
+            session=session, owner_id=current_user.id, author_id=author_id
+        )
+
+    changed_ids: set[int] = followed | unfollowed
+    if changed_ids:
+        await session.commit()
+        following_ids_cache.delete(current_user.id)
+        await crud_feed_cache.invalidate_graph(current_user.id, *changed_ids)
+
+    results: list[dict[str, Any]] = []
+    for user_id, action in final_actions.items():
+        follow_status: FollowStatus = "unchanged"
+        if user_id not in existing_ids:
+            follow_status = "not_found"
+        elif user_id in changed_ids:
+            follow_status = "applied"
+        results.append(
+            {"user_id": user_id, "action": action, "status": follow_status}
+        )
+
+    return results
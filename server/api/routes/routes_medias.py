@@ -1,19 +1,22 @@
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, UploadFile, status
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, status
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 from server.api.crud import crud_medias
 from server.core.dependencies.authenticate import authenticate_user
-from server.core.models import Medias, Users, db_helper
+from server.core.dependencies.principal import Principal
+from server.core.models import Medias, db_helper
 from server.core.schemas.schemas_base import (
     BadRequestErrorResponse,
     NotFoundErrorResponse,
+    PayloadTooLargeErrorResponse,
     ServerErrorResponse,
     UnauthorizedErrorResponse,
     ValidationErrorResponse,
 )
 from server.core.schemas.schemas_medias import MediasRead
+from server.utils.media_variants import generate_variants
 
 router = APIRouter()
 
@@ -27,14 +30,19 @@ router = APIRouter()
         400: {"model": BadRequestErrorResponse},
         401: {"model": UnauthorizedErrorResponse},
         404: {"model": NotFoundErrorResponse},
+        413: {"model": PayloadTooLargeErrorResponse},
         422: {"model": ValidationErrorResponse},
         500: {"model": ServerErrorResponse},
     },
 )
 async def upload_medias(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_user)],
     file: UploadFile,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(db_helper.session_dependency),
+    session_factory: async_sessionmaker[AsyncSession] = Depends(
+        db_helper.session_factory_dependency
+    ),
 ):
     """Загрузить медиа-файлы
 
@@ -42,10 +50,19 @@ async def upload_medias(
     2. Получение сессии для базы данных
     3. Запись api_key текущего пользователя в заголовок ответа
     4. Добавление данных в таблицу бд
+    5. Создание уменьшенных и WebP-копий медиа в фоне
+    (после отправки ответа)
     """
 
     new_media: Medias = await crud_medias.create_media(
         session=session, file=file
     )
+    background_tasks.add_task(
+        generate_variants,
+        session_factory=session_factory,
+        media_id=new_media.media_id,
+        media_path=new_media.media_path,
+        author_id=current_user.id,
+    )
 
     return {"media_id": new_media.media_id}
@@ -1,12 +1,26 @@
+from contextlib import AbstractAsyncContextManager, nullcontext
 from typing import Annotated, Optional
 
-from fastapi import APIRouter, Depends, Path, Query, status
+import orjson
+from fastapi import APIRouter, Depends, Path, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.api.crud import crud_likes, crud_tweets, crud_users
-from server.core.dependencies.authenticate import authenticate_user
-from server.core.models import Tweets, Users, db_helper
+from server.api.crud import (
+    crud_feed_cache,
+    crud_likes,
+    crud_tweets,
+    crud_users,
+)
+from server.api.crud.crud_feed_cache import ResourceVersion
+from server.core.config import settings
+from server.core.dependencies.authenticate import (
+    authenticate_reader,
+    authenticate_user,
+)
+from server.core.dependencies.principal import Principal
+from server.core.models import Tweets, db_helper
 from server.core.schemas.schemas_base import (
+    BadRequestErrorResponse,
     BaseResponse,
     ForbiddenErrorResponse,
     NotFoundErrorResponse,
@@ -14,11 +28,16 @@ from server.core.schemas.schemas_base import (
     UnauthorizedErrorResponse,
     ValidationErrorResponse,
 )
+from server.core.schemas.schemas_likes import LikesBatchCreate, LikesBatchRead
 from server.core.schemas.schemas_tweets import (
     TweetCreate,
     TweetRead,
     TweetsRead,
+    dump_tweets_read,
 )
+from server.utils.cursor import decode_cursor, encode_cursor
+from server.utils.etag import NOT_MODIFIED_RESPONSE, not_modified
+from server.utils.like_buffer import like_buffer, like_buffer_enabled
 
 router = APIRouter()
 
@@ -35,7 +54,7 @@ router = APIRouter()
     },
 )
 async def create_tweet(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_user)],
     tweet_in: TweetCreate,
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
@@ -59,44 +78,126 @@ async def create_tweet(
     response_model=TweetsRead,
     summary="Получить информации о всех твитах",
     responses={
+        304: NOT_MODIFIED_RESPONSE,
+        400: {"model": BadRequestErrorResponse},
         401: {"model": UnauthorizedErrorResponse},
         422: {"model": ValidationErrorResponse},
         500: {"model": ServerErrorResponse},
     },
 )
 async def get_tweets(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_reader)],
+    request: Request,
+    response: Response,
     offset: Annotated[
         Optional[int], Query(ge=1, description="Номер страницы (смещение)")
     ] = None,
     limit: Annotated[
         Optional[int], Query(ge=1, description="Количество твитов на странице")
     ] = None,
-    session: AsyncSession = Depends(db_helper.session_dependency),
+    cursor: Annotated[
+        Optional[str],
+        Query(
+            description="Курсор следующей страницы (next_cursor из "
+            "предыдущего ответа); при передаче cursor параметр offset "
+            "игнорируется"
+        ),
+    ] = None,
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
+    primary_session: AsyncSession = Depends(db_helper.session_dependency),
 ):
     """Получить информации о всех твитах
 
     1. Проверка авторизации текущего пользователя
-    2. Получение сессии для базы данных
+    2. Получение сессии для чтения (реплика или основная бд)
     3. Запись api_key текущего пользователя в заголовок ответа
-    4. Запрос данных из бд
+    4. Вычисление версии страницы по версиям читателя и авторов:
+    ответ 304, если она совпадает с If-None-Match
+    4.1. Если версии изменились недавно (реплики могли ещё не получить
+    изменения) - подписки и страница читаются из основной бд
+    5. Поиск готовой страницы в кэше ленты
+    6. Запрос данных из бд
+    7. Формирование курсора следующей страницы
+    8. Сериализация страницы и сохранение её в кэш ленты
     """
 
-    default_offset = 0
-    default_limit = 50
+    offset = offset or 0
+    limit = limit or 50
 
-    user: Users = await crud_users.get_user_by_id(
-        user_id=current_user.id, session=session
+    following_ids: tuple[int, ...] = await crud_users.get_following_ids(
+        session=session, user_id=current_user.id
+    )
+    version: ResourceVersion = await crud_feed_cache.get_feed_version(
+        user_id=current_user.id,
+        author_ids=following_ids,
+        offset=offset,
+        limit=limit,
+        cursor=cursor,
     )
+    if version.fresh and session is not primary_session:
+        # Страница, прочитанная с отстающей реплики, попала бы в кэш
+        # и ETag под новой версией - поэтому данные для неё (и список
+        # подписок, от которого она зависит) читаются из основной бд
+        session = primary_session
+        following_ids = await crud_users.get_following_ids(
+            session=session, user_id=current_user.id, use_cache=False
+        )
+        version = await crud_feed_cache.get_feed_version(
+            user_id=current_user.id,
+            author_ids=following_ids,
+            offset=offset,
+            limit=limit,
+            cursor=cursor,
+        )
+    not_modified_response = not_modified(request, response, version.value)
+    if not_modified_response:
+        return not_modified_response
+
+    if crud_feed_cache.feed_cache_enabled():
+        cached_content: bytes | None = await crud_feed_cache.get_page(
+            user_id=current_user.id, version=version.value
+        )
+        if cached_content is not None:
+            return Response(
+                content=cached_content,
+                media_type="application/json",
+                headers=response.headers,
+            )
 
     tweets: list[Tweets | None] = await crud_tweets.get_tweets(
         session=session,
-        current_user=user,
-        offset=offset or default_offset,
-        limit=limit or default_limit,
+        current_user=current_user,
+        offset=offset,
+        limit=limit,
+        cursor=decode_cursor(cursor=cursor, size=2) if cursor else None,
     )
 
-    return {"tweets": tweets}
+    next_cursor: str | None = None
+    last_tweet: Tweets | None = tweets[-1] if tweets else None
+    if last_tweet and len(tweets) == limit:
+        next_cursor = encode_cursor(last_tweet.like_count, last_tweet.tweet_id)
+
+    if settings.feed_cache.feed_fast_serialization:
+        content: bytes = dump_tweets_read(
+            tweets=[tweet for tweet in tweets if tweet],
+            next_cursor=next_cursor,
+        )
+    else:
+        page = TweetsRead.model_validate(
+            {"tweets": tweets, "next_cursor": next_cursor},
+            from_attributes=True,
+        )
+        content = orjson.dumps(page.model_dump(mode="json", by_alias=True))
+    if crud_feed_cache.feed_cache_enabled():
+        await crud_feed_cache.set_page(
+            user_id=current_user.id, version=version.value, content=content
+        )
+
+    return Response(
+        content=content,
+        media_type="application/json",
+        headers=response.headers,
+    )
 
 
 @router.delete(
@@ -113,7 +214,7 @@ async def get_tweets(
     },
 )
 async def delete_tweet(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_user)],
     tweet_id: Annotated[int, Path(ge=1)],
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
@@ -133,6 +234,50 @@ async def delete_tweet(
     return {"result": True}
 
 
+@router.post(
+    "/api/tweets/likes/batch",
+    status_code=status.HTTP_200_OK,
+    summary="Применить пакет лайков",
+    response_model=LikesBatchRead,
+    responses={
+        401: {"model": UnauthorizedErrorResponse},
+        422: {"model": ValidationErrorResponse},
+        500: {"model": ServerErrorResponse},
+    },
+)
+async def apply_likes_batch(
+    current_user: Annotated[Principal, Depends(authenticate_user)],
+    likes_in: LikesBatchCreate,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+):
+    """Применить пакет лайков
+
+    1. Проверка авторизации текущего пользователя
+    2. Валидация пакета действий (до 100 действий)
+    3. Получение сессии для базы данных
+    4. Запись api_key текущего пользователя в заголовок ответа
+    5. Применение последнего действия для каждого твита
+    в одной транзакции (если включён буфер лайков - в обход него,
+    ожидающие в буфере события к тем же твитам отбрасываются)
+    """
+
+    bypass_buffer: AbstractAsyncContextManager[None] = nullcontext()
+    if like_buffer_enabled():
+        bypass_buffer = like_buffer.bypass(
+            (like_action.tweet_id, current_user.id)
+            for like_action in likes_in.actions
+        )
+
+    async with bypass_buffer:
+        results = await crud_likes.apply_like_actions(
+            session=session,
+            current_user=current_user,
+            actions=likes_in.actions,
+        )
+
+    return {"results": results}
+
+
 @router.post(
     "/api/tweets/{tweet_id}/likes",
     status_code=status.HTTP_201_CREATED,
@@ -146,7 +291,7 @@ async def delete_tweet(
     },
 )
 async def create_like(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_user)],
     tweet_id: Annotated[int, Path(ge=1)],
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
@@ -156,9 +301,16 @@ async def create_like(
     2. Валидация tweet_id запрашиваемого твита
     3. Получение сессии для базы данных
     4. Запись api_key текущего пользователя в заголовок ответа
-    5. Добавление данных в таблицу бд
+    5. Добавление данных в таблицу бд (или в буфер лайков,
+    если он включён - тогда наличие твита не проверяется)
     """
 
+    if like_buffer_enabled():
+        await like_buffer.add(
+            tweet_id=tweet_id, user_id=current_user.id, action="like"
+        )
+        return {"result": True}
+
     await crud_likes.create_like(
         session=session, tweet_id=tweet_id, current_user=current_user
     )
@@ -178,7 +330,7 @@ async def create_like(
     },
 )
 async def delete_like(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_user)],
     tweet_id: Annotated[int, Path(ge=1)],
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
@@ -188,9 +340,16 @@ async def delete_like(
     2. Валидация tweet_id запрашиваемого твита
     3. Получение сессии для базы данных
     4. Запись api_key текущего пользователя в заголовок ответа
-    5. Удаление данных из таблицы бд
+    5. Удаление данных из таблицы бд (или запись в буфер лайков,
+    если он включён)
     """
 
+    if like_buffer_enabled():
+        await like_buffer.add(
+            tweet_id=tweet_id, user_id=current_user.id, action="unlike"
+        )
+        return {"result": True}
+
     await crud_likes.delete_like(
         session=session, tweet_id=tweet_id, current_user=current_user
     )
@@ -1,45 +1,103 @@
-from typing import Annotated
+from typing import Annotated, Awaitable, Callable, Optional
 
-from fastapi import APIRouter, Depends, Path, status
+from fastapi import APIRouter, Depends, Path, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from server.api.crud import crud_users
-from server.core.dependencies.authenticate import authenticate_user
+from server.api.crud import crud_feed_cache, crud_users
+from server.api.crud.crud_feed_cache import ResourceVersion
+from server.core.dependencies.authenticate import (
+    authenticate_reader,
+    authenticate_user,
+)
+from server.core.dependencies.principal import Principal
 from server.core.models import Users, db_helper
 from server.core.schemas.schemas_base import (
+    BadRequestErrorResponse,
     BaseResponse,
     NotFoundErrorResponse,
     ServerErrorResponse,
     UnauthorizedErrorResponse,
     ValidationErrorResponse,
 )
-from server.core.schemas.schemas_users import UserRead
+from server.core.schemas.schemas_users import (
+    FollowsBatchCreate,
+    FollowsBatchRead,
+    UserCompactRead,
+    UserRead,
+    UsersPageRead,
+)
+from server.utils.cursor import decode_cursor, encode_cursor
+from server.utils.etag import NOT_MODIFIED_RESPONSE, not_modified
 
 router = APIRouter()
 
+CompactQuery = Annotated[
+    bool,
+    Query(
+        description="Вернуть только количество подписчиков и подписок "
+        "без их списков"
+    ),
+]
+LimitQuery = Annotated[
+    Optional[int],
+    Query(ge=1, le=100, description="Количество пользователей на странице"),
+]
+CursorQuery = Annotated[
+    Optional[str],
+    Query(
+        description="Курсор следующей страницы (next_cursor из "
+        "предыдущего ответа)"
+    ),
+]
+
 
 @router.get(
     "/api/users/me",
     status_code=status.HTTP_200_OK,
     summary="Получить информацию о себе (о текущем пользователе)",
-    response_model=UserRead,
+    response_model=UserRead | UserCompactRead,
     responses={
+        304: NOT_MODIFIED_RESPONSE,
         401: {"model": UnauthorizedErrorResponse},
         422: {"model": ValidationErrorResponse},
         500: {"model": ServerErrorResponse},
     },
 )
 async def get_me(
-    current_user: Annotated[Users, Depends(authenticate_user)],
-    session: AsyncSession = Depends(db_helper.session_dependency),
+    current_user: Annotated[Principal, Depends(authenticate_reader)],
+    request: Request,
+    response: Response,
+    compact: CompactQuery = False,
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
+    primary_session: AsyncSession = Depends(db_helper.session_dependency),
 ):
     """Получить информацию о себе (о текущем пользователе)
 
     1. Проверка авторизации текущего пользователя
-    1.1. Запрос данных из бд
+    1.1. Ответ 304, если версия профиля совпадает с If-None-Match
+    1.2. Запрос данных из бд (из основной бд, если версия профиля
+    изменилась недавно и реплики могли ещё не получить изменения)
     2. Запись api_key текущего пользователя в заголовок ответа
     """
 
+    version: ResourceVersion = await crud_feed_cache.get_profile_version(
+        user_id=current_user.id, compact=compact
+    )
+    not_modified_response = not_modified(request, response, version.value)
+    if not_modified_response:
+        return not_modified_response
+    if version.fresh:
+        # ETag новой версии не должен достаться профилю
+        # с отстающей реплики
+        session = primary_session
+
+    if compact:
+        return {
+            "user": await crud_users.get_user_compact_by_id(
+                user_id=current_user.id, session=session
+            )
+        }
+
     user: Users | None = await crud_users.get_user_by_id(
         user_id=current_user.id, session=session
     )
@@ -50,9 +108,10 @@ async def get_me(
 @router.get(
     "/api/users/{user_id}",
     status_code=status.HTTP_200_OK,
-    response_model=UserRead,
+    response_model=UserRead | UserCompactRead,
     summary="Получить информацию о пользователе по его id",
     responses={
+        304: NOT_MODIFIED_RESPONSE,
         404: {"model": NotFoundErrorResponse},
         422: {"model": ValidationErrorResponse},
         500: {"model": ServerErrorResponse},
@@ -60,15 +119,40 @@ async def get_me(
 )
 async def get_user(
     user_id: Annotated[int, Path(ge=1)],
-    session: AsyncSession = Depends(db_helper.session_dependency),
+    request: Request,
+    response: Response,
+    compact: CompactQuery = False,
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
+    primary_session: AsyncSession = Depends(db_helper.session_dependency),
 ):
     """Получить информацию о пользователе по его id
 
     1. Валидация user_id запрашиваемого пользователя
-    2. Получение сессии для базы данных
-    3. Запрос данных из бд
+    2. Ответ 304, если версия профиля совпадает с If-None-Match
+    3. Получение сессии для базы данных (основной бд, если версия
+    профиля изменилась недавно и реплики могли ещё не получить
+    изменения)
+    4. Запрос данных из бд
     """
 
+    version: ResourceVersion = await crud_feed_cache.get_profile_version(
+        user_id=user_id, compact=compact
+    )
+    not_modified_response = not_modified(request, response, version.value)
+    if not_modified_response:
+        return not_modified_response
+    if version.fresh:
+        # ETag новой версии не должен достаться профилю
+        # с отстающей реплики
+        session = primary_session
+
+    if compact:
+        return {
+            "user": await crud_users.get_user_compact_by_id(
+                user_id=user_id, session=session
+            )
+        }
+
     user: Users | None = await crud_users.get_user_by_id(
         user_id=user_id, session=session
     )
@@ -76,6 +160,137 @@ async def get_user(
     return {"user": user}
 
 
+async def _get_follow_page(
+    get_page: Callable[..., Awaitable[list[Users]]],
+    user_id: int,
+    limit: int | None,
+    cursor: str | None,
+    session: AsyncSession,
+) -> dict:
+    """Запрос страницы пользователей и формирование
+    курсора следующей страницы
+    """
+
+    default_limit = 50
+
+    users: list[Users] = await get_page(
+        session=session,
+        user_id=user_id,
+        limit=limit or default_limit,
+        cursor=decode_cursor(cursor=cursor, size=1)[0] if cursor else None,
+    )
+
+    next_cursor: str | None = None
+    if users and len(users) == (limit or default_limit):
+        next_cursor = encode_cursor(users[-1].id)
+
+    return {"users": users, "next_cursor": next_cursor}
+
+
+@router.get(
+    "/api/users/{user_id}/followers",
+    status_code=status.HTTP_200_OK,
+    response_model=UsersPageRead,
+    summary="Получить подписчиков пользователя",
+    responses={
+        400: {"model": BadRequestErrorResponse},
+        404: {"model": NotFoundErrorResponse},
+        422: {"model": ValidationErrorResponse},
+        500: {"model": ServerErrorResponse},
+    },
+)
+async def get_followers(
+    user_id: Annotated[int, Path(ge=1)],
+    limit: LimitQuery = None,
+    cursor: CursorQuery = None,
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
+):
+    """Получить подписчиков пользователя (постранично)
+
+    1. Валидация user_id запрашиваемого пользователя
+    2. Получение сессии для базы данных
+    3. Запрос данных из бд
+    4. Формирование курсора следующей страницы
+    """
+
+    return await _get_follow_page(
+        get_page=crud_users.get_followers,
+        user_id=user_id,
+        limit=limit,
+        cursor=cursor,
+        session=session,
+    )
+
+
+@router.get(
+    "/api/users/{user_id}/following",
+    status_code=status.HTTP_200_OK,
+    response_model=UsersPageRead,
+    summary="Получить подписки пользователя",
+    responses={
+        400: {"model": BadRequestErrorResponse},
+        404: {"model": NotFoundErrorResponse},
+        422: {"model": ValidationErrorResponse},
+        500: {"model": ServerErrorResponse},
+    },
+)
+async def get_following(
+    user_id: Annotated[int, Path(ge=1)],
+    limit: LimitQuery = None,
+    cursor: CursorQuery = None,
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
+):
+    """Получить пользователей, на которых подписан пользователь
+    (постранично)
+
+    1. Валидация user_id запрашиваемого пользователя
+    2. Получение сессии для базы данных
+    3. Запрос данных из бд
+    4. Формирование курсора следующей страницы
+    """
+
+    return await _get_follow_page(
+        get_page=crud_users.get_following,
+        user_id=user_id,
+        limit=limit,
+        cursor=cursor,
+        session=session,
+    )
+
+
+@router.post(
+    "/api/users/follow/batch",
+    status_code=status.HTTP_200_OK,
+    response_model=FollowsBatchRead,
+    summary="Применить пакет подписок",
+    responses={
+        401: {"model": UnauthorizedErrorResponse},
+        422: {"model": ValidationErrorResponse},
+        500: {"model": ServerErrorResponse},
+    },
+)
+async def apply_follows_batch(
+    current_user: Annotated[Principal, Depends(authenticate_user)],
+    follows_in: FollowsBatchCreate,
+    session: AsyncSession = Depends(db_helper.session_dependency),
+):
+    """Применить пакет подписок
+
+    1. Проверка авторизации текущего пользователя
+    2. Валидация пакета действий (до 100 действий)
+    3. Получение сессии для базы данных
+    4. Запись api_key текущего пользователя в заголовок ответа
+    5. Применение последнего действия для каждого пользователя
+    в одной транзакции
+    """
+
+    results = await crud_users.apply_follow_actions(
+        session=session, current_user=current_user, actions=follows_in.actions
+    )
+
+    return {"results": results}
+
+
 @router.post(
     "/api/users/{user_id}/follow",
     status_code=status.HTTP_200_OK,
@@ -89,7 +304,7 @@ async def get_user(
     },
 )
 async def create_follow(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_user)],
     user_id: Annotated[int, Path(ge=1)],
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
@@ -122,7 +337,7 @@ async def create_follow(
     },
 )
 async def delete_follow(
-    current_user: Annotated[Users, Depends(authenticate_user)],
+    current_user: Annotated[Principal, Depends(authenticate_user)],
     user_id: Annotated[int, Path(ge=1)],
     session: AsyncSession = Depends(db_helper.session_dependency),
 ):
@@ -1,6 +1,6 @@
 import logging
 from pathlib import Path
-from typing import ClassVar, Type
+from typing import ClassVar, Literal, Type
 
 from dotenv import load_dotenv
 from fastapi.openapi.models import Response
@@ -63,6 +63,21 @@ class DbSettings(BaseSettings):
 
     Считывает параметры подключения из .env файла.
     Предоставляет свойства для формирования DSN строк подключения.
+
+    Параметры пула соединений (на один процесс приложения):
+    - db_pool_size - количество постоянно открытых соединений
+    - db_max_overflow - сколько соединений можно открыть сверх pool_size
+    - db_pool_timeout - сколько секунд ждать свободного соединения
+    - db_pool_recycle - через сколько секунд переоткрывать соединение
+    - db_pool_pre_ping - проверять соединение перед выдачей из пула
+    - db_statement_cache_size - размер кэша prepared statements asyncpg
+    (0 - при работе через pgbouncer в режиме transaction)
+
+    Реплики для чтения:
+    - db_replica_urls - DSN реплик (JSON-список), пустой - все запросы
+    идут в основную бд
+    - db_read_your_writes_window - сколько секунд после записи чтения
+    того же клиента идут в основную бд, а не в реплику
     """
 
     db_user: str
@@ -73,6 +88,16 @@ class DbSettings(BaseSettings):
     db_name: str
     db_echo: bool = False
 
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_cache_size: int = 100
+
+    db_replica_urls: list[str] = []
+    db_read_your_writes_window: float = 5
+
     @property
     def url(self):
         """Формирует DSN строку для production подключения"""
@@ -92,12 +117,170 @@ class DbSettings(BaseSettings):
         )
 
 
+class AuthSettings(BaseSettings):
+    """Настройки аутентификации пользователей по api_key
+
+    Считывает секрет для вычисления дайджеста api_key из .env файла.
+    Дайджест хранится в индексируемой колонке таблицы Users и позволяет
+    найти пользователя одним запросом, без перебора bcrypt-хэшей.
+
+    Также задаёт размер и время жизни (в секундах) кэша
+    аутентифицированных пользователей и размер пула воркеров,
+    в котором выполняется хэширование и проверка api_key через bcrypt.
+
+    Пользователи без дайджеста (созданные до его появления) находятся
+    только перебором bcrypt-хэшей (api_key_legacy_fallback): дайджест
+    нельзя заполнить миграцией, т.к. исходный api_key не хранится.
+    Перебор проходит все такие записи страницами по
+    api_key_legacy_scan_batch_size, а переборы разных запросов
+    выполняются по одному, чтобы неизвестные api_key не занимали
+    весь пул хэширования. Каждый вошедший пользователь выпадает
+    из перебора; когда записей без дайджеста не останется,
+    перебор можно выключить.
+    """
+
+    api_key_secret: str = "twitter-clone-api-key-secret"
+    principal_cache_size: int = 10_000
+    principal_cache_ttl: int = 60
+    hash_workers: int = 4
+    hash_executor: Literal["thread", "process"] = "thread"
+    api_key_legacy_fallback: bool = True
+    api_key_legacy_scan_batch_size: int = 100
+
+
+class MediaSettings(BaseSettings):
+    """Настройки загрузки медиа-файлов
+
+    - media_max_size - максимальный размер медиа-файла в байтах
+    - media_chunk_size - размер блока, которыми файл копируется
+    на диск (память на одну загрузку не зависит от размера файла)
+    - media_variant_widths - ширины уменьшенных WebP-копий изображения,
+    которые создаются в фоне после загрузки
+    - media_webp_quality - качество WebP-копий
+    - media_workers, media_executor - пул воркеров для обработки
+    изображений
+    - media_sweep_interval - период (в секундах) фоновой задачи,
+    которая удаляет файлы из очереди pending_deletions
+    - media_sweep_batch_size - количество файлов за один проход
+    - media_orphan_grace_period - через сколько секунд медиа,
+    так и не привязанное к твиту, считается брошенным и удаляется
+    """
+
+    media_max_size: int = 10 * 1024 * 1024
+    media_chunk_size: int = 64 * 1024
+    media_variant_widths: list[int] = [320, 960]
+    media_webp_quality: int = 80
+    media_workers: int = 2
+    media_executor: Literal["thread", "process"] = "thread"
+    media_sweep_interval: float = 60
+    media_sweep_batch_size: int = 100
+    media_orphan_grace_period: float = 24 * 60 * 60
+
+
+class TimelineSettings(BaseSettings):
+    """Настройки материализованных лент (fan-out-on-write)
+
+    При создании твита его id записывается в ленты подписчиков
+    автора, а подписка, отписка и удаление твита обновляют ленты.
+    Если ленты включены (timeline_enabled), лента читается
+    по сохранённым id вместо выборки твитов по списку подписок.
+
+    - timeline_store - хранилище лент: таблица timelines ("db")
+    или память процесса ("memory", заполняется при первом чтении)
+    - timeline_fanout_max_followers - авторы с большим количеством
+    подписчиков не рассылают твиты при записи, их твиты
+    добавляются в ленту при чтении (fan-out-on-read); решение
+    принимается при создании твита и сохраняется в Tweets.fanned_out
+    - timeline_memory_max_size - сколько последних твитов хранится
+    в ленте "memory" (лента передаётся в запрос списком id,
+    поэтому её длина ограничивает размер этого списка); лента
+    сортируется по лайкам только среди этих твитов, поэтому более
+    старые популярные твиты в неё не попадают, в отличие от "db"
+    - following_cache_size, following_cache_ttl - размер и время жизни
+    кэша подписок, по которым лента собирается без материализации
+
+    Ленты ведутся при записи и при выключенном timeline_enabled,
+    а таблица timelines - и при timeline_store="memory", поэтому
+    обе настройки можно менять в любой момент без перестроения лент.
+    """
+
+    timeline_enabled: bool = False
+    timeline_store: Literal["db", "memory"] = "db"
+    timeline_fanout_max_followers: int = 10_000
+    timeline_memory_max_size: int = 800
+
+    # Кэш id пользователей, на которых подписан читатель ленты
+    following_cache_size: int = 10_000
+    following_cache_ttl: float = 60
+
+
+class FeedCacheSettings(BaseSettings):
+    """Настройки кэша страниц ленты (GET /api/tweets)
+
+    Страница ленты хранится уже сериализованной для каждого
+    читателя и параметров пагинации. При изменении твитов, лайков
+    и подписок увеличиваются версии затронутых пользователей,
+    и ключ страницы меняется.
+
+    - feed_cache_backend - хранилище: память процесса ("memory")
+    или Redis ("redis", общий для всех процессов, нужен пакет redis)
+    - feed_cache_size - максимальное количество страниц в памяти
+    - feed_cache_ttl - время жизни страницы в секундах (ограничивает
+    устаревание при изменениях, которые не меняют версии)
+    - feed_fast_serialization - сериализовать страницу напрямую
+    из объектов Tweets (dump_tweets_read) вместо валидации TweetsRead
+
+    Версии хранятся в том же хранилище и ведутся и при выключенном
+    кэше: по ним вычисляются ETag ленты и профилей.
+    """
+
+    feed_cache_enabled: bool = True
+    feed_cache_backend: Literal["memory", "redis"] = "memory"
+    feed_cache_size: int = 10_000
+    feed_cache_ttl: float = 30
+    feed_cache_redis_url: str = "redis://localhost:6379/0"
+    feed_fast_serialization: bool = True
+
+
+class LikeBufferSettings(BaseSettings):
+    """Настройки буфера отложенной записи лайков (write-behind)
+
+    Если буфер включён, лайки и их удаления (POST и DELETE
+    /api/tweets/{tweet_id}/likes) подтверждаются сразу, без запросов
+    к бд: событие записывается в журнал на диске и в буфер памяти,
+    где для каждой пары (твит, пользователь) остаётся последнее
+    действие. Фоновая задача записывает буфер в таблицу Likes пачками.
+
+    - like_buffer_max_events - размер буфера, при котором запись
+    начинается не дожидаясь интервала, и размер одной пачки
+    - like_buffer_flush_interval - период записи буфера в секундах
+    - like_buffer_journal_path - журнал событий, по которому буфер
+    восстанавливается после падения процесса
+    - like_buffer_fsync - fsync журнала после каждого события
+    (сохраняет события и при отключении питания, но медленнее)
+
+    Пока событие не записано в бд, лайк не виден в ленте,
+    а лайк к несуществующему твиту отбрасывается без ошибки.
+    """
+
+    like_buffer_enabled: bool = False
+    like_buffer_max_events: int = 1000
+    like_buffer_flush_interval: float = 1
+    like_buffer_journal_path: Path = BASE_PROJECT_DIR / "server/likes.journal"
+    like_buffer_fsync: bool = False
+
+
 class Settings(BaseSettings):
     """Корневая конфигурация приложения"""
 
     api: FastApiConfig = FastApiConfig()
     run: RunConfig = RunConfig()
     db: DbSettings = DbSettings()
+    auth: AuthSettings = AuthSettings()
+    media: MediaSettings = MediaSettings()
+    timeline: TimelineSettings = TimelineSettings()
+    feed_cache: FeedCacheSettings = FeedCacheSettings()
+    like_buffer: LikeBufferSettings = LikeBufferSettings()
     logging: LoggingConfig = LoggingConfig()
 
 
@@ -1,27 +1,76 @@
-from fastapi import Depends, Response, Security
+from fastapi import Depends, Request, Response, Security
 from fastapi.security import APIKeyHeader
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from server.api.crud import crud_users
+from server.core.dependencies.principal import Principal, principal_cache
 from server.core.models import Users, db_helper
+from server.utils.hashed_api_key import digest_api_key
 
 API_KEY_HEADER = APIKeyHeader(name="api-key")
 
 
+async def _authenticate(
+    request: Request, response: Response, session: AsyncSession, api_key: str
+) -> Principal:
+    """Проверка api_key: из кэша аутентифицированных пользователей
+    или запросом к бд в переданной сессии
+
+    Загруженный из бд пользователь сохраняется в request.state.user:
+    identity map сессии хранит объекты по слабым ссылкам, а так
+    эндпоинт получит его из сессии запроса без повторного SELECT.
+    """
+
+    api_key_digest: str = digest_api_key(api_key=api_key)
+    current_user: Principal | None = principal_cache.get(api_key_digest)
+
+    if current_user is None:
+        user: Users = await crud_users.get_user_by_api_key(
+            session=session, api_key=api_key
+        )
+        request.state.user = user
+        current_user = Principal(id=user.id, name=user.name)
+        principal_cache.set(api_key_digest, current_user)
+
+    response.headers["api-key"] = api_key
+
+    return current_user
+
+
 async def authenticate_user(
+    request: Request,
     response: Response,
     session: AsyncSession = Depends(db_helper.session_dependency),
     api_key: str = Security(API_KEY_HEADER),
-) -> Users:
+) -> Principal:
     """Зависимость для проверки существования пользователя
     по переданному api_key в заголовке для использования
     в FastAPI Depends
+
+    Уже проверенные api_key берутся из кэша аутентифицированных
+    пользователей - без обращения к базе данных.
     """
 
-    current_user: Users = await crud_users.get_user_by_api_key(
-        session=session, api_key=api_key
+    return await _authenticate(
+        request=request, response=response, session=session, api_key=api_key
     )
 
-    response.headers["api-key"] = api_key
 
-    return current_user
+async def authenticate_reader(
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(db_helper.read_session_dependency),
+    api_key: str = Security(API_KEY_HEADER),
+) -> Principal:
+    """Зависимость аутентификации для эндпоинтов чтения
+
+    То же, что authenticate_user, но пользователь загружается
+    в сессии для чтения (db_helper.read_session_dependency).
+    FastAPI кэширует зависимость в пределах запроса, поэтому
+    аутентификация и эндпоинт работают в одной сессии и занимают
+    одно соединение - с реплики или с основной бд.
+    """
+
+    return await _authenticate(
+        request=request, response=response, session=session, api_key=api_key
+    )
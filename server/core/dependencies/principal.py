@@ -0,0 +1,66 @@
+from dataclasses import dataclass
+
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from server.core.config import settings
+from server.core.models import Users
+from server.utils.ttl_cache import TTLCache
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    """Аутентифицированный пользователь текущего запроса
+
+    Облегчённая замена объекта Users: содержит только те данные,
+    которые нужны эндпоинтам, и не привязана к сессии базы данных.
+    """
+
+    id: int
+    name: str
+
+
+# Кэш аутентифицированных пользователей: дайджест api_key -> Principal
+#
+# Записи сбрасываются при изменении пользователей через сессию
+# (ORM и запросы update()/delete() к таблице users). Изменения в обход
+# сессий приложения (например, ротация api_key скриптом напрямую в бд)
+# видны не позже чем через principal_cache_ttl секунд - это верхняя
+# граница устаревания; такие места записи должны вызывать
+# invalidate_principal сами.
+principal_cache: TTLCache[str, Principal] = TTLCache(
+    name="principal",
+    maxsize=settings.auth.principal_cache_size,
+    ttl=settings.auth.principal_cache_ttl,
+)
+
+
+def invalidate_principal(user_id: int) -> None:
+    """Удаление пользователя из кэша аутентифицированных пользователей"""
+
+    principal_cache.delete_where(lambda _, principal: principal.id == user_id)
+
+
+@event.listens_for(Users, "after_update")
+@event.listens_for(Users, "after_delete")
+def _invalidate_changed_user(mapper, connection, target: Users) -> None:
+    """Сброс кэша при изменении или удалении пользователя через ORM"""
+
+    invalidate_principal(user_id=target.id)
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _invalidate_bulk_changed_users(orm_execute_state: ORMExecuteState) -> None:
+    """Сброс кэша при запросах update()/delete() к таблице users,
+    выполненных через сессию
+
+    Какие пользователи изменены, по условию запроса не определить,
+    поэтому кэш очищается целиком.
+    """
+
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+
+    table = getattr(orm_execute_state.statement, "table", None)
+    if table is not None and table.name == Users.__tablename__:
+        principal_cache.clear()
@@ -0,0 +1,126 @@
+from typing import Iterable
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram
+from prometheus_client.core import GaugeMetricFamily
+from prometheus_client.registry import Collector
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import Pool, QueuePool
+
+# Метрики регистрируются в реестре prometheus_client по умолчанию,
+# поэтому отдаются тем же эндпоинтом /metrics, что и метрики Instrumentator
+
+CACHE_HITS = Counter(
+    name="cache_hits_total",
+    documentation="Количество попаданий в in-process кэш",
+    labelnames=("cache",),
+)
+CACHE_MISSES = Counter(
+    name="cache_misses_total",
+    documentation="Количество промахов in-process кэша",
+    labelnames=("cache",),
+)
+CACHE_EVICTIONS = Counter(
+    name="cache_evictions_total",
+    documentation="Количество вытесненных из in-process кэша записей "
+    "(по переполнению или истечению TTL)",
+    labelnames=("cache",),
+)
+
+WORKER_POOL_IN_FLIGHT = Gauge(
+    name="worker_pool_in_flight",
+    documentation="Количество задач в пуле воркеров "
+    "(выполняемых и ожидающих в очереди)",
+    labelnames=("pool",),
+)
+WORKER_POOL_QUEUE_DEPTH = Gauge(
+    name="worker_pool_queue_depth",
+    documentation="Количество задач, ожидающих свободного воркера",
+    labelnames=("pool",),
+)
+
+MEDIA_ORPHANS_RECLAIMED = Counter(
+    name="media_orphans_reclaimed_total",
+    documentation="Количество удалённых медиа, которые так и не были "
+    "привязаны к твиту",
+)
+MEDIA_FILES_DELETED = Counter(
+    name="media_files_deleted_total",
+    documentation="Количество медиа-файлов (вместе с копиями), "
+    "удалённых с диска фоновой задачей",
+)
+MEDIA_BYTES_RECLAIMED = Counter(
+    name="media_bytes_reclaimed_total",
+    documentation="Объём медиа-файлов (вместе с копиями) в байтах, "
+    "удалённых с диска фоновой задачей",
+)
+
+DB_POOL_WAIT = Histogram(
+    name="db_pool_wait_seconds",
+    documentation="Время ожидания соединения из пула базы данных",
+    labelnames=("pool",),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+DB_REQUEST_QUERIES = Histogram(
+    name="db_request_queries",
+    documentation="Количество SQL-запросов, выполненных "
+    "при обработке одного HTTP-запроса",
+    labelnames=("method", "handler"),
+    buckets=(0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50, 100),
+)
+DB_REQUEST_SECONDS = Histogram(
+    name="db_request_seconds",
+    documentation="Суммарное время выполнения SQL-запросов "
+    "при обработке одного HTTP-запроса",
+    labelnames=("method", "handler"),
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+
+
+class DbPoolCollector(Collector):
+    """Состояние пулов соединений с базой данных на момент сбора метрик
+
+    Значения читаются из самих пулов при запросе /metrics,
+    поэтому не требуют обновления на каждое соединение.
+    Хранятся движки, а не пулы: engine.dispose() заменяет пул
+    движка новым, и метрики должны читаться из текущего.
+    """
+
+    def __init__(self):
+        self._engines: dict[str, AsyncEngine] = {}
+
+    def register_engine(self, name: str, engine: AsyncEngine) -> None:
+        self._engines[name] = engine
+
+    def collect(self) -> Iterable[GaugeMetricFamily]:
+        size = GaugeMetricFamily(
+            "db_pool_size",
+            "Количество постоянных соединений в пуле",
+            labels=("pool",),
+        )
+        checked_out = GaugeMetricFamily(
+            "db_pool_checked_out",
+            "Количество выданных из пула соединений",
+            labels=("pool",),
+        )
+        overflow = GaugeMetricFamily(
+            "db_pool_overflow",
+            "Количество соединений, открытых сверх размера пула "
+            "(отрицательное - ещё не открытые постоянные соединения)",
+            labels=("pool",),
+        )
+
+        for name, engine in self._engines.items():
+            pool: Pool = engine.pool
+            if isinstance(pool, QueuePool):
+                size.add_metric((name,), pool.size())
+                checked_out.add_metric((name,), pool.checkedout())
+                overflow.add_metric((name,), pool.overflow())
+
+        yield size
+        yield checked_out
+        yield overflow
+
+
+DB_POOLS = DbPoolCollector()
+REGISTRY.register(DB_POOLS)
@@ -1,9 +1,11 @@
 from fastapi import FastAPI
 
 from .log_new_request import log_new_requests
+from .track_queries import TrackQueriesMiddleware
 
 
 def register_middlewares(app: FastAPI):
     """Регистрирует middlewares в приложении FastAPI"""
 
     app.middleware("http")(log_new_requests)
+    app.add_middleware(TrackQueriesMiddleware)
@@ -0,0 +1,36 @@
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from server.core.metrics import DB_REQUEST_QUERIES, DB_REQUEST_SECONDS
+from server.utils.query_stats import QueryStats, track_queries
+
+
+class TrackQueriesMiddleware:
+    """Подсчёт SQL-запросов и их суммарного времени на один HTTP-запрос
+
+    Значения записываются в гистограммы db_request_queries
+    и db_request_seconds с меткой шаблона пути эндпоинта (handler),
+    как у метрик Instrumentator.
+
+    Реализован как чистый ASGI-middleware: в отличие от
+    app.middleware("http") (BaseHTTPMiddleware) не запускает
+    эндпоинт в отдельной задаче и не оборачивает тело ответа.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats: QueryStats
+        with track_queries() as stats:
+            await self.app(scope, receive, send)
+
+        # Маршрут записывается роутером в тот же scope
+        route = scope.get("route")
+        handler: str = getattr(route, "path", "none")
+        method: str = scope["method"]
+        DB_REQUEST_QUERIES.labels(method, handler).observe(stats.count)
+        DB_REQUEST_SECONDS.labels(method, handler).observe(stats.duration)
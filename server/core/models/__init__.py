@@ -6,6 +6,8 @@ __all__ = (
     "Tweets",
     "Likes",
     "Medias",
+    "PendingDeletions",
+    "Timelines",
     "followers_association_table",
 )
 
@@ -15,3 +17,5 @@ from .model_users import Users, followers_association_table
 from .model_tweets import Tweets
 from .model_likes import Likes
 from .model_medias import Medias
+from .model_pending_deletions import PendingDeletions
+from .model_timelines import Timelines
@@ -1,12 +1,47 @@
-from typing import AsyncGenerator
+import itertools
+import time
+from typing import Any, AsyncGenerator, Sequence
 
+from fastapi import Request
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 
 from server.core.config import settings
+from server.core.metrics import DB_POOL_WAIT, DB_POOLS
+from server.utils.hashed_api_key import digest_api_key
+from server.utils.query_stats import instrument_engine
+from server.utils.ttl_cache import TTLCache
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Пул соединений, замеряющий время ожидания соединения
+
+    Время выдачи соединения (включая ожидание свободного
+    и открытие нового) отдаётся в Prometheus с меткой pool=<pool_name>.
+    """
+
+    pool_name: str = "default"
+
+    def recreate(self) -> "TimedQueuePool":
+        pool = super().recreate()
+        pool.pool_name = self.pool_name  # type: ignore[attr-defined]
+        return pool  # type: ignore[return-value]
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.labels(pool=self.pool_name).observe(
+                time.perf_counter() - started
+            )
 
 
 class DatabaseHelper:
@@ -15,33 +50,196 @@ class DatabaseHelper:
 
     Обеспечивает управления подключениями к БД и сессиями
     SQLAlchemy в асинхронном режиме.
+
+    Помимо основной бд может работать с репликами для чтения:
+    сессии для чтения выдаются по очереди из реплик, запись
+    всегда идёт в основную бд.
     """
 
-    def __init__(self, url: str, echo: bool = False):
+    def __init__(
+        self,
+        url: str,
+        echo: bool = False,
+        name: str = "default",
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        pool_timeout: float = 30,
+        pool_recycle: int = -1,
+        pool_pre_ping: bool = False,
+        connect_args: dict[str, Any] | None = None,
+        replica_urls: Sequence[str] = (),
+        read_your_writes_window: float = 5,
+    ):
         """Инициализирует асинхронное подключение к БД
         и фабрику сессий
+
+        Параметры пула передаются в TimedQueuePool, состояние пула
+        отдаётся в Prometheus с меткой pool=<name> (для реплик -
+        pool=<name>_replica_<номер>).
         """
-        self.engine = create_async_engine(
-            url=url,
-            echo=echo,
-        )
+        self.name = name
+        self._engine_options: dict[str, Any] = {
+            "echo": echo,
+            "poolclass": TimedQueuePool,
+            "pool_size": pool_size,
+            "max_overflow": max_overflow,
+            "pool_timeout": pool_timeout,
+            "pool_recycle": pool_recycle,
+            "pool_pre_ping": pool_pre_ping,
+            "connect_args": connect_args or {},
+        }
+
+        self.engine: AsyncEngine = self._create_engine(url=url, name=name)
+
+        # События сессий вешаются на синхронную фабрику:
+        # после фиксации записи клиент закрепляется за основной бд
+        sync_session_factory = sessionmaker()
+        event.listen(sync_session_factory, "after_commit", self._after_commit)
+
         self.session_factory = async_sessionmaker(
             bind=self.engine,
             autoflush=False,
             autocommit=False,
             expire_on_commit=False,
+            sync_session_class=sync_session_factory,
+        )
+
+        self.replica_engines: list[AsyncEngine] = [
+            self._create_engine(url=replica_url, name=f"{name}_replica_{idx}")
+            for idx, replica_url in enumerate(replica_urls)
+        ]
+        self.replica_session_factories: list[async_sessionmaker] = [
+            async_sessionmaker(
+                bind=replica_engine,
+                autoflush=False,
+                autocommit=False,
+                expire_on_commit=False,
+            )
+            for replica_engine in self.replica_engines
+        ]
+        self._replicas = itertools.cycle(self.replica_session_factories)
+
+        # Клиенты, недавно выполнившие запись: дайджест api_key -> True
+        self._recent_writers: TTLCache[str, bool] = TTLCache(
+            name=f"{name}_recent_writers",
+            maxsize=100_000,
+            ttl=read_your_writes_window,
         )
 
-    async def session_dependency(self) -> AsyncGenerator[AsyncSession, None]:
+    def _create_engine(self, url: str, name: str) -> AsyncEngine:
+        """Создание движка с пулом соединений, отдающим метрики,
+        и подсчётом SQL-запросов (см. utils/query_stats.py)
+        """
+
+        engine = create_async_engine(url=url, **self._engine_options)
+        engine.pool.pool_name = name  # type: ignore[attr-defined]
+        DB_POOLS.register_engine(name=name, engine=engine)
+        instrument_engine(engine)
+        return engine
+
+    @staticmethod
+    def _client_key(request: Request) -> str | None:
+        """Ключ клиента для read-your-writes - дайджест его api_key"""
+
+        api_key: str | None = request.headers.get("api-key")
+        if not api_key:
+            return None
+        return digest_api_key(api_key=api_key)
+
+    def _is_recent_writer(self, request: Request) -> bool:
+        """Выполнял ли клиент запись в последние
+        read_your_writes_window секунд
+        """
+
+        client_key: str | None = self._client_key(request)
+        if client_key is None:
+            return False
+        return self._recent_writers.get(client_key) is not None
+
+    def _after_commit(self, session: Session) -> None:
+        """Закрепление клиента за основной бд после записи"""
+
+        client_key: str | None = session.info.get("client_key")
+        if client_key is not None:
+            self._recent_writers.set(client_key, True)
+
+    async def session_dependency(
+        self, request: Request
+    ) -> AsyncGenerator[AsyncSession, None]:
         """Генератор асинхронных сессий для
         использования в FastAPI Depends
+
+        Сессия создаётся одна на запрос и хранится в request.state:
+        зависимость аутентификации и эндпоинт работают в одной сессии
+        (одном identity map), даже если зависимость объявлена
+        с use_cache=False.
         """
+        state_key = f"db_session_{self.name}"
+        session: AsyncSession | None = getattr(request.state, state_key, None)
+        if session is not None:
+            yield session
+            return
+
         async with self.session_factory() as session:
+            session.info["client_key"] = self._client_key(request)
+            setattr(request.state, state_key, session)
+            try:
+                yield session
+            finally:
+                delattr(request.state, state_key)
+                await session.close()
+
+    def session_factory_dependency(self) -> async_sessionmaker[AsyncSession]:
+        """Фабрика сессий для использования в FastAPI Depends
+
+        Нужна фоновым задачам эндпоинтов (BackgroundTasks): они
+        выполняются после закрытия сессии запроса и открывают
+        собственные сессии.
+        """
+        return self.session_factory
+
+    async def read_session_dependency(
+        self, request: Request
+    ) -> AsyncGenerator[AsyncSession, None]:
+        """Генератор асинхронных сессий только для чтения для
+        использования в FastAPI Depends
+
+        Сессия открывается на одной из реплик (по очереди).
+        Основная бд используется, если реплик нет или клиент
+        выполнял запись в последние db_read_your_writes_window
+        секунд - так он сразу видит свои изменения, несмотря
+        на отставание реплик.
+
+        Закрепление за основной бд хранится в памяти процесса.
+        """
+        has_replicas: bool = bool(self.replica_session_factories)
+        if not has_replicas or self._is_recent_writer(request):
+            async for session in self.session_dependency(request):
+                yield session
+            return
+
+        async with next(self._replicas)() as session:
             yield session
             await session.close()
 
+    async def dispose(self) -> None:
+        """Закрытие соединений основной бд и реплик"""
+
+        await self.engine.dispose()
+        for replica_engine in self.replica_engines:
+            await replica_engine.dispose()
+
 
 db_helper = DatabaseHelper(
     url=settings.db.url,
     echo=settings.db.db_echo,
+    name="primary",
+    pool_size=settings.db.db_pool_size,
+    max_overflow=settings.db.db_max_overflow,
+    pool_timeout=settings.db.db_pool_timeout,
+    pool_recycle=settings.db.db_pool_recycle,
+    pool_pre_ping=settings.db.db_pool_pre_ping,
+    connect_args={"statement_cache_size": settings.db.db_statement_cache_size},
+    replica_urls=settings.db.db_replica_urls,
+    read_your_writes_window=settings.db.db_read_your_writes_window,
 )
@@ -21,7 +21,7 @@ class Likes(Base):
     tweet: Mapped[list["Tweets"]] = relationship(
         "Tweets", back_populates="likes"
     )
-    user: Mapped[list["Users"]] = relationship("Users", back_populates="likes")
+    user: Mapped["Users"] = relationship("Users", back_populates="likes")
 
     def __repr__(self):
         return (
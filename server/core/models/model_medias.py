@@ -1,6 +1,7 @@
+from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .model_base import Base
@@ -13,10 +14,22 @@ class Medias(Base):
     __tablename__ = "medias"
 
     media_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
-    media_path: Mapped[str]
+    # Путь до файла зависит только от его содержимого (sha256), поэтому
+    # на один файл может ссылаться несколько записей - индекс нужен
+    # для подсчёта ссылок перед удалением файла
+    media_path: Mapped[str] = mapped_column(index=True)
     tweet_id: Mapped[int | None] = mapped_column(
         ForeignKey(column="tweets.tweet_id")
     )
+    # Пути до уменьшенных и WebP-копий медиа: {"webp": ..., "w320": ...}
+    # Заполняется в фоне после загрузки (см. utils/media_variants.py)
+    variants: Mapped[dict[str, str] | None] = mapped_column(JSON)
+    # Время загрузки: медиа, не привязанные к твиту дольше
+    # media_orphan_grace_period, удаляются фоновой задачей
+    # (с часовым поясом: сравнивается с текущим временем в UTC)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
 
     tweet: Mapped[list["Tweets"]] = relationship(
         "Tweets", back_populates="medias"
@@ -28,3 +41,25 @@ class Medias(Base):
             f"media_path={self.media_path}, "
             f"tweet_id={self.tweet_id}"
         )
+
+
+# Частичный индекс для поиска брошенных медиа (tweet_id IS NULL)
+# в порядке загрузки: привязанные к твитам медиа в него не попадают,
+# поэтому его размер зависит только от количества брошенных загрузок
+Index(
+    "ix_medias_orphans_created_at",
+    Medias.created_at,
+    postgresql_where=Medias.tweet_id.is_(None),
+    sqlite_where=Medias.tweet_id.is_(None),
+)
+
+
+# Частичный индекс для выборки медиа твитов (подгрузка медиа
+# страницы ленты, удаление твита): брошенные медиа без твита
+# в него не попадают
+Index(
+    "ix_medias_tweet_id",
+    Medias.tweet_id,
+    postgresql_where=Medias.tweet_id.is_not(None),
+    sqlite_where=Medias.tweet_id.is_not(None),
+)
@@ -0,0 +1,33 @@
+from datetime import datetime
+
+from sqlalchemy import DateTime, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .model_base import Base
+
+
+class PendingDeletions(Base):
+    """Очередь медиа-файлов на удаление с диска
+
+    Запись добавляется в той же транзакции, что и удаление записей
+    Medias, а сами файлы удаляются фоновой задачей (см. utils/media_sweeper),
+    поэтому запрос не ждёт файловой системы, а путь не теряется
+    при падении процесса.
+    """
+
+    __tablename__ = "pending_deletions"
+
+    id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
+    # Индекс нужен загрузке того же содержимого: она удаляет путь
+    # из очереди (см. crud_medias._claim_media_path)
+    media_path: Mapped[str] = mapped_column(index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now()
+    )
+
+    def __repr__(self):
+        return (
+            f"PendingDeletion: id={self.id}, "
+            f"media_path={self.media_path}, "
+            f"created_at={self.created_at}"
+        )
@@ -0,0 +1,24 @@
+from sqlalchemy import ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .model_base import Base
+
+
+class Timelines(Base):
+    """Материализованная лента: id твитов, попадающих
+    в ленту пользователя owner_id
+    """
+
+    __tablename__ = "timelines"
+
+    owner_id: Mapped[int] = mapped_column(
+        ForeignKey(column="users.id", ondelete="CASCADE"), primary_key=True
+    )
+    tweet_id: Mapped[int] = mapped_column(
+        ForeignKey(column="tweets.tweet_id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+    def __repr__(self):
+        return f"Timeline: owner_id={self.owner_id}, tweet_id={self.tweet_id}"
@@ -1,6 +1,6 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import ForeignKey, String
+from sqlalchemy import ForeignKey, Index, String, false
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .model_base import Base
@@ -17,10 +17,14 @@ class Tweets(Base):
     tweet_id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     tweet_data: Mapped[str] = mapped_column(String(100))
     user_id: Mapped[int] = mapped_column(ForeignKey(column="users.id"))
-
-    user: Mapped[list["Users"]] = relationship(
-        "Users", back_populates="tweets"
+    like_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    # Разослан ли твит в ленты подписчиков при записи (fan-out-on-write);
+    # остальные твиты добавляются в ленты при чтении (см. crud_timelines)
+    fanned_out: Mapped[bool] = mapped_column(
+        default=False, server_default=false()
     )
+
+    user: Mapped["Users"] = relationship("Users", back_populates="tweets")
     likes: Mapped[list["Likes"]] = relationship(
         "Likes", back_populates="tweet", cascade="all, delete-orphan"
     )
@@ -32,5 +36,28 @@ class Tweets(Base):
         return (
             f"Tweet: id={self.tweet_id}, "
             f"tweet_data={self.tweet_data}, "
-            f"user_id={self.user_id}"
+            f"user_id={self.user_id}, "
+            f"like_count={self.like_count}, "
+            f"fanned_out={self.fanned_out}"
         )
+
+
+# Индекс для ленты твитов: выборка твитов набора авторов
+# в порядке убывания популярности (like_count DESC, tweet_id)
+Index(
+    "ix_tweets_user_id_like_count",
+    Tweets.user_id,
+    Tweets.like_count.desc(),
+    Tweets.tweet_id,
+)
+
+
+# Частичный индекс неразосланных твитов: по нему при чтении
+# материализованной ленты выбираются авторы, твиты которых
+# добавляются в ленту при чтении (crud_timelines.get_pull_author_ids)
+Index(
+    "ix_tweets_user_id_not_fanned_out",
+    Tweets.user_id,
+    postgresql_where=Tweets.fanned_out.is_(False),
+    sqlite_where=Tweets.fanned_out.is_(False),
+)
@@ -1,6 +1,13 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, ForeignKey, String, Table, UniqueConstraint
+from sqlalchemy import (
+    Column,
+    ForeignKey,
+    Index,
+    String,
+    Table,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .model_base import Base
@@ -18,6 +25,14 @@ followers_association_table = Table(
     UniqueConstraint(
         "follower_id", "following_id", name="unique_user_followers"
     ),
+    # Обратное направление первичного ключа: подписчики пользователя
+    # (страница подписчиков, их количество, рассылка твитов в ленты)
+    # выбираются только по индексу, без обращения к таблице
+    Index(
+        "ix_followers_association_following_id_follower_id",
+        "following_id",
+        "follower_id",
+    ),
 )
 
 
@@ -27,6 +42,9 @@ class Users(Base):
     id: Mapped[int] = mapped_column(primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(30))
     api_key: Mapped[str] = mapped_column(String(60), unique=True)
+    api_key_digest: Mapped[str | None] = mapped_column(
+        String(64), unique=True, index=True
+    )
 
     tweets: Mapped[list["Tweets"]] = relationship(
         "Tweets", back_populates="user", cascade="all, delete-orphan"
@@ -46,7 +64,6 @@ class Users(Base):
         primaryjoin=(followers_association_table.c.follower_id == id),
         secondaryjoin=(followers_association_table.c.following_id == id),
         back_populates="followers",
-        lazy="selectin",
     )
 
     def __repr__(self):
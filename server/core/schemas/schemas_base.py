@@ -38,8 +38,10 @@ class BadRequestErrorResponse(BaseErrorResponse):
     """Схема для ответа API, когда сервер не может обработать
     запрос из-за ошибок на стороне клиента
 
-    Используется в эндпоинте:
+    Используется в эндпоинтах:
     - POST /api/medias - загрузить медиа-файлы
+    - GET /api/tweets - получить информацию о всех твитах
+    (при передаче повреждённого курсора пагинации)
     """
 
     error_type: int = Field(
@@ -117,6 +119,24 @@ class ForbiddenErrorResponse(BaseErrorResponse):
     )
 
 
+class PayloadTooLargeErrorResponse(BaseErrorResponse):
+    """Схема для ответа API при неуспешном запросе,
+    когда размер загружаемого файла превышает допустимый
+
+    Используется в эндпоинтах:
+    - POST /api/medias - загрузить медиа-файлы
+    """
+
+    error_type: int = Field(
+        description="Статус код ошибки",
+        default=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+    error_message: str = Field(
+        description="Сообщение об ошибке",
+        examples=["File is too large! Maximum size: 10485760 bytes"],
+    )
+
+
 class ValidationErrorResponse(BaseErrorResponse):
     """Схема для ответа API при неуспешном запросе,
     когда данные невалидны, т.е. не удовлетворяют
@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
@@ -20,3 +22,66 @@ class BaseLikes(BaseModel):
     @classmethod
     def get_user_data(cls, data):
         return {"id": data.user.id, "name": data.user.name}
+
+
+class LikeAction(BaseModel):
+    """Вложенная схема с действием над лайком в пакете"""
+
+    tweet_id: int = Field(
+        description="Уникальный идентификатор твита",
+        ge=1,
+        examples=[1],
+    )
+    action: Literal["like", "unlike"] = Field(
+        description="Поставить (like) или убрать (unlike) лайк",
+        examples=["like"],
+    )
+
+
+class LikesBatchCreate(BaseModel):
+    """Схема для запроса к API при применении пакета лайков
+
+    Используется в эндпоинтах:
+    - POST /api/tweets/likes/batch - применить пакет лайков
+    """
+
+    actions: list[LikeAction] = Field(
+        description="Действия в порядке их совершения",
+        min_length=1,
+        max_length=100,
+    )
+
+
+class LikeActionResult(BaseModel):
+    """Вложенная схема с результатом действия над лайком"""
+
+    tweet_id: int = Field(
+        description="Уникальный идентификатор твита",
+        examples=[1],
+    )
+    action: Literal["like", "unlike"] = Field(
+        description="Итоговое действие для твита (последнее в пакете)",
+        examples=["like"],
+    )
+    status: Literal["applied", "unchanged", "not_found"] = Field(
+        description="applied - применено, unchanged - лайк уже был "
+        "в нужном состоянии, not_found - твита нет",
+        examples=["applied"],
+    )
+
+
+class LikesBatchRead(BaseModel):
+    """Схема для ответа API при применении пакета лайков
+
+    Используется в эндпоинтах:
+    - POST /api/tweets/likes/batch - применить пакет лайков
+    """
+
+    result: bool = Field(
+        description="Результат успешного ответа",
+        default=True,
+        examples=[True],
+    )
+    results: list[LikeActionResult] = Field(
+        description="Результат для каждого твита из пакета"
+    )
@@ -1,3 +1,6 @@
+from typing import Sequence, TypedDict
+
+import orjson
 from pydantic import (
     BaseModel,
     ConfigDict,
@@ -5,7 +8,7 @@ from pydantic import (
     field_validator,
 )
 
-from server.core.models import Medias
+from server.core.models import Medias, Tweets
 
 from .schemas_likes import BaseLikes
 from .schemas_users import BaseUser
@@ -29,6 +32,22 @@ class BaseTweet(BaseModel):
         serialization_alias="attachments",
         examples=[["/home/usr/bin/cat.jpg"]],
     )
+    media_variants: list[dict[str, str]] = Field(
+        description="Копии медиа-файлов в том же порядке, что и attachments: "
+        "оригинал (original), WebP в исходном размере (webp) и уменьшенные "
+        "WebP по ширине (w320, w960, ...), если они уже созданы",
+        validation_alias="medias",
+        serialization_alias="attachment_variants",
+        examples=[
+            [
+                {
+                    "original": "/home/usr/bin/cat.jpg",
+                    "webp": "/home/usr/bin/cat_webp.webp",
+                    "w320": "/home/usr/bin/cat_w320.webp",
+                }
+            ]
+        ],
+    )
     user: BaseUser = Field(
         description="Информация о пользователе-авторе твита",
         serialization_alias="author",
@@ -49,6 +68,13 @@ class BaseTweet(BaseModel):
     def get_fields(cls, data: list[Medias]):
         return [media.media_path for media in data]
 
+    @field_validator("media_variants", mode="before")
+    def get_variants(cls, data: list[Medias]):
+        return [
+            {"original": media.media_path, **(media.variants or {})}
+            for media in data
+        ]
+
 
 class TweetsRead(BaseModel):
     """Схема для ответа API при запросе информации о твите
@@ -63,6 +89,88 @@ class TweetsRead(BaseModel):
         examples=[True],
     )
     tweets: list[BaseTweet] = Field(description="Полная информация о твите")
+    next_cursor: str | None = Field(
+        description="Курсор для запроса следующей страницы ленты "
+        "(None, если страница последняя)",
+        default=None,
+        examples=["MTI6NDI"],
+    )
+
+
+class BaseUserDict(TypedDict):
+    """Автор твита или лайка в ответе (сериализованный BaseUser)"""
+
+    id: int
+    name: str
+
+
+class BaseLikesDict(TypedDict):
+    """Лайк в ответе (сериализованный BaseLikes)"""
+
+    user_id: int
+    name: str
+
+
+# Ключи в ответе отличаются от имён полей BaseTweet (serialization_alias),
+# поэтому используется функциональный синтаксис TypedDict
+BaseTweetDict = TypedDict(
+    "BaseTweetDict",
+    {
+        "id": int,
+        "content": str,
+        "attachments": list[str],
+        "attachment_variants": list[dict[str, str]],
+        "author": BaseUserDict,
+        "likes": list[BaseLikesDict],
+    },
+)
+
+
+class TweetsReadDict(TypedDict):
+    """Ответ API при запросе ленты (сериализованный TweetsRead)"""
+
+    result: bool
+    tweets: list[BaseTweetDict]
+    next_cursor: str | None
+
+
+def dump_tweets_read(
+    tweets: Sequence[Tweets], next_cursor: str | None
+) -> bytes:
+    """Сериализация страницы ленты в JSON без валидации Pydantic
+
+    Ответ собирается напрямую из атрибутов загруженных объектов
+    Tweets и кодируется orjson. Результат побайтово совпадает
+    с сериализацией TweetsRead (те же ключи в том же порядке),
+    поэтому при изменении схем TweetsRead, BaseTweet, BaseUser
+    и BaseLikes функцию нужно изменить вместе с ними.
+
+    Используется в эндпоинте:
+    - GET /api/tweets - получить информацию о всех твитах
+    """
+
+    page: TweetsReadDict = {
+        "result": True,
+        "tweets": [
+            {
+                "id": tweet.tweet_id,
+                "content": tweet.tweet_data,
+                "attachments": [media.media_path for media in tweet.medias],
+                "attachment_variants": [
+                    {"original": media.media_path, **(media.variants or {})}
+                    for media in tweet.medias
+                ],
+                "author": {"id": tweet.user.id, "name": tweet.user.name},
+                "likes": [
+                    {"user_id": like.user.id, "name": like.user.name}
+                    for like in tweet.likes
+                ],
+            }
+            for tweet in tweets
+        ],
+        "next_cursor": next_cursor,
+    }
+    return orjson.dumps(page)
 
 
 class TweetCreate(BaseModel):
@@ -1,4 +1,6 @@
-from pydantic import BaseModel, Field
+from typing import Literal
+
+from pydantic import BaseModel, Field, computed_field
 
 
 class BaseUser(BaseModel):
@@ -29,6 +31,37 @@ class BaseUserFollowers(BaseUser):
         examples=[[{"id": 3, "name": "Ivan Volkov"}]],
     )
 
+    @computed_field(  # type: ignore[prop-decorator]
+        description="Количество пользователей, которые подписаны на текущего"
+    )
+    @property
+    def followers_count(self) -> int:
+        return len(self.followers)
+
+    @computed_field(  # type: ignore[prop-decorator]
+        description="Количество пользователей, на которых подписан текущий"
+    )
+    @property
+    def following_count(self) -> int:
+        return len(self.following)
+
+
+class BaseUserCounts(BaseUser):
+    """Вложенная схема с количеством подписчиков и подписок
+    пользователя (компактный профиль без списков)
+    """
+
+    followers_count: int = Field(
+        description="Количество пользователей, которые подписаны на текущего",
+        ge=0,
+        examples=[1],
+    )
+    following_count: int = Field(
+        description="Количество пользователей, на которых подписан текущий",
+        ge=0,
+        examples=[1],
+    )
+
 
 class UserRead(BaseModel):
     """Схема для ответа API при запросе информации о пользователе
@@ -46,3 +79,112 @@ class UserRead(BaseModel):
     user: BaseUserFollowers = Field(
         description="Полная информация о пользователе"
     )
+
+
+class UserCompactRead(BaseModel):
+    """Схема для ответа API при запросе компактной информации
+    о пользователе (compact=true): вместо списков подписчиков
+    и подписок передаётся только их количество
+
+    Используется в эндпоинтах:
+    - GET /api/users/me - получить информацию о себе
+    - GET /api/users/{user_id} - получить информацию о пользователе по его id
+    """
+
+    result: bool = Field(
+        description="Результат успешного ответа",
+        default=True,
+        examples=[True],
+    )
+    user: BaseUserCounts = Field(
+        description="Информация о пользователе без списков подписок"
+    )
+
+
+class UsersPageRead(BaseModel):
+    """Схема для ответа API при запросе страницы
+    подписчиков или подписок пользователя
+
+    Используется в эндпоинтах:
+    - GET /api/users/{user_id}/followers - получить подписчиков
+    - GET /api/users/{user_id}/following - получить подписки
+    """
+
+    result: bool = Field(
+        description="Результат успешного ответа",
+        default=True,
+        examples=[True],
+    )
+    users: list[BaseUser] = Field(
+        description="Пользователи, отсортированные по id"
+    )
+    next_cursor: str | None = Field(
+        description="Курсор для запроса следующей страницы "
+        "(None, если страница последняя)",
+        default=None,
+        examples=["Mg"],
+    )
+
+
+class FollowAction(BaseModel):
+    """Вложенная схема с действием над подпиской в пакете"""
+
+    user_id: int = Field(
+        description="Уникальный идентификатор пользователя в системе",
+        ge=1,
+        examples=[2],
+    )
+    action: Literal["follow", "unfollow"] = Field(
+        description="Подписаться (follow) или отписаться (unfollow)",
+        examples=["follow"],
+    )
+
+
+class FollowsBatchCreate(BaseModel):
+    """Схема для запроса к API при применении пакета подписок
+
+    Используется в эндпоинтах:
+    - POST /api/users/follow/batch - применить пакет подписок
+    """
+
+    actions: list[FollowAction] = Field(
+        description="Действия в порядке их совершения",
+        min_length=1,
+        max_length=100,
+    )
+
+
+class FollowActionResult(BaseModel):
+    """Вложенная схема с результатом действия над подпиской"""
+
+    user_id: int = Field(
+        description="Уникальный идентификатор пользователя в системе",
+        examples=[2],
+    )
+    action: Literal["follow", "unfollow"] = Field(
+        description="Итоговое действие для пользователя "
+        "(последнее в пакете)",
+        examples=["follow"],
+    )
+    status: Literal["applied", "unchanged", "not_found"] = Field(
+        description="applied - применено, unchanged - подписка уже была "
+        "в нужном состоянии, not_found - пользователя нет",
+        examples=["applied"],
+    )
+
+
+class FollowsBatchRead(BaseModel):
+    """Схема для ответа API при применении пакета подписок
+
+    Используется в эндпоинтах:
+    - POST /api/users/follow/batch - применить пакет подписок
+    """
+
+    result: bool = Field(
+        description="Результат успешного ответа",
+        default=True,
+        examples=[True],
+    )
+    results: list[FollowActionResult] = Field(
+        description="Результат для каждого пользователя из пакета"
+    )
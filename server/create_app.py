@@ -1,9 +1,11 @@
+import asyncio
 import logging
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
 from typing import Any, AsyncGenerator
 
 from fastapi import FastAPI
 from prometheus_fastapi_instrumentator import Instrumentator
+from sqlalchemy.exc import SQLAlchemyError
 
 from server.api.routes import router
 from server.core.config import settings
@@ -11,6 +13,14 @@ from server.core.middlewares import register_middlewares
 from server.core.models import db_helper
 from server.error_handlers import register_errors_handlers
 from server.utils.create_mock_data import create_mock_data
+from server.utils.hashed_api_key import hash_pool
+from server.utils.like_buffer import (
+    like_buffer,
+    like_buffer_enabled,
+    run_like_flusher,
+)
+from server.utils.media_sweeper import run_media_sweeper
+from server.utils.media_variants import media_pool
 
 logging.basicConfig(level=logging.INFO, format=settings.logging.log_format)
 
@@ -23,12 +33,43 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
 
     Выполняет:
     1. Инициализацию тестовых данных при старте (create_mock_data)
-    2. Корректное освобождение ресурсов БД при завершении
+    и запуск фоновой сборки мусора медиа-файлов (media_sweeper)
+    2. Восстановление буфера лайков из журнала и запуск его фоновой
+    записи в бд (like_flusher), если буфер включён
+    3. Запись оставшихся в буфере лайков и корректное освобождение
+    ресурсов БД и пулов воркеров (bcrypt, обработка изображений)
+    при завершении
     """
 
     await create_mock_data()
+    background_tasks = [
+        asyncio.create_task(
+            run_media_sweeper(session_factory=db_helper.session_factory)
+        )
+    ]
+    if like_buffer_enabled():
+        recovered: int = await like_buffer.recover()
+        if recovered:
+            log.info("Recovered %s like events from journal", recovered)
+        background_tasks.append(
+            asyncio.create_task(
+                run_like_flusher(session_factory=db_helper.session_factory)
+            )
+        )
     yield
-    await db_helper.engine.dispose()
+    for task in background_tasks:
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+    if like_buffer_enabled():
+        try:
+            await like_buffer.flush(session_factory=db_helper.session_factory)
+        except (SQLAlchemyError, OSError):
+            log.exception("Like buffer flush failed, events kept in journal")
+        like_buffer.close()
+    await db_helper.dispose()
+    hash_pool.shutdown()
+    media_pool.shutdown()
 
 
 def create_app() -> FastAPI:
@@ -1,14 +1,22 @@
-from typing import Sequence
-
 from sqlalchemy import Result, select
 
 from server.core.models import Users, db_helper
 
-from .hashed_api_key import hash_api_key, validate_api_key
+from .hashed_api_key import (
+    digest_api_key,
+    hash_api_key_async,
+    validate_api_key_async,
+)
 
 
 async def create_mock_data() -> None:
-    """Создаёт тестовых пользователей, если их нет в базе"""
+    """Создаёт тестовых пользователей, если их нет в базе
+
+    Пользователи ищутся по имени, а не по api_key: в базах, созданных
+    до появления api_key_digest, у них ещё нет дайджеста, и поиск
+    по api_key создавал бы их повторно. Таким пользователям дайджест
+    заполняется сразу - исходный api_key здесь известен.
+    """
 
     mock_users = [
         {"name": "Ivan Volkov", "api_key": "test"},
@@ -16,31 +24,28 @@ async def create_mock_data() -> None:
     ]
 
     async with db_helper.session_factory() as session:
-        db_response: Result = await session.execute(select(Users))
-        db_users: Sequence[Users] = db_response.scalars().all()
-
-        if db_users:
-            for mock_user in mock_users:
-                user_exists = False
-
-                for db_user in db_users:
-                    if validate_api_key(
-                        api_key=mock_user["api_key"],
-                        hashed_api_key=db_user.api_key,
-                    ):
-                        user_exists = True
-                        break
-
-                if not user_exists:
-                    hashed_api_key = hash_api_key(api_key=mock_user["api_key"])
-                    user = Users(
-                        name=mock_user["name"], api_key=hashed_api_key
-                    )
-                    session.add(user)
-                    await session.commit()
-        else:
-            for mock_user in mock_users:
-                hashed_api_key = hash_api_key(api_key=mock_user["api_key"])
-                user = Users(name=mock_user["name"], api_key=hashed_api_key)
+        for mock_user in mock_users:
+            api_key: str = mock_user["api_key"]
+            stmt = (
+                select(Users)
+                .where(Users.name == mock_user["name"])
+                .order_by(Users.id)
+                .limit(1)
+            )
+            db_response: Result = await session.execute(stmt)
+            db_user: Users | None = db_response.scalar_one_or_none()
+
+            if not db_user:
+                user = Users(
+                    name=mock_user["name"],
+                    api_key=await hash_api_key_async(api_key=api_key),
+                    api_key_digest=digest_api_key(api_key=api_key),
+                )
                 session.add(user)
                 await session.commit()
+            elif db_user.api_key_digest is None:
+                if await validate_api_key_async(
+                    api_key=api_key, hashed_api_key=db_user.api_key
+                ):
+                    db_user.api_key_digest = digest_api_key(api_key=api_key)
+                    await session.commit()
@@ -0,0 +1,38 @@
+import base64
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(*values: int) -> str:
+    """Кодирование значений ключа сортировки в непрозрачный
+    для клиента курсор пагинации
+    """
+
+    raw_cursor: str = ":".join(str(value) for value in values)
+
+    return base64.urlsafe_b64encode(raw_cursor.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> tuple[int, ...]:
+    """Декодирование курсора пагинации в значения ключа сортировки
+
+    Если курсор повреждён или содержит не size значений -
+    возникает ошибка.
+    """
+
+    try:
+        padding: str = "=" * (-len(cursor) % 4)
+        raw_cursor: str = base64.urlsafe_b64decode(cursor + padding).decode()
+        values: tuple[int, ...] = tuple(
+            int(value) for value in raw_cursor.split(":")
+        )
+    except ValueError:
+        values = ()
+
+    if len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor '{cursor}'!",
+        )
+
+    return values
@@ -0,0 +1,56 @@
+from fastapi import Request, Response, status
+
+# Описание ответа 304 для документации эндпоинтов с ETag
+NOT_MODIFIED_RESPONSE = {
+    "description": "Данные не изменились с версии из If-None-Match"
+}
+
+
+def make_etag(version: str) -> str:
+    """Строгий ETag из версии ресурса"""
+
+    return f'"{version}"'
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    """Совпадает ли ETag с одним из переданных в If-None-Match
+
+    Для If-None-Match используется слабое сравнение:
+    префикс W/ не учитывается.
+    """
+
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    return any(
+        candidate.strip().removeprefix("W/") == etag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(
+    request: Request, response: Response, version: str
+) -> Response | None:
+    """Проверка условного GET-запроса
+
+    Заголовки ETag и Cache-Control записываются в ответ эндпоинта.
+    Если у клиента уже есть текущая версия ресурса - возвращается
+    ответ 304 без тела (с заголовками ответа эндпоинта), иначе None.
+
+    Тело ответа с этим ETag должно быть прочитано с учётом всех
+    изменений, вошедших в версию: если версия изменилась недавно
+    (crud_feed_cache.ResourceVersion.fresh), эндпоинт читает данные
+    из основной бд, а не с реплики.
+    """
+
+    etag: str = make_etag(version)
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(
+            status_code=status.HTTP_304_NOT_MODIFIED, headers=response.headers
+        )
+    return None
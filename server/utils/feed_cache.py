@@ -0,0 +1,149 @@
+import time
+import uuid
+from abc import ABC, abstractmethod
+from typing import Iterable
+
+from server.utils.ttl_cache import TTLCache
+
+try:
+    from redis import asyncio as aioredis  # type: ignore[import-untyped]
+except ImportError:
+    aioredis = None  # type: ignore[assignment]
+
+
+class FeedCache(ABC):
+    """Хранилище готовых (сериализованных) страниц ленты
+    и версий данных, из которых они собраны
+
+    Страницы не удаляются при изменениях: при записи увеличивается
+    версия автора или читателя, и ключ страницы, в который входят
+    версии, меняется - старые страницы вытесняются по TTL.
+
+    Версии начинаются с нуля, поэтому вместе с ними используется
+    эпоха хранилища - она меняется, если версии были потеряны
+    (перезапуск процесса, очистка Redis).
+
+    Вместе с версией сохраняется время её последнего увеличения
+    (time.time()): по нему видно, могли ли изменения ещё не дойти
+    до реплик бд.
+    """
+
+    @abstractmethod
+    async def get_epoch(self) -> str:
+        """Идентификатор текущего набора версий"""
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        """Получение страницы по ключу"""
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        """Сохранение страницы по ключу"""
+
+    @abstractmethod
+    async def get_versions(self, names: list[str]) -> list[int]:
+        """Текущие версии в том же порядке, что и names"""
+
+    @abstractmethod
+    async def get_changed_at(self, names: list[str]) -> float:
+        """Время последнего увеличения любой из версий names
+        (0, если они не увеличивались)
+        """
+
+    @abstractmethod
+    async def bump_versions(self, names: Iterable[str]) -> None:
+        """Увеличение версий"""
+
+
+class MemoryFeedCache(FeedCache):
+    """Страницы и версии хранятся в памяти процесса
+
+    Страницы - в LRU-кэше с TTL. Подходит только
+    для одного процесса приложения.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._pages: TTLCache[str, bytes] = TTLCache(
+            name="feed_pages", maxsize=maxsize, ttl=ttl
+        )
+        self._versions: dict[str, int] = {}
+        self._changed_at: dict[str, float] = {}
+        self._epoch: str = uuid.uuid4().hex
+
+    def clear(self) -> None:
+        self._pages.clear()
+        self._versions.clear()
+        self._changed_at.clear()
+        self._epoch = uuid.uuid4().hex
+
+    async def get_epoch(self) -> str:
+        return self._epoch
+
+    async def get(self, key: str) -> bytes | None:
+        return self._pages.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._pages.set(key, value)
+
+    async def get_versions(self, names: list[str]) -> list[int]:
+        return [self._versions.get(name, 0) for name in names]
+
+    async def get_changed_at(self, names: list[str]) -> float:
+        return max(
+            (self._changed_at.get(name, 0.0) for name in names), default=0.0
+        )
+
+    async def bump_versions(self, names: Iterable[str]) -> None:
+        changed_at: float = time.time()
+        for name in names:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            self._changed_at[name] = changed_at
+
+
+class RedisFeedCache(FeedCache):
+    """Страницы и версии хранятся в Redis (или совместимом сервере)
+
+    Общий кэш для всех процессов приложения: версии увеличиваются
+    через INCR, страницы хранятся с временем жизни ttl.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        self._redis = aioredis.from_url(url)
+        self._ttl_ms = int(ttl * 1000)
+
+    async def get_epoch(self) -> str:
+        epoch: bytes | None = await self._redis.get("feed:epoch")
+        if epoch is None:
+            await self._redis.set("feed:epoch", uuid.uuid4().hex, nx=True)
+            epoch = await self._redis.get("feed:epoch")
+        return epoch.decode() if epoch else ""
+
+    async def get(self, key: str) -> bytes | None:
+        return await self._redis.get(f"feed:page:{key}")
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self._redis.set(f"feed:page:{key}", value, px=self._ttl_ms)
+
+    async def get_versions(self, names: list[str]) -> list[int]:
+        if not names:
+            return []
+        values = await self._redis.mget(
+            [f"feed:version:{name}" for name in names]
+        )
+        return [int(value or 0) for value in values]
+
+    async def get_changed_at(self, names: list[str]) -> float:
+        if not names:
+            return 0.0
+        values = await self._redis.mget(
+            [f"feed:changed_at:{name}" for name in names]
+        )
+        return max(float(value or 0) for value in values)
+
+    async def bump_versions(self, names: Iterable[str]) -> None:
+        changed_at: float = time.time()
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.incr(f"feed:version:{name}")
+                pipe.set(f"feed:changed_at:{name}", changed_at)
+            await pipe.execute()
@@ -1,5 +1,11 @@
+import hashlib
+import hmac
+
 import bcrypt
 
+from server.core.config import settings
+from server.utils.worker_pool import WorkerPool
+
 
 def hash_api_key(api_key: str) -> str:
     """Создаёт хэш api_key с генерацией соли"""
@@ -17,3 +23,39 @@ def validate_api_key(api_key: str, hashed_api_key: str) -> bool:
         password=api_key.encode(),
         hashed_password=hashed_api_key.encode(),
     )
+
+
+def digest_api_key(api_key: str) -> str:
+    """Создаёт детерминированный дайджест api_key (HMAC-SHA256)
+
+    В отличие от bcrypt-хэша, дайджест одинаков для одного и того же
+    api_key, поэтому по нему можно искать пользователя через индекс.
+    Проверка api_key по-прежнему выполняется через validate_api_key.
+    """
+
+    return hmac.new(
+        key=settings.auth.api_key_secret.encode(),
+        msg=api_key.encode(),
+        digestmod=hashlib.sha256,
+    ).hexdigest()
+
+
+# Пул воркеров для bcrypt: хэширование занимает десятки миллисекунд
+# и не должно блокировать event loop
+hash_pool = WorkerPool(
+    name="bcrypt",
+    max_workers=settings.auth.hash_workers,
+    executor_type=settings.auth.hash_executor,
+)
+
+
+async def hash_api_key_async(api_key: str) -> str:
+    """Асинхронный вариант hash_api_key, выполняемый в пуле воркеров"""
+
+    return await hash_pool.run(hash_api_key, api_key)
+
+
+async def validate_api_key_async(api_key: str, hashed_api_key: str) -> bool:
+    """Асинхронный вариант validate_api_key, выполняемый в пуле воркеров"""
+
+    return await hash_pool.run(validate_api_key, api_key, hashed_api_key)
@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import os
+from contextlib import asynccontextmanager, suppress
+from itertools import islice
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Callable, Iterable, Literal
+
+import orjson
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.api.crud import crud_likes
+from server.core.config import settings
+
+log = logging.getLogger(__name__)
+
+LikeEventAction = Literal["like", "unlike"]
+
+
+class LikeBuffer:
+    """Буфер отложенной записи лайков (write-behind)
+
+    События лайков и удалений лайков подтверждаются сразу:
+    событие дописывается в журнал на диске и сохраняется в памяти,
+    где для каждой пары (tweet_id, user_id) остаётся последнее
+    действие - серия лайков и удалений одного пользователя
+    к одному твиту записывается в бд одной строкой.
+
+    flush записывает накопленные события в бд пачками
+    по max_events. После фиксации каждой пачки журнал
+    перезаписывается оставшимися событиями, поэтому после падения
+    процесса recover восстанавливает все незаписанные события
+    (а повторная запись уже записанных ничего не меняет).
+
+    Файловые операции с журналом выполняются в отдельном потоке
+    и по очереди (_journal_lock), чтобы не блокировать event loop.
+    """
+
+    def __init__(
+        self, journal_path: Path, max_events: int, fsync: bool = False
+    ) -> None:
+        self.journal_path = journal_path
+        self.max_events = max_events
+        self.fsync = fsync
+        self.flush_needed = asyncio.Event()
+
+        self._pending: dict[tuple[int, int], str] = {}
+        self._journal: BinaryIO | None = None
+        self._journal_lock = asyncio.Lock()
+        self._flush_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def _open_journal(self) -> BinaryIO:
+        """Журнал, открытый на дозапись без буферизации"""
+
+        if self._journal is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._journal = open(self.journal_path, "ab", buffering=0)
+        return self._journal
+
+    @staticmethod
+    def _journal_line(
+        tweet_id: int, user_id: int, action: LikeEventAction | str
+    ) -> bytes:
+        return orjson.dumps([tweet_id, user_id, action]) + b"\n"
+
+    def _append_journal(self, line: bytes) -> None:
+        """Дозапись события в журнал (блокирующая функция)"""
+
+        journal: BinaryIO = self._open_journal()
+        journal.write(line)
+        if self.fsync:
+            os.fsync(journal.fileno())
+
+    def _write_journal(self, lines: list[bytes]) -> None:
+        """Атомарная замена журнала строками lines (блокирующая функция)"""
+
+        self.close()
+        tmp_path = self.journal_path.with_name(f"{self.journal_path.name}.tmp")
+        with open(tmp_path, "wb") as tmp_file:
+            tmp_file.writelines(lines)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, self.journal_path)
+
+    def _read_journal(self) -> list[bytes]:
+        """Строки журнала (блокирующая функция)"""
+
+        if not self.journal_path.exists():
+            return []
+        with open(self.journal_path, "rb") as journal:
+            return journal.readlines()
+
+    async def _rewrite_journal(self) -> None:
+        """Замена журнала текущими событиями буфера"""
+
+        async with self._journal_lock:
+            lines: list[bytes] = [
+                self._journal_line(tweet_id, user_id, action)
+                for (tweet_id, user_id), action in self._pending.items()
+            ]
+            await asyncio.to_thread(self._write_journal, lines)
+
+    async def add(
+        self, tweet_id: int, user_id: int, action: LikeEventAction
+    ) -> None:
+        """Приём события: запись в журнал и в буфер
+
+        Событие попадает в буфер под той же блокировкой, что и запись
+        в журнал, поэтому перезапись журнала его не потеряет.
+        Когда в буфере набирается max_events событий,
+        фоновая задача получает сигнал flush_needed.
+        """
+
+        line: bytes = self._journal_line(tweet_id, user_id, action)
+        async with self._journal_lock:
+            await asyncio.to_thread(self._append_journal, line)
+            self._pending[(tweet_id, user_id)] = action
+
+        if len(self._pending) >= self.max_events:
+            self.flush_needed.set()
+
+    async def recover(self) -> int:
+        """Восстановление буфера из журнала после перезапуска
+
+        Недописанная при падении последняя строка пропускается.
+        Журнал сжимается до последнего действия для каждой пары.
+        Возвращает количество восстановленных событий.
+        """
+
+        lines: list[bytes] = await asyncio.to_thread(self._read_journal)
+        if not lines:
+            return 0
+
+        for line in lines:
+            try:
+                tweet_id, user_id, action = orjson.loads(line)
+            except (orjson.JSONDecodeError, ValueError):
+                log.warning("Skipping corrupted like journal line")
+                continue
+            self._pending[(tweet_id, user_id)] = action
+
+        await self._rewrite_journal()
+        return len(self._pending)
+
+    @asynccontextmanager
+    async def bypass(
+        self, pairs: Iterable[tuple[int, int]]
+    ) -> AsyncIterator[None]:
+        """Прямая запись лайков в бд в обход буфера
+
+        Ожидающие в буфере события к парам (tweet_id, user_id) из pairs
+        старше прямой записи, поэтому удаляются из буфера и журнала.
+        Пока выполняется блок, буфер не записывается в бд: пачка,
+        которая уже записывается, завершится до удаления событий,
+        а новые события к тем же парам запишутся после блока.
+
+        Используется в эндпоинте:
+        - POST /api/tweets/likes/batch - применить пакет лайков
+        """
+
+        async with self._flush_lock:
+            dropped: list[tuple[int, int]] = [
+                pair
+                for pair in set(pairs)
+                if self._pending.pop(pair, None) is not None
+            ]
+            if dropped:
+                await self._rewrite_journal()
+            yield
+
+    async def flush(self, session_factory: Callable[[], AsyncSession]) -> int:
+        """Запись буфера в бд пачками по max_events событий
+
+        Каждая пачка - отдельная транзакция (crud_likes.apply_like_events).
+        События, пришедшие во время записи, остаются в буфере
+        и в журнале. Если запись не удалась, пачка возвращается
+        в буфер (более новые события к тем же парам не затираются).
+        Возвращает количество записанных событий.
+        """
+
+        flushed: int = 0
+        async with self._flush_lock:
+            while self._pending:
+                batch: dict[tuple[int, int], str] = dict(
+                    islice(self._pending.items(), self.max_events)
+                )
+                for pair in batch:
+                    del self._pending[pair]
+
+                try:
+                    async with session_factory() as session:
+                        await crud_likes.apply_like_events(
+                            session=session, events=batch
+                        )
+                except BaseException:
+                    self._pending = {**batch, **self._pending}
+                    raise
+
+                flushed += len(batch)
+                await self._rewrite_journal()
+
+        self.flush_needed.clear()
+        return flushed
+
+    def close(self) -> None:
+        """Закрытие файла журнала"""
+
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+
+like_buffer = LikeBuffer(
+    journal_path=settings.like_buffer.like_buffer_journal_path,
+    max_events=settings.like_buffer.like_buffer_max_events,
+    fsync=settings.like_buffer.like_buffer_fsync,
+)
+
+
+def like_buffer_enabled() -> bool:
+    """Включён ли буфер отложенной записи лайков"""
+    return settings.like_buffer.like_buffer_enabled
+
+
+async def run_like_flusher(
+    session_factory: Callable[[], AsyncSession],
+) -> None:
+    """Фоновая задача: запись буфера лайков в бд каждые
+    like_buffer_flush_interval секунд или сразу при заполнении буфера
+
+    Запускается и останавливается в lifespan приложения.
+    Любая ошибка записи только логируется, события остаются в буфере.
+    """
+
+    while True:
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                like_buffer.flush_needed.wait(),
+                timeout=settings.like_buffer.like_buffer_flush_interval,
+            )
+
+        try:
+            await like_buffer.flush(session_factory=session_factory)
+        except Exception:  # noqa: PIE786 - задача не должна завершаться
+            log.exception("Like buffer flush failed")
+            await asyncio.sleep(
+                settings.like_buffer.like_buffer_flush_interval
+            )
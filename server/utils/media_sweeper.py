@@ -0,0 +1,60 @@
+import asyncio
+import logging
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.api.crud import crud_medias
+from server.core.config import settings
+
+log = logging.getLogger(__name__)
+
+
+async def sweep_medias(session_factory: Callable[[], AsyncSession]) -> None:
+    """Один проход сборки мусора медиа-файлов
+
+    1. Удаление брошенных медиа (загружены, но не привязаны к твиту)
+    пачками, пока они не закончатся
+    2. Удаление файлов из очереди pending_deletions пачками,
+    пока очередь не опустеет
+
+    Каждая пачка - отдельная транзакция, поэтому блокировки
+    и объём одной транзакции ограничены media_sweep_batch_size.
+    """
+
+    batch_size: int = settings.media.media_sweep_batch_size
+
+    async with session_factory() as session:
+        reclaimed: int = batch_size
+        while reclaimed == batch_size:
+            reclaimed = await crud_medias.reclaim_orphan_medias(
+                session=session,
+                grace_period=settings.media.media_orphan_grace_period,
+                batch_size=batch_size,
+            )
+
+        swept: int = batch_size
+        while swept == batch_size:
+            swept = await crud_medias.sweep_pending_deletions(
+                session=session, batch_size=batch_size
+            )
+
+
+async def run_media_sweeper(
+    session_factory: Callable[[], AsyncSession],
+) -> None:
+    """Фоновая задача: сборка мусора медиа-файлов
+    каждые media_sweep_interval секунд
+
+    Запускается и останавливается в lifespan приложения.
+    Любая ошибка прохода только логируется, чтобы задача
+    не завершилась до остановки приложения.
+    """
+
+    while True:
+        try:
+            await sweep_medias(session_factory=session_factory)
+        except Exception:  # noqa: PIE786 - задача не должна завершаться
+            log.exception("Media sweep failed")
+
+        await asyncio.sleep(settings.media.media_sweep_interval)
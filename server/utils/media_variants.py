@@ -0,0 +1,129 @@
+import logging
+import uuid
+from pathlib import Path
+from typing import Callable
+
+from PIL import Image, ImageOps
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.api.crud import crud_feed_cache
+from server.core.config import settings
+from server.core.models import Medias
+from server.utils.worker_pool import WorkerPool
+
+log = logging.getLogger(__name__)
+
+# Пул воркеров для обработки изображений, чтобы декодирование
+# и сжатие не блокировали event loop
+media_pool = WorkerPool(
+    name="media",
+    max_workers=settings.media.media_workers,
+    executor_type=settings.media.media_executor,
+)
+
+
+def get_variant_path(file_path: Path, name: str) -> Path:
+    """Путь до копии медиа-файла: рядом с оригиналом,
+    имя - sha256 оригинала и название копии
+    """
+
+    return file_path.with_name(f"{file_path.stem}_{name}.webp")
+
+
+def get_variant_paths(file_path: Path) -> list[Path]:
+    """Существующие на диске копии медиа-файла"""
+
+    return sorted(file_path.parent.glob(f"{file_path.stem}_*.webp"))
+
+
+def render_variants(
+    file_path: str, widths: list[int], quality: int
+) -> dict[str, str]:
+    """Создание WebP-копии изображения в исходном размере
+    и уменьшенных по ширине WebP-копий
+
+    Копии шире исходного изображения не создаются. Уже существующие
+    копии (тот же файл загружен повторно) не пересоздаются.
+
+    Выполняется в пуле воркеров (блокирующая функция).
+    """
+
+    source = Path(file_path)
+    variants: dict[str, str] = {}
+
+    with Image.open(source) as opened_image:
+        image = ImageOps.exif_transpose(opened_image)
+        image = image.convert("RGBA" if image.has_transparency_data else "RGB")
+
+        targets: list[tuple[str, int]] = [("webp", image.width)]
+        targets.extend(
+            (f"w{width}", width)
+            for width in sorted(widths)
+            if width < image.width
+        )
+
+        for name, width in targets:
+            variant_path: Path = get_variant_path(source, name)
+            if not variant_path.exists():
+                variant = image
+                if width != image.width:
+                    height: int = max(
+                        1, round(image.height * width / image.width)
+                    )
+                    variant = image.resize(
+                        (width, height), Image.Resampling.LANCZOS
+                    )
+
+                temp_path = variant_path.with_name(f".{uuid.uuid4().hex}.part")
+                variant.save(temp_path, format="WEBP", quality=quality)
+                temp_path.replace(variant_path)
+
+            variants[name] = str(variant_path)
+
+    return variants
+
+
+async def generate_variants(
+    session_factory: Callable[[], AsyncSession],
+    media_id: int,
+    media_path: str,
+    author_id: int,
+) -> None:
+    """Фоновое создание копий загруженного медиа и сохранение
+    их путей в Medias.variants
+
+    После сохранения устаревают закэшированные страницы лент
+    с твитами автора медиа - в них появляются пути до копий.
+
+    Запускается после отправки ответа на загрузку медиа, когда сессия
+    запроса уже закрыта, поэтому открывает собственную сессию.
+    Ошибки обработки (повреждённый файл) только логируются -
+    в ленте в таком случае отдаётся оригинал.
+
+    Используется в эндпоинте:
+    - POST /api/medias - загрузить медиа-файлы
+    """
+
+    try:
+        variants: dict[str, str] = await media_pool.run(
+            render_variants,
+            media_path,
+            settings.media.media_variant_widths,
+            settings.media.media_webp_quality,
+        )
+    except (OSError, ValueError, Image.DecompressionBombError):
+        log.warning(
+            "Failed to generate variants for media %s", media_id, exc_info=True
+        )
+        return
+
+    stmt = (
+        update(Medias)
+        .where(Medias.media_id == media_id)
+        .values(variants=variants)
+    )
+    async with session_factory() as session:
+        await session.execute(stmt)
+        await session.commit()
+    await crud_feed_cache.invalidate_authors(author_id)
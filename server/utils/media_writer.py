@@ -1,12 +1,22 @@
-import random
-from datetime import datetime
+import contextlib
+import hashlib
+import uuid
 from pathlib import Path
+from typing import Awaitable, Callable, NamedTuple, NoReturn
 
 import aiofiles
 import aiofiles.os
 from fastapi import HTTPException, UploadFile, status
 
-from server.core.config import BASE_MEDIAS_DIR, MEDIAS_ALLOWED_EXT
+from server.core.config import BASE_MEDIAS_DIR, MEDIAS_ALLOWED_EXT, settings
+
+
+class StreamedMedia(NamedTuple):
+    """Медиа-файл, скопированный во временный файл"""
+
+    temp_path: Path
+    size: int
+    sha256: str
 
 
 async def create_medias_directory(path: Path) -> None:
@@ -27,64 +37,124 @@ async def validate_media(file_name: str) -> None:
         )
 
 
-async def generate_media_file_name(file_name: str) -> str:
-    """Генерация уникального названия для медиа-файла"""
+def get_media_path(sha256: str, file_name: str, path_to_save: Path) -> Path:
+    """Путь до медиа-файла по sha256 его содержимого
+
+    Файлы раскладываются по поддиректориям из первых символов
+    хэша (ab/cd/abcd...ext), чтобы в одной директории не копились
+    сотни тысяч файлов. Одинаковое содержимое всегда получает
+    один и тот же путь, поэтому файл по пути никогда не меняется.
+    """
 
     file_ext = Path(file_name).suffix.lower()
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    random_num = random.randint(1, 10_000)
 
-    return f"{timestamp}_{random_num}{file_ext}"
+    return path_to_save / sha256[:2] / sha256[2:4] / f"{sha256}{file_ext}"
+
+
+def raise_media_too_large(max_size: int) -> NoReturn:
+    """Ошибка превышения максимального размера медиа-файла"""
+
+    raise HTTPException(
+        status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+        detail=f"File is too large! Maximum size: {max_size} bytes",
+    )
+
+
+async def stream_media(
+    file: UploadFile,
+    path_to_save: Path,
+    max_size: int | None = None,
+    chunk_size: int | None = None,
+) -> StreamedMedia:
+    """Копирование медиа блоками во временный файл в директории
+    path_to_save с подсчётом размера и sha256 содержимого
+
+    Если размер файла известен заранее и превышает max_size -
+    файл отклоняется без записи, иначе запись прерывается
+    на первом блоке сверх max_size, а временный файл удаляется.
+    """
+
+    max_size = max_size or settings.media.media_max_size
+    chunk_size = chunk_size or settings.media.media_chunk_size
+
+    if file.size is not None and file.size > max_size:
+        raise_media_too_large(max_size)
+
+    temp_path: Path = path_to_save / f".{uuid.uuid4().hex}.part"
+    sha256 = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(temp_path, mode="wb") as media_file:
+            while chunk := await file.read(chunk_size):
+                size += len(chunk)
+                if size > max_size:
+                    raise_media_too_large(max_size)
+                sha256.update(chunk)
+                await media_file.write(chunk)
+    except BaseException:
+        with contextlib.suppress(FileNotFoundError):
+            await aiofiles.os.remove(temp_path)
+        raise
+
+    return StreamedMedia(
+        temp_path=temp_path, size=size, sha256=sha256.hexdigest()
+    )
 
 
 async def save_media(
-    file: UploadFile, path_to_save: Path = BASE_MEDIAS_DIR
+    file: UploadFile,
+    path_to_save: Path | None = None,
+    before_replace: Callable[[Path], Awaitable[None]] | None = None,
 ) -> Path | None:
     """Сохранение медиа
 
     1. Проверка на существование директории для хранения медиа,
     иначе - её создание
     2. Валидация медиа по расширению
-    3. Генерация уникального названия медиа-файла
-    4. Сохранение медиа
+    3. Потоковое копирование медиа во временный файл
+    с подсчётом sha256 содержимого
+    4. Атомарное переименование временного файла в путь по sha256 -
+    в директории никогда не появляется частично записанный медиа-файл
+    5. Если файл с таким содержимым уже сохранён - он заменяется
+    тем же содержимым (файл остаётся один), а не пропускается: так файл
+    восстанавливается, если его одновременно удаляет фоновая задача
+
+    before_replace вызывается с итоговым путём перед переименованием -
+    через него create_media дожидается, пока фоновая задача закончит
+    удалять файл по этому пути (см. crud_medias.create_media).
+
+    По умолчанию медиа сохраняются в BASE_MEDIAS_DIR (значение читается
+    при вызове - тесты подменяют директорию через monkeypatch).
     """
 
+    path_to_save = path_to_save or BASE_MEDIAS_DIR
     if not await aiofiles.os.path.exists(path_to_save):
         await create_medias_directory(path_to_save)
 
-    await validate_media(file_name=file.filename)
-    new_file_name: str = await generate_media_file_name(
-        file_name=file.filename
-    )
-
-    file_path: Path = path_to_save / new_file_name
+    file_name: str = file.filename or ""
+    await validate_media(file_name=file_name)
 
     try:
-        file_bytes: bytes = await file.read()
-        async with aiofiles.open(file_path, mode="wb") as media_file:
-            await media_file.write(file_bytes)
-    except Exception as exc:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error while saving a media file: {exc}",
+        streamed_media: StreamedMedia = await stream_media(
+            file=file, path_to_save=path_to_save
         )
-
-    return file_path
-
-
-async def delete_media(file_path: Path) -> None:
-    """Удаление медиа из директории, где они хранятся"""
-
-    if not file_path.exists():
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"File not found: {file_path}",
+        file_path: Path = get_media_path(
+            sha256=streamed_media.sha256,
+            file_name=file_name,
+            path_to_save=path_to_save,
         )
 
-    try:
-        file_path.unlink()
+        if before_replace is not None:
+            await before_replace(file_path)
+        await create_medias_directory(file_path.parent)
+        await aiofiles.os.replace(streamed_media.temp_path, file_path)
+    except HTTPException:
+        raise
     except Exception as exc:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error while deletion a media file: {exc}",
+            detail=f"Error while saving a media file: {exc}",
         )
+
+    return file_path
@@ -0,0 +1,91 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, ExecutionContext
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+@dataclass(slots=True)
+class QueryStats:
+    """Количество и суммарное время SQL-запросов
+
+    Статистика вложенного подсчёта (например, HTTP-запроса внутри
+    теста) учитывается и во всех внешних (parent).
+    """
+
+    count: int = 0
+    duration: float = 0
+    parent: "QueryStats | None" = None
+
+
+# Статистика текущего подсчёта: контекст копируется в задачи asyncio
+# и в greenlet SQLAlchemy, поэтому события движка видят объект,
+# созданный в middleware обрабатываемого запроса
+_current_stats: ContextVar[QueryStats | None] = ContextVar(
+    "query_stats", default=None
+)
+
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Подсчёт SQL-запросов, выполненных внутри блока
+    (во всех движках, подключённых через instrument_engine)
+    """
+
+    stats = QueryStats(parent=_current_stats.get())
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+def _before_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    stats: QueryStats | None = _current_stats.get()
+    while stats is not None:
+        stats.count += 1
+        stats = stats.parent
+    conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: Connection,
+    cursor: Any,
+    statement: str,
+    parameters: Any,
+    context: ExecutionContext,
+    executemany: bool,
+) -> None:
+    duration: float = time.perf_counter() - conn.info["query_started_at"].pop()
+    stats: QueryStats | None = _current_stats.get()
+    while stats is not None:
+        stats.duration += duration
+        stats = stats.parent
+
+
+def _handle_error(exception_context: Any) -> None:
+    """Запрос с ошибкой не доходит до after_cursor_execute"""
+
+    conn: Connection | None = exception_context.connection
+    if conn is not None and conn.info.get("query_started_at"):
+        conn.info["query_started_at"].pop()
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """Подключение подсчёта SQL-запросов и их времени к движку"""
+
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
@@ -0,0 +1,253 @@
+import heapq
+from abc import ABC, abstractmethod
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    delete,
+    insert,
+    literal,
+    or_,
+    select,
+    union_all,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from server.core.config import settings
+from server.core.models import Timelines, Tweets, followers_association_table
+
+
+class TimelineStore(ABC):
+    """Хранилище материализованных лент пользователей
+
+    Лента пользователя - это множество id твитов его самого
+    и разосланных твитов (Tweets.fanned_out) авторов, на которых
+    он подписан. Порядок выдачи задаётся при чтении запросом
+    к таблице Tweets.
+    """
+
+    @abstractmethod
+    async def push(self, session: AsyncSession, tweet: Tweets) -> None:
+        """Добавление нового твита в ленту автора и, если твит
+        разослан (Tweets.fanned_out), в ленты подписчиков автора
+        """
+
+    @abstractmethod
+    async def remove_tweet(self, session: AsyncSession, tweet_id: int) -> None:
+        """Удаление твита из всех лент"""
+
+    @abstractmethod
+    async def add_author(
+        self, session: AsyncSession, owner_id: int, author_id: int
+    ) -> None:
+        """Добавление разосланных твитов автора в ленту пользователя
+        (подписка)
+        """
+
+    @abstractmethod
+    async def remove_author(
+        self, session: AsyncSession, owner_id: int, author_id: int
+    ) -> None:
+        """Удаление всех твитов автора из ленты пользователя (отписка)"""
+
+    @abstractmethod
+    async def tweet_filter(
+        self, session: AsyncSession, owner_id: int
+    ) -> ColumnElement[bool]:
+        """Условие для выборки твитов из ленты пользователя"""
+
+
+class DbTimelineStore(TimelineStore):
+    """Ленты хранятся в таблице timelines
+
+    Лента читается по первичному ключу (owner_id, tweet_id) -
+    одним диапазоном индекса вместо IN-списка по авторам.
+    """
+
+    async def push(self, session: AsyncSession, tweet: Tweets) -> None:
+        # Ленты подписчиков заполняются одним INSERT ... SELECT,
+        # без загрузки списка подписчиков в процесс
+        owners: list[Select] = [
+            select(literal(tweet.user_id), literal(tweet.tweet_id))
+        ]
+        if tweet.fanned_out:
+            owners.append(
+                select(
+                    followers_association_table.c.follower_id,
+                    literal(tweet.tweet_id),
+                ).where(
+                    followers_association_table.c.following_id == tweet.user_id
+                )
+            )
+        await session.execute(
+            insert(Timelines).from_select(
+                ["owner_id", "tweet_id"], union_all(*owners)
+            )
+        )
+
+    async def remove_tweet(self, session: AsyncSession, tweet_id: int) -> None:
+        await session.execute(
+            delete(Timelines).where(Timelines.tweet_id == tweet_id)
+        )
+
+    async def add_author(
+        self, session: AsyncSession, owner_id: int, author_id: int
+    ) -> None:
+        already_stored = select(Timelines.tweet_id).where(
+            Timelines.owner_id == owner_id
+        )
+        tweets = select(literal(owner_id), Tweets.tweet_id).where(
+            Tweets.user_id == author_id,
+            Tweets.fanned_out.is_(True),
+            Tweets.tweet_id.not_in(already_stored),
+        )
+        await session.execute(
+            insert(Timelines).from_select(["owner_id", "tweet_id"], tweets)
+        )
+
+    async def remove_author(
+        self, session: AsyncSession, owner_id: int, author_id: int
+    ) -> None:
+        author_tweets = select(Tweets.tweet_id).where(
+            Tweets.user_id == author_id
+        )
+        await session.execute(
+            delete(Timelines).where(
+                Timelines.owner_id == owner_id,
+                Timelines.tweet_id.in_(author_tweets),
+            )
+        )
+
+    async def tweet_filter(
+        self, session: AsyncSession, owner_id: int
+    ) -> ColumnElement[bool]:
+        timeline = select(Timelines.tweet_id).where(
+            Timelines.owner_id == owner_id
+        )
+        return Tweets.tweet_id.in_(timeline)
+
+
+class MemoryTimelineStore(TimelineStore):
+    """Ленты хранятся в памяти процесса
+
+    Лента пользователя загружается из бд при первом чтении,
+    до этого записи в неё пропускаются. Подходит только
+    для одного процесса приложения.
+
+    Лента передаётся в запрос списком id, поэтому в ней хранятся
+    только timeline_memory_max_size последних твитов. Лента
+    сортируется по лайкам только среди них: более старый популярный
+    твит из неё выпадает. Обрезать ленту по самой сортировке ленты
+    нельзя - счётчики лайков меняются в обход хранилища, а новый
+    твит без лайков оказывался бы последним и сразу удалялся.
+    """
+
+    def __init__(self):
+        self._timelines: dict[int, set[int]] = {}
+        self._authors: dict[int, int] = {}
+
+    def clear(self) -> None:
+        self._timelines.clear()
+        self._authors.clear()
+
+    @staticmethod
+    def _trim(timeline: set[int]) -> None:
+        """Удаление из ленты самых старых твитов сверх максимального размера"""
+
+        max_size: int = settings.timeline.timeline_memory_max_size
+        excess: int = len(timeline) - max_size
+        if excess > 0:
+            timeline.difference_update(heapq.nsmallest(excess, timeline))
+
+    async def push(self, session: AsyncSession, tweet: Tweets) -> None:
+        if not self._timelines:
+            return
+
+        owner_ids: list[int] = [tweet.user_id]
+        if tweet.fanned_out:
+            stmt = select(followers_association_table.c.follower_id).where(
+                followers_association_table.c.following_id == tweet.user_id
+            )
+            owner_ids.extend((await session.scalars(stmt)).all())
+
+        for owner_id in owner_ids:
+            timeline = self._timelines.get(owner_id)
+            if timeline is not None:
+                timeline.add(tweet.tweet_id)
+                self._authors[tweet.tweet_id] = tweet.user_id
+                self._trim(timeline)
+
+    async def remove_tweet(self, session: AsyncSession, tweet_id: int) -> None:
+        for timeline in self._timelines.values():
+            timeline.discard(tweet_id)
+        self._authors.pop(tweet_id, None)
+
+    async def add_author(
+        self, session: AsyncSession, owner_id: int, author_id: int
+    ) -> None:
+        timeline = self._timelines.get(owner_id)
+        if timeline is None:
+            return
+
+        stmt = (
+            select(Tweets.tweet_id)
+            .where(Tweets.user_id == author_id, Tweets.fanned_out.is_(True))
+            .order_by(Tweets.tweet_id.desc())
+            .limit(settings.timeline.timeline_memory_max_size)
+        )
+        for tweet_id in (await session.scalars(stmt)).all():
+            timeline.add(tweet_id)
+            self._authors[tweet_id] = author_id
+        self._trim(timeline)
+
+    async def remove_author(
+        self, session: AsyncSession, owner_id: int, author_id: int
+    ) -> None:
+        timeline = self._timelines.get(owner_id)
+        if timeline is None:
+            return
+
+        timeline.difference_update(
+            [
+                tweet_id
+                for tweet_id in timeline
+                if self._authors.get(tweet_id) == author_id
+            ]
+        )
+
+    async def tweet_filter(
+        self, session: AsyncSession, owner_id: int
+    ) -> ColumnElement[bool]:
+        timeline = self._timelines.get(owner_id)
+        if timeline is None:
+            timeline = await self._load(session, owner_id)
+        return Tweets.tweet_id.in_(sorted(timeline))
+
+    async def _load(self, session: AsyncSession, owner_id: int) -> set[int]:
+        """Заполнение ленты пользователя из бд по его подпискам"""
+
+        following = select(followers_association_table.c.following_id).where(
+            followers_association_table.c.follower_id == owner_id
+        )
+        stmt = (
+            select(Tweets.tweet_id, Tweets.user_id)
+            .where(
+                or_(
+                    Tweets.user_id == owner_id,
+                    and_(
+                        Tweets.fanned_out.is_(True),
+                        Tweets.user_id.in_(following),
+                    ),
+                )
+            )
+            .order_by(Tweets.tweet_id.desc())
+            .limit(settings.timeline.timeline_memory_max_size)
+        )
+        timeline: set[int] = set()
+        for tweet_id, author_id in (await session.execute(stmt)).all():
+            timeline.add(tweet_id)
+            self._authors[tweet_id] = author_id
+
+        self._timelines[owner_id] = timeline
+        return timeline
@@ -0,0 +1,90 @@
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, TypeVar
+
+from server.core.metrics import CACHE_EVICTIONS, CACHE_HITS, CACHE_MISSES
+
+KT = TypeVar("KT", bound=Hashable)
+VT = TypeVar("VT")
+
+
+class TTLCache(Generic[KT, VT]):
+    """Ограниченный по размеру LRU-кэш с временем жизни записей
+
+    Хранится в памяти процесса. Счётчики попаданий, промахов
+    и вытеснений отдаются в Prometheus с меткой cache=<name>.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        """Инициализирует пустой кэш
+
+        - name - имя кэша для метрик
+        - maxsize - максимальное количество записей
+        - ttl - время жизни записи в секундах
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[KT, tuple[float, VT]] = OrderedDict()
+
+        self._hits = CACHE_HITS.labels(cache=name)
+        self._misses = CACHE_MISSES.labels(cache=name)
+        self._evictions = CACHE_EVICTIONS.labels(cache=name)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: KT) -> VT | None:
+        """Получение значения по ключу
+
+        Если записи нет или её время жизни истекло - возвращается None.
+        """
+
+        item = self._data.get(key)
+        if item is None:
+            self._misses.inc()
+            return None
+
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            self._evictions.inc()
+            self._misses.inc()
+            return None
+
+        self._data.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: KT, value: VT) -> None:
+        """Сохранение значения по ключу
+
+        При переполнении вытесняется давно не использованная запись.
+        """
+
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self._evictions.inc()
+
+    def delete(self, key: KT) -> None:
+        """Удаление записи по ключу"""
+
+        self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[KT, VT], bool]) -> None:
+        """Удаление всех записей, удовлетворяющих условию"""
+
+        keys = [
+            key
+            for key, (_, value) in self._data.items()
+            if predicate(key, value)
+        ]
+        for key in keys:
+            del self._data[key]
+
+    def clear(self) -> None:
+        """Очистка кэша"""
+
+        self._data.clear()
@@ -0,0 +1,21 @@
+from typing import Any, Callable
+
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+_dialect_inserts: dict[str, Callable[..., Any]] = {
+    "postgresql": postgresql.insert,
+    "sqlite": sqlite.insert,
+}
+
+
+def insert_ignore(session: AsyncSession, entity: Any):
+    """INSERT ... ON CONFLICT DO NOTHING для диалекта бд сессии
+
+    Строки, нарушающие уникальность, пропускаются без ошибки -
+    вставленные строки можно получить через RETURNING.
+    Поддерживаются PostgreSQL и SQLite.
+    """
+
+    dialect_name: str = session.get_bind().dialect.name
+    return _dialect_inserts[dialect_name](entity).on_conflict_do_nothing()
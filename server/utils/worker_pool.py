@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from typing import Callable, Literal, TypeVar
+
+from server.core.metrics import WORKER_POOL_IN_FLIGHT, WORKER_POOL_QUEUE_DEPTH
+
+T = TypeVar("T")
+
+
+class WorkerPool:
+    """Ограниченный пул воркеров для выполнения блокирующих
+    (CPU-bound) функций вне event loop
+
+    Количество одновременно выполняемых задач ограничено max_workers,
+    остальные ожидают в очереди. Количество задач в пуле и глубина
+    очереди отдаются в Prometheus с меткой pool=<name>.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        executor_type: Literal["thread", "process"] = "thread",
+    ):
+        """Инициализирует пул, сам executor создаётся при первой задаче"""
+        self.name = name
+        self.max_workers = max_workers
+        self.executor_type = executor_type
+        self._executor: Executor | None = None
+        self._in_flight = 0
+
+        self._in_flight_gauge = WORKER_POOL_IN_FLIGHT.labels(pool=name)
+        self._queue_depth_gauge = WORKER_POOL_QUEUE_DEPTH.labels(pool=name)
+
+    @property
+    def executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_type == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name,
+                )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Выполнение функции в пуле воркеров без блокировки event loop"""
+
+        loop = asyncio.get_running_loop()
+
+        self._in_flight += 1
+        self._update_metrics()
+        try:
+            return await loop.run_in_executor(self.executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            self._update_metrics()
+
+    def shutdown(self) -> None:
+        """Остановка пула с ожиданием завершения запущенных задач"""
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _update_metrics(self) -> None:
+        self._in_flight_gauge.set(self._in_flight)
+        self._queue_depth_gauge.set(max(0, self._in_flight - self.max_workers))
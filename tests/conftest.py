@@ -1,10 +1,14 @@
+from contextlib import contextmanager
 from io import BytesIO
+from typing import Iterator
 
 import pytest
 from fastapi import UploadFile
 from httpx import ASGITransport, AsyncClient
 from sqlalchemy import insert
 
+from server.api.crud.crud_users import following_ids_cache
+from server.core.dependencies.principal import principal_cache
 from server.core.models import (
     Base,
     DatabaseHelper,
@@ -14,7 +18,8 @@ from server.core.models import (
     db_helper,
 )
 from server.main import app
-from server.utils.hashed_api_key import hash_api_key
+from server.utils.hashed_api_key import digest_api_key, hash_api_key
+from server.utils.query_stats import QueryStats, track_queries
 from tests.data.data_db_mock import (
     MEDIAS_DIR,
     medias_correct,
@@ -23,10 +28,31 @@ from tests.data.data_db_mock import (
 )
 
 _db_helper = DatabaseHelper(
-    url="sqlite+aiosqlite:///./tests/data/test.db", echo=True
+    url="sqlite+aiosqlite:///./tests/data/test.db", echo=True, name="test"
 )
 
 
+@contextmanager
+def query_budget(max_queries: int) -> Iterator[QueryStats]:
+    """Проверка бюджета SQL-запросов для запросов к API внутри блока
+
+    Если выполнено больше max_queries запросов - тест падает:
+    так ловятся N+1 и лишние перезагрузки объектов.
+
+    Кэши аутентификации и подписок очищаются перед подсчётом,
+    поэтому бюджет не зависит от порядка выполнения тестов.
+    """
+
+    principal_cache.clear()
+    following_ids_cache.clear()
+    with track_queries() as stats:
+        yield stats
+
+    assert (
+        stats.count <= max_queries
+    ), f"Query budget exceeded: {stats.count} > {max_queries}"
+
+
 @pytest.fixture(scope="session")
 async def create_db():
     """Создание таблиц в тестовой базе данных
@@ -81,6 +107,12 @@ async def client(db_session):
         yield db_session
 
     app.dependency_overrides[db_helper.session_dependency] = override_get_db
+    app.dependency_overrides[db_helper.read_session_dependency] = (
+        override_get_db
+    )
+    app.dependency_overrides[db_helper.session_factory_dependency] = (
+        lambda: _db_helper.session_factory
+    )
 
     async with AsyncClient(
         transport=ASGITransport(app=app), base_url="http://test"
@@ -90,6 +122,53 @@ async def client(db_session):
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+async def replica_client(tmp_path):
+    """Создание тестового клиента, работающего с основной бд
+    и репликой (отдельные файлы SQLite - реплика не получает записи
+    в основную бд, как отстающая реплика)
+
+    В обеих бд создаётся пользователь "reader" с id 1000.
+    Возвращает клиента и DatabaseHelper с основной бд и репликой.
+    """
+
+    helper = DatabaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        name="test_replica_client",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+    )
+    for engine in (helper.engine, *helper.replica_engines):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(Users).values(
+                    id=1000,
+                    name="reader",
+                    api_key=hash_api_key("reader"),
+                    api_key_digest=digest_api_key("reader"),
+                )
+            )
+
+    app.dependency_overrides[db_helper.session_dependency] = (
+        helper.session_dependency
+    )
+    app.dependency_overrides[db_helper.read_session_dependency] = (
+        helper.read_session_dependency
+    )
+    principal_cache.clear()
+    following_ids_cache.clear()
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            yield client, helper
+    finally:
+        app.dependency_overrides.clear()
+        principal_cache.clear()
+        following_ids_cache.clear()
+        await helper.dispose()
+
+
 @pytest.fixture(scope="session", autouse=True)
 async def create_mock_data(global_db_session):
     """Добавление тестовых данных в таблицы базы данных
@@ -102,7 +181,12 @@ async def create_mock_data(global_db_session):
         name = user_correct["name"]
         api_key = user_correct["api_key"]
 
-        user = Users(id=idx, name=name, api_key=hash_api_key(api_key))
+        user = Users(
+            id=idx,
+            name=name,
+            api_key=hash_api_key(api_key),
+            api_key_digest=digest_api_key(api_key),
+        )
         global_db_session.add(user)
 
     await global_db_session.execute(insert(Tweets), tweets_correct)
@@ -1,9 +1,12 @@
 import pytest
 from fastapi import HTTPException
-from sqlalchemy import Result, select
+from sqlalchemy import Result, event, select
 
 from server.api.crud import crud_likes
-from server.core.models import Likes, Users
+from server.core.models import Likes, Tweets, Users
+from server.core.schemas.schemas_likes import LikeAction
+from server.utils.like_buffer import LikeBuffer
+from tests.conftest import _db_helper
 from tests.data.data_db_mock import users_correct
 
 
@@ -29,6 +32,10 @@ async def test_create_like_success(db_session):
     assert like.tweet_id == tweet_id
     assert like.user_id == user_data.id
 
+    tweet: Tweets | None = await db_session.get(Tweets, tweet_id)
+    assert tweet is not None
+    assert tweet.like_count == 1
+
 
 @pytest.mark.asyncio
 async def test_create_like_not_found_tweet_error(db_session):
@@ -73,3 +80,110 @@ async def test_delete_like_success(db_session):
     like: Likes | None = db_response.scalar_one_or_none()
 
     assert like is None
+
+    tweet: Tweets | None = await db_session.get(Tweets, tweet_id)
+    assert tweet is not None
+    assert tweet.like_count == 0
+
+
+@pytest.mark.asyncio
+async def test_create_delete_like_idempotent_success(db_session):
+    """Тест повторного лайка и повторного удаления лайка:
+    ошибки не возникает, счётчик лайков меняется один раз
+    """
+
+    tweet_id = 2
+    user_data = Users(**users_correct[0])
+
+    for _ in range(2):
+        await crud_likes.create_like(
+            session=db_session, tweet_id=tweet_id, current_user=user_data
+        )
+    tweet: Tweets | None = await db_session.get(Tweets, tweet_id)
+    assert tweet is not None
+    assert tweet.like_count == 1
+
+    for _ in range(2):
+        await crud_likes.delete_like(
+            session=db_session, tweet_id=tweet_id, current_user=user_data
+        )
+    await db_session.refresh(tweet)
+    assert tweet.like_count == 0
+
+
+@pytest.mark.asyncio
+async def test_apply_like_actions_success(db_session):
+    """Тест применения пакета лайков: для каждого твита применяется
+    последнее действие, пакет выполняется фиксированным числом запросов
+    """
+
+    user_data = Users(**users_correct[1])
+    fake_tweet_id = 123456789
+    actions = [
+        LikeAction(tweet_id=1, action="unlike"),
+        LikeAction(tweet_id=2, action="like"),
+        LikeAction(tweet_id=fake_tweet_id, action="like"),
+        LikeAction(tweet_id=1, action="like"),
+        LikeAction(tweet_id=2, action="unlike"),
+    ]
+    statements: list[str] = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = _db_helper.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        results = await crud_likes.apply_like_actions(
+            session=db_session, current_user=user_data, actions=actions
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+    assert results == [
+        {"tweet_id": 1, "action": "like", "status": "applied"},
+        {"tweet_id": 2, "action": "unlike", "status": "unchanged"},
+        {"tweet_id": fake_tweet_id, "action": "like", "status": "not_found"},
+    ]
+    assert len([s for s in statements if not s.startswith("BEGIN")]) <= 4
+
+    stmt = select(Likes.tweet_id).where(Likes.user_id == user_data.id)
+    assert (await db_session.scalars(stmt)).all() == [1]
+
+    await crud_likes.apply_like_actions(
+        session=db_session,
+        current_user=user_data,
+        actions=[LikeAction(tweet_id=1, action="unlike")],
+    )
+    assert (await db_session.scalars(stmt)).all() == []
+
+
+@pytest.mark.asyncio
+async def test_like_buffer_flush_success(db_session, tmp_path):
+    """Тест записи буфера лайков в бд: события разных пользователей
+    записываются пачками, события к несуществующим твитам
+    отбрасываются, журнал после записи пуст
+    """
+
+    fake_tweet_id = 123456789
+    buffer = LikeBuffer(journal_path=tmp_path / "likes.journal", max_events=2)
+    await buffer.add(tweet_id=1, user_id=2, action="like")
+    await buffer.add(tweet_id=2, user_id=1, action="like")
+    await buffer.add(tweet_id=fake_tweet_id, user_id=1, action="like")
+    await buffer.add(tweet_id=1, user_id=1, action="unlike")
+
+    assert await buffer.flush(session_factory=_db_helper.session_factory) == 4
+    assert len(buffer) == 0
+    assert buffer.journal_path.read_bytes() == b""
+
+    stmt = select(Likes.tweet_id, Likes.user_id).order_by(Likes.tweet_id)
+    assert (await db_session.execute(stmt)).all() == [(1, 2), (2, 1)]
+    like_counts = select(Tweets.like_count).order_by(Tweets.tweet_id)
+    assert (await db_session.scalars(like_counts)).all() == [1, 1]
+
+    await buffer.add(tweet_id=1, user_id=2, action="unlike")
+    await buffer.add(tweet_id=2, user_id=1, action="unlike")
+    await buffer.flush(session_factory=_db_helper.session_factory)
+
+    assert (await db_session.execute(stmt)).all() == []
+    assert (await db_session.scalars(like_counts)).all() == [0, 0]
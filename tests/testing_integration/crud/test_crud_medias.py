@@ -1,12 +1,14 @@
+from datetime import UTC, datetime
+from io import BytesIO
 from pathlib import Path
 
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, UploadFile
+from prometheus_client import REGISTRY
 from sqlalchemy import Result, select
 
 from server.api.crud import crud_medias
-from server.core.models import Medias, Tweets
-from server.utils.media_writer import delete_media
+from server.core.models import Medias, PendingDeletions, Tweets
 
 
 @pytest.mark.asyncio
@@ -22,8 +24,7 @@ async def test_create_media_success(db_session, sample_media_jpg):
     assert isinstance(new_media, Medias)
     assert media_path.exists()
 
-    await delete_media(file_path=Path(new_media.media_path))
-    assert not media_path.exists()
+    media_path.unlink(missing_ok=True)
 
 
 @pytest.mark.asyncio
@@ -62,3 +63,140 @@ async def test_update_media_success(db_session):
     )
 
     assert media.tweet_id == tweet.tweet_id
+
+
+@pytest.mark.asyncio
+async def test_sweep_pending_deletions_success(db_session):
+    """Тест удаления медиа-файла из очереди только после удаления
+    последней ссылающейся на него записи
+    """
+
+    medias: list[Medias] = [
+        await crud_medias.create_media(
+            session=db_session,
+            file=UploadFile(filename="shared.jpg", file=BytesIO(b"shared")),
+        )
+        for _ in range(2)
+    ]
+    media_path = Path(medias[0].media_path)
+
+    assert medias[0].media_path == medias[1].media_path
+
+    for media in medias:
+        await db_session.delete(media)
+        await crud_medias.enqueue_media_deletions(
+            session=db_session, media_paths=[str(media_path)]
+        )
+        await db_session.commit()
+
+        assert media_path.exists()
+        swept: int = await crud_medias.sweep_pending_deletions(
+            session=db_session, batch_size=100
+        )
+        assert swept >= 1
+
+    assert not media_path.exists()
+    pending = await db_session.scalars(select(PendingDeletions))
+    assert pending.all() == []
+
+
+@pytest.mark.asyncio
+async def test_reclaim_orphan_medias_success(db_session):
+    """Тест удаления медиа, не привязанного к твиту дольше
+    допустимого времени: запись удаляется, файл ставится в очередь
+    """
+
+    media: Medias = await crud_medias.create_media(
+        session=db_session,
+        file=UploadFile(filename="orphan.jpg", file=BytesIO(b"orphan")),
+    )
+    media_id: int = media.media_id
+    media_path: str = media.media_path
+    media.created_at = datetime(2000, 1, 1, tzinfo=UTC)
+    await db_session.commit()
+
+    reclaimed: int = await crud_medias.reclaim_orphan_medias(
+        session=db_session, grace_period=24 * 60 * 60, batch_size=100
+    )
+    pending = await db_session.scalars(
+        select(PendingDeletions.media_path).where(
+            PendingDeletions.media_path == media_path
+        )
+    )
+
+    assert reclaimed == 1
+    assert await db_session.get(Medias, media_id) is None
+    assert pending.all() == [media_path]
+
+    bytes_before = REGISTRY.get_sample_value("media_bytes_reclaimed_total")
+    await crud_medias.sweep_pending_deletions(
+        session=db_session, batch_size=100
+    )
+    bytes_after = REGISTRY.get_sample_value("media_bytes_reclaimed_total")
+
+    assert not Path(media_path).exists()
+    assert bytes_after - bytes_before == len(b"orphan")
+
+
+@pytest.mark.asyncio
+async def test_reclaim_orphan_medias_grace_period_success(db_session):
+    """Тест брошенного медиа, загруженного только что: время загрузки
+    (server_default) и граница grace_period в UTC, поэтому медиа
+    в пределах grace_period не удаляется
+    """
+
+    media: Medias = await crud_medias.create_media(
+        session=db_session,
+        file=UploadFile(filename="fresh.jpg", file=BytesIO(b"fresh orphan")),
+    )
+    media_path = Path(media.media_path)
+
+    reclaimed: int = await crud_medias.reclaim_orphan_medias(
+        session=db_session, grace_period=60 * 60, batch_size=100
+    )
+
+    assert reclaimed == 0
+    assert await db_session.get(Medias, media.media_id) is not None
+
+    await db_session.delete(media)
+    await db_session.commit()
+    media_path.unlink(missing_ok=True)
+
+
+@pytest.mark.asyncio
+async def test_create_media_cancels_pending_deletion_success(db_session):
+    """Тест повторной загрузки файла, стоящего в очереди на удаление:
+    загрузка убирает путь из очереди, и файл остаётся на диске
+    """
+
+    media: Medias = await crud_medias.create_media(
+        session=db_session,
+        file=UploadFile(filename="reupload.jpg", file=BytesIO(b"reupload")),
+    )
+    media_path: str = media.media_path
+    await db_session.delete(media)
+    await crud_medias.enqueue_media_deletions(
+        session=db_session, media_paths=[media_path]
+    )
+    await db_session.commit()
+
+    new_media: Medias = await crud_medias.create_media(
+        session=db_session,
+        file=UploadFile(filename="reupload.jpg", file=BytesIO(b"reupload")),
+    )
+    await crud_medias.sweep_pending_deletions(
+        session=db_session, batch_size=100
+    )
+    pending = await db_session.scalars(
+        select(PendingDeletions).where(
+            PendingDeletions.media_path == media_path
+        )
+    )
+
+    assert new_media.media_path == media_path
+    assert pending.all() == []
+    assert Path(media_path).exists()
+
+    await db_session.delete(new_media)
+    await db_session.commit()
+    Path(media_path).unlink(missing_ok=True)
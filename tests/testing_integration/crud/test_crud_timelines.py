@@ -0,0 +1,382 @@
+import pytest
+from sqlalchemy import select, update
+
+from server.api.crud import crud_timelines, crud_tweets, crud_users
+from server.core.config import settings
+from server.core.dependencies.principal import Principal
+from server.core.models import Timelines, Tweets, Users
+from server.core.schemas.schemas_tweets import TweetCreate
+from server.utils.hashed_api_key import hash_api_key
+from server.utils.timeline_store import MemoryTimelineStore
+from tests.data.data_db_for_tests import tweet_no_media_valid
+from tests.data.data_db_mock import users_correct
+
+
+@pytest.fixture(params=["db", "memory"])
+def timelines_on(request, monkeypatch):
+    """Включение материализованных лент с указанным хранилищем
+
+    Лента в памяти очищается до и после теста: загруженные
+    ленты обновляются при записи и в других тестах.
+    """
+
+    monkeypatch.setattr(settings.timeline, "timeline_enabled", True)
+    monkeypatch.setattr(settings.timeline, "timeline_store", request.param)
+
+    store = crud_timelines.get_timeline_store()
+    if isinstance(store, MemoryTimelineStore):
+        store.clear()
+
+    yield request.param
+
+    if isinstance(store, MemoryTimelineStore):
+        store.clear()
+
+
+async def get_feed_ids(session, user: Principal) -> list[int]:
+    tweets = await crud_tweets.get_tweets(
+        session=session, current_user=user, offset=0, limit=50
+    )
+    return [tweet.tweet_id for tweet in tweets if tweet]
+
+
+@pytest.mark.asyncio
+async def test_timeline_follow_unfollow_delete_success(
+    db_session, timelines_on
+):
+    """Тест ведения ленты: рассылка твита подписчикам,
+    удаление при отписке, заполнение при подписке
+    и удаление вместе с твитом
+    """
+
+    user_1 = Principal(
+        id=users_correct[0]["id"], name=users_correct[0]["name"]
+    )
+    user_2 = Principal(
+        id=users_correct[1]["id"], name=users_correct[1]["name"]
+    )
+
+    await crud_users.create_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    feed_before: list[int] = await get_feed_ids(db_session, user_1)
+    new_tweet = await crud_tweets.create_tweet(
+        session=db_session,
+        user=user_2,
+        tweet_in=TweetCreate(**tweet_no_media_valid),
+    )
+    tweet_id: int = new_tweet.tweet_id
+
+    assert tweet_id not in feed_before
+    assert tweet_id in await get_feed_ids(db_session, user_1)
+    assert tweet_id in await get_feed_ids(db_session, user_2)
+
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    assert tweet_id not in await get_feed_ids(db_session, user_1)
+
+    await crud_users.create_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    assert tweet_id in await get_feed_ids(db_session, user_1)
+
+    await crud_tweets.delete_tweet(
+        session=db_session, tweet_id=tweet_id, current_user=user_2
+    )
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+
+    assert tweet_id not in await get_feed_ids(db_session, user_2)
+    stored = await db_session.scalars(
+        select(Timelines).where(Timelines.tweet_id == tweet_id)
+    )
+    assert stored.all() == []
+
+
+@pytest.mark.asyncio
+async def test_timeline_maintained_while_disabled_success(
+    db_session, timelines_on, monkeypatch
+):
+    """Тест ведения лент при выключенных лентах: твиты, подписки
+    и отписки, сделанные до включения, видны в ленте после включения
+    """
+
+    user_1 = Principal(
+        id=users_correct[0]["id"], name=users_correct[0]["name"]
+    )
+    user_2 = Principal(
+        id=users_correct[1]["id"], name=users_correct[1]["name"]
+    )
+    old_tweet = await crud_tweets.create_tweet(
+        session=db_session,
+        user=user_2,
+        tweet_in=TweetCreate(**tweet_no_media_valid),
+    )
+
+    monkeypatch.setattr(settings.timeline, "timeline_enabled", False)
+    await crud_users.create_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    new_tweet = await crud_tweets.create_tweet(
+        session=db_session,
+        user=user_2,
+        tweet_in=TweetCreate(**tweet_no_media_valid),
+    )
+    tweet_ids: list[int] = [old_tweet.tweet_id, new_tweet.tweet_id]
+
+    monkeypatch.setattr(settings.timeline, "timeline_enabled", True)
+    feed: list[int] = await get_feed_ids(db_session, user_1)
+    for tweet_id in tweet_ids:
+        assert feed.count(tweet_id) == 1
+
+    monkeypatch.setattr(settings.timeline, "timeline_enabled", False)
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+
+    monkeypatch.setattr(settings.timeline, "timeline_enabled", True)
+    feed = await get_feed_ids(db_session, user_1)
+    for tweet_id in tweet_ids:
+        assert tweet_id not in feed
+
+    for tweet_id in tweet_ids:
+        await crud_tweets.delete_tweet(
+            session=db_session, tweet_id=tweet_id, current_user=user_2
+        )
+
+
+@pytest.mark.asyncio
+async def test_timeline_popular_author_fanout_on_read_success(
+    db_session, timelines_on, monkeypatch
+):
+    """Тест гибридной ленты: твит автора с большим количеством
+    подписчиков не рассылается при записи, а добавляется
+    в ленту подписчика при чтении
+    """
+
+    monkeypatch.setattr(settings.timeline, "timeline_fanout_max_followers", 0)
+    user_1 = Principal(
+        id=users_correct[0]["id"], name=users_correct[0]["name"]
+    )
+    user_2 = Principal(
+        id=users_correct[1]["id"], name=users_correct[1]["name"]
+    )
+
+    await crud_users.create_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    new_tweet = await crud_tweets.create_tweet(
+        session=db_session,
+        user=user_2,
+        tweet_in=TweetCreate(**tweet_no_media_valid),
+    )
+    tweet_id: int = new_tweet.tweet_id
+
+    stored = await db_session.scalars(
+        select(Timelines.owner_id).where(Timelines.tweet_id == tweet_id)
+    )
+    if timelines_on == "db":
+        assert stored.all() == [user_2.id]
+    assert tweet_id in await get_feed_ids(db_session, user_1)
+
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    assert tweet_id not in await get_feed_ids(db_session, user_1)
+
+    await crud_tweets.delete_tweet(
+        session=db_session, tweet_id=tweet_id, current_user=user_2
+    )
+
+
+@pytest.mark.asyncio
+async def test_timeline_fanout_threshold_crossing_success(
+    db_session, timelines_on, monkeypatch
+):
+    """Тест смены порога рассылки: твиты, опубликованные до и после
+    изменения количества подписчиков, остаются в ленте подписчика
+    ровно по одному разу
+    """
+
+    user_1 = Principal(
+        id=users_correct[0]["id"], name=users_correct[0]["name"]
+    )
+    user_2 = Principal(
+        id=users_correct[1]["id"], name=users_correct[1]["name"]
+    )
+    await crud_users.create_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+
+    tweet_ids: list[int] = []
+    for max_followers in (0, 10, 0):
+        monkeypatch.setattr(
+            settings.timeline, "timeline_fanout_max_followers", max_followers
+        )
+        new_tweet = await crud_tweets.create_tweet(
+            session=db_session,
+            user=user_2,
+            tweet_in=TweetCreate(**tweet_no_media_valid),
+        )
+        tweet_ids.append(new_tweet.tweet_id)
+
+        feed: list[int] = await get_feed_ids(db_session, user_1)
+        for tweet_id in tweet_ids:
+            assert feed.count(tweet_id) == 1
+
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    for tweet_id in tweet_ids:
+        await crud_tweets.delete_tweet(
+            session=db_session, tweet_id=tweet_id, current_user=user_2
+        )
+
+
+@pytest.mark.asyncio
+async def test_timeline_filter_pull_authors_success(
+    db_session, timelines_on, monkeypatch
+):
+    """Тест условия выборки ленты: пока твиты автора разосланы,
+    лента читается только по материализованной ленте, а IN-список
+    появляется только для автора с неразосланными твитами
+    """
+
+    user_1 = Principal(
+        id=users_correct[0]["id"], name=users_correct[0]["name"]
+    )
+    author = Users(name="Fanned Author", api_key=hash_api_key("fanned"))
+    db_session.add(author)
+    await db_session.commit()
+    author_principal = Principal(id=author.id, name=author.name)
+    await crud_users.create_follow(
+        session=db_session, current_user=user_1, user_id=author.id
+    )
+
+    fanned_tweet = await crud_tweets.create_tweet(
+        session=db_session,
+        user=author_principal,
+        tweet_in=TweetCreate(**tweet_no_media_valid),
+    )
+    fanned_filter = await crud_timelines.timeline_filter(
+        session=db_session, owner_id=user_1.id, following_ids=[author.id]
+    )
+
+    monkeypatch.setattr(settings.timeline, "timeline_fanout_max_followers", 0)
+    pulled_tweet = await crud_tweets.create_tweet(
+        session=db_session,
+        user=author_principal,
+        tweet_in=TweetCreate(**tweet_no_media_valid),
+    )
+    tweet_ids: list[int] = [fanned_tweet.tweet_id, pulled_tweet.tweet_id]
+    pulled_filter = await crud_timelines.timeline_filter(
+        session=db_session, owner_id=user_1.id, following_ids=[author.id]
+    )
+    feed: list[int] = await get_feed_ids(db_session, user_1)
+
+    assert fanned_tweet.fanned_out is True
+    assert pulled_tweet.fanned_out is False
+    assert "user_id" not in str(fanned_filter)
+    assert "user_id" in str(pulled_filter)
+    assert await crud_timelines.get_pull_author_ids(
+        session=db_session, following_ids=[author.id]
+    ) == [author.id]
+    for tweet_id in tweet_ids:
+        assert feed.count(tweet_id) == 1
+
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_1, user_id=author.id
+    )
+    for tweet_id in tweet_ids:
+        await crud_tweets.delete_tweet(
+            session=db_session,
+            tweet_id=tweet_id,
+            current_user=author_principal,
+        )
+    await db_session.delete(author)
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_memory_timeline_max_size_success(db_session, monkeypatch):
+    """Тест ограничения ленты в памяти: хранятся только
+    timeline_memory_max_size последних твитов
+    """
+
+    monkeypatch.setattr(settings.timeline, "timeline_memory_max_size", 2)
+    store = MemoryTimelineStore()
+    owner_id: int = users_correct[0]["id"]
+    store._timelines[owner_id] = set()
+
+    for tweet_id in (1, 2, 3):
+        await store.push(
+            session=db_session,
+            tweet=Tweets(
+                tweet_id=tweet_id, user_id=owner_id, fanned_out=False
+            ),
+        )
+
+    assert store._timelines[owner_id] == {2, 3}
+
+
+@pytest.mark.asyncio
+async def test_memory_timeline_max_size_feed_success(db_session, monkeypatch):
+    """Тест ограничения ленты в памяти при чтении: по лайкам
+    ранжируются только timeline_memory_max_size последних твитов,
+    поэтому более старый популярный твит в неё не попадает,
+    в отличие от ленты в таблице timelines
+    """
+
+    monkeypatch.setattr(settings.timeline, "timeline_enabled", True)
+    user_1 = Principal(
+        id=users_correct[0]["id"], name=users_correct[0]["name"]
+    )
+    user_2 = Principal(
+        id=users_correct[1]["id"], name=users_correct[1]["name"]
+    )
+    await crud_users.create_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    tweet_ids: list[int] = []
+    for _ in range(2):
+        new_tweet = await crud_tweets.create_tweet(
+            session=db_session,
+            user=user_2,
+            tweet_in=TweetCreate(**tweet_no_media_valid),
+        )
+        tweet_ids.append(new_tweet.tweet_id)
+    popular_id, newest_id = tweet_ids
+    await db_session.execute(
+        update(Tweets)
+        .where(Tweets.tweet_id == popular_id)
+        .values(like_count=100)
+    )
+    await db_session.commit()
+
+    feeds: dict[str, list[int]] = {}
+    for timeline_store in ("db", "memory"):
+        monkeypatch.setattr(
+            settings.timeline, "timeline_store", timeline_store
+        )
+        monkeypatch.setattr(settings.timeline, "timeline_memory_max_size", 1)
+        store = crud_timelines.get_timeline_store()
+        if isinstance(store, MemoryTimelineStore):
+            store.clear()
+        feeds[timeline_store] = await get_feed_ids(db_session, user_1)
+        if isinstance(store, MemoryTimelineStore):
+            store.clear()
+
+    assert feeds["db"][0] == popular_id
+    assert newest_id in feeds["db"]
+    assert popular_id not in feeds["memory"]
+    assert newest_id in feeds["memory"]
+
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_1, user_id=user_2.id
+    )
+    for tweet_id in tweet_ids:
+        await crud_tweets.delete_tweet(
+            session=db_session, tweet_id=tweet_id, current_user=user_2
+        )
@@ -2,7 +2,7 @@ import pytest
 from fastapi import HTTPException
 from pydantic import ValidationError
 
-from server.api.crud import crud_tweets
+from server.api.crud import crud_likes, crud_tweets
 from server.core.models import Tweets, Users
 from server.core.schemas.schemas_tweets import TweetCreate
 from tests.data.data_db_for_tests import (
@@ -88,6 +88,40 @@ async def test_get_tweets_success(db_session):
     assert isinstance(new_tweet, list)
 
 
+@pytest.mark.asyncio
+async def test_get_tweets_pagination_success(db_session):
+    """Тест постраничного получения твитов: на странице ровно
+    limit твитов независимо от количества лайков к ним
+    """
+
+    user_data = Users(**users_correct[0])
+    liked_tweet_id: int = tweets_correct[0]["tweet_id"]
+
+    for user in users_correct:
+        await crud_likes.create_like(
+            session=db_session,
+            tweet_id=liked_tweet_id,
+            current_user=Users(**user),
+        )
+
+    first_page: list[Tweets | None] = await crud_tweets.get_tweets(
+        session=db_session, current_user=user_data, offset=1, limit=1
+    )
+    second_page: list[Tweets | None] = await crud_tweets.get_tweets(
+        session=db_session, current_user=user_data, offset=2, limit=1
+    )
+    both_pages: list[Tweets | None] = await crud_tweets.get_tweets(
+        session=db_session, current_user=user_data, offset=1, limit=2
+    )
+
+    assert len(first_page) == 1
+    assert len(second_page) == 1
+    assert first_page[0].tweet_id == liked_tweet_id
+    assert len(first_page[0].likes) == len(users_correct)
+    assert second_page[0].tweet_id != liked_tweet_id
+    assert both_pages == first_page + second_page
+
+
 @pytest.mark.asyncio
 async def test_delete_tweet_success(db_session):
     """Тест успешного удаления твита"""
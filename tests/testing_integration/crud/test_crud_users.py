@@ -1,11 +1,19 @@
 import pytest
 from fastapi import HTTPException
-from sqlalchemy import Result, select
+from sqlalchemy import Result, delete, event, insert, select, update
 
 from server.api.crud import crud_users
+from server.core.config import settings
+from server.core.dependencies.principal import Principal, principal_cache
 from server.core.models import Users
 from server.core.models import followers_association_table as fat
-from server.utils.hashed_api_key import validate_api_key
+from server.core.schemas.schemas_users import FollowAction
+from server.utils.hashed_api_key import (
+    digest_api_key,
+    hash_api_key,
+    validate_api_key,
+)
+from tests.conftest import _db_helper
 from tests.data.data_db_mock import users_correct
 
 
@@ -27,6 +35,94 @@ async def test_get_user_by_api_key_success(db_session):
     )
 
 
+@pytest.mark.asyncio
+async def test_get_user_by_api_key_backfill_digest_success(
+    db_session, monkeypatch
+):
+    """Тест успешного получения пользователя по api_key,
+    у которого ещё нет дайджеста api_key (заполняется при входе);
+    без api_key_legacy_fallback такие пользователи не перебираются
+    """
+
+    api_key = "legacy"
+    legacy_user = Users(name="Legacy User", api_key=hash_api_key(api_key))
+    db_session.add(legacy_user)
+    await db_session.commit()
+
+    assert legacy_user.api_key_digest is None
+    monkeypatch.setattr(settings.auth, "api_key_legacy_fallback", False)
+    not_found: Users | None = await crud_users.find_user_by_api_key(
+        session=db_session, api_key=api_key
+    )
+    assert not_found is None
+
+    monkeypatch.setattr(settings.auth, "api_key_legacy_fallback", True)
+    user: Users | None = await crud_users.get_user_by_api_key(
+        session=db_session, api_key=api_key
+    )
+
+    assert user is not None
+    assert user.id == legacy_user.id
+    assert user.api_key_digest == digest_api_key(api_key)
+
+    await db_session.delete(user)
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_get_user_by_api_key_backfill_digest_pages_success(
+    db_session, monkeypatch
+):
+    """Тест успешного получения пользователя без дайджеста api_key,
+    который находится за пределами первой страницы перебора
+    """
+
+    legacy_users = [
+        Users(name=f"Legacy User {i}", api_key=hash_api_key(f"legacy-{i}"))
+        for i in range(3)
+    ]
+    db_session.add_all(legacy_users)
+    await db_session.commit()
+
+    monkeypatch.setattr(settings.auth, "api_key_legacy_scan_batch_size", 1)
+    user: Users | None = await crud_users.find_user_by_api_key(
+        session=db_session, api_key="legacy-2"
+    )
+    not_found: Users | None = await crud_users.find_user_by_api_key(
+        session=db_session, api_key="legacy-3"
+    )
+
+    assert user is not None
+    assert user.id == legacy_users[2].id
+    assert user.api_key_digest == digest_api_key("legacy-2")
+    assert not_found is None
+
+    for legacy_user in legacy_users:
+        await db_session.delete(legacy_user)
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_principal_cache_core_update_invalidation_success(db_session):
+    """Тест сброса кэша аутентифицированных пользователей
+    при запросе update() к таблице users в обход объектов ORM
+    """
+
+    user_data: dict = users_correct[1]
+    principal_cache.set(
+        "digest", Principal(id=user_data["id"], name=user_data["name"])
+    )
+
+    await db_session.execute(
+        update(Users)
+        .where(Users.id == user_data["id"])
+        .values(name=user_data["name"])
+    )
+    await db_session.commit()
+
+    assert principal_cache.get("digest") is None
+
+
 @pytest.mark.asyncio
 async def test_get_user_by_api_key_error(db_session):
     """Тест обработки ошибки при получении пользователя
@@ -151,3 +247,164 @@ async def test_delete_follow_success(db_session):
     followers: fat | None = db_response.scalar_one_or_none()
 
     assert followers is None
+
+
+@pytest.mark.asyncio
+async def test_get_following_ids_cache_invalidation_success(db_session):
+    """Тест получения id подписок: кэш сбрасывается
+    при создании и удалении подписки
+    """
+
+    user_data_1 = Users(**users_correct[0])
+    user_id_1: int = user_data_1.id
+    user_id_2: int = users_correct[1]["id"]
+
+    assert user_id_2 not in await crud_users.get_following_ids(
+        session=db_session, user_id=user_id_1
+    )
+
+    await crud_users.create_follow(
+        session=db_session, current_user=user_data_1, user_id=user_id_2
+    )
+    assert user_id_2 in await crud_users.get_following_ids(
+        session=db_session, user_id=user_id_1
+    )
+
+    await crud_users.delete_follow(
+        session=db_session, current_user=user_data_1, user_id=user_id_2
+    )
+    assert user_id_2 not in await crud_users.get_following_ids(
+        session=db_session, user_id=user_id_1
+    )
+
+
+@pytest.mark.asyncio
+async def test_apply_follow_actions_success(db_session):
+    """Тест применения пакета подписок: для каждого пользователя
+    применяется последнее действие, повторная подписка ничего не меняет,
+    пакет выполняется фиксированным числом запросов
+    """
+
+    user_data = Users(**users_correct[1])
+    user_id_1: int = users_correct[0]["id"]
+    fake_user_id = 123456789
+    actions = [
+        FollowAction(user_id=user_id_1, action="unfollow"),
+        FollowAction(user_id=fake_user_id, action="follow"),
+        FollowAction(user_id=user_id_1, action="follow"),
+    ]
+    statements: list[str] = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    engine = _db_helper.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        results = await crud_users.apply_follow_actions(
+            session=db_session, current_user=user_data, actions=actions
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+    assert results == [
+        {"user_id": user_id_1, "action": "follow", "status": "applied"},
+        {"user_id": fake_user_id, "action": "follow", "status": "not_found"},
+    ]
+    assert len([s for s in statements if not s.startswith("BEGIN")]) <= 3
+    following_ids = await crud_users.get_following_ids(
+        session=db_session, user_id=user_data.id
+    )
+    assert following_ids == (user_id_1,)
+
+    await crud_users.create_follow(
+        session=db_session, current_user=user_data, user_id=user_id_1
+    )
+    results = await crud_users.apply_follow_actions(
+        session=db_session,
+        current_user=user_data,
+        actions=[FollowAction(user_id=user_id_1, action="follow")],
+    )
+    assert results[0]["status"] == "unchanged"
+
+    results = await crud_users.apply_follow_actions(
+        session=db_session,
+        current_user=user_data,
+        actions=[FollowAction(user_id=user_id_1, action="unfollow")],
+    )
+    assert results[0]["status"] == "applied"
+    following_ids = await crud_users.get_following_ids(
+        session=db_session, user_id=user_data.id
+    )
+    assert following_ids == ()
+
+
+@pytest.mark.asyncio
+async def test_get_followers_pagination_success(db_session):
+    """Тест постраничного получения подписчиков и подписок
+    с курсором по id пользователя
+    """
+
+    user_id: int = users_correct[0]["id"]
+    followers_data: list[dict] = [
+        {
+            "id": 101 + number,
+            "name": f"Follower {number}",
+            "api_key": f"key-{number}",
+        }
+        for number in range(3)
+    ]
+    db_session.add_all([Users(**user) for user in followers_data])
+    await db_session.flush()
+    await db_session.execute(
+        insert(fat),
+        [
+            {"follower_id": user["id"], "following_id": user_id}
+            for user in followers_data
+        ],
+    )
+    await db_session.commit()
+
+    first_page = await crud_users.get_followers(
+        session=db_session, user_id=user_id, limit=2
+    )
+    second_page = await crud_users.get_followers(
+        session=db_session, user_id=user_id, limit=2, cursor=first_page[-1].id
+    )
+    following = await crud_users.get_following(
+        session=db_session, user_id=followers_data[0]["id"], limit=2
+    )
+    compact: dict = await crud_users.get_user_compact_by_id(
+        session=db_session, user_id=user_id
+    )
+
+    await db_session.execute(delete(fat).where(fat.c.following_id == user_id))
+    await db_session.execute(
+        delete(Users).where(
+            Users.id.in_([user["id"] for user in followers_data])
+        )
+    )
+    await db_session.commit()
+
+    assert [user.id for user in first_page] == [101, 102]
+    assert [user.id for user in second_page] == [103]
+    assert [user.id for user in following] == [user_id]
+    assert compact["followers_count"] == len(followers_data)
+    assert compact["following_count"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_followers_not_found_error(db_session):
+    """Тест обработки ошибки при получении подписчиков
+    несуществующего пользователя
+    """
+
+    fake_user_id = 123456789
+
+    with pytest.raises(HTTPException) as exc_info:
+        await crud_users.get_followers(
+            session=db_session, user_id=fake_user_id, limit=10
+        )
+
+    assert exc_info.value.status_code == 404
+    assert exc_info.value.detail == f"User '{fake_user_id}' not found!"
@@ -1,7 +1,9 @@
 import pytest
-from sqlalchemy import inspect
+from fastapi import Request
+from prometheus_client import REGISTRY
+from sqlalchemy import insert, inspect, select
 
-from server.core.models import Base
+from server.core.models import Base, DatabaseHelper, Users
 from tests.conftest import _db_helper
 
 
@@ -22,3 +24,97 @@ async def test_tables_created():
         table for table in expected_tables if table not in table_names
     ]
     assert not missing_tables, f"Tables not created: {missing_tables}"
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_success():
+    """Тест метрик пула соединений: выданные соединения
+    и время ожидания соединения
+    """
+
+    def sample(name: str) -> float | None:
+        return REGISTRY.get_sample_value(name, {"pool": "test"})
+
+    waits_before = sample("db_pool_wait_seconds_count") or 0
+
+    async with _db_helper.engine.connect():
+        assert sample("db_pool_checked_out") == 1
+
+    assert sample("db_pool_checked_out") == 0
+    assert sample("db_pool_size") == 5
+    assert sample("db_pool_wait_seconds_count") == waits_before + 1
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_after_dispose_success(tmp_path):
+    """Тест метрик пула после engine.dispose(): метрики читаются
+    из нового пула движка, а не из закрытого
+    """
+
+    def sample(name: str) -> float | None:
+        return REGISTRY.get_sample_value(name, {"pool": "test_dispose"})
+
+    helper = DatabaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'dispose.db'}",
+        name="test_dispose",
+    )
+    old_pool = helper.engine.pool
+    await helper.dispose()
+
+    try:
+        async with helper.engine.connect():
+            assert helper.engine.pool is not old_pool
+            assert sample("db_pool_checked_out") == 1
+    finally:
+        await helper.dispose()
+
+
+@pytest.mark.asyncio
+async def test_read_replica_routing_success(tmp_path):
+    """Тест выдачи сессий для чтения: чтение идёт из реплики,
+    а после записи клиента - из основной бд (read-your-writes)
+    """
+
+    helper = DatabaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        name="test_routing",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+        read_your_writes_window=60,
+    )
+    for engine, name in (
+        (helper.engine, "primary"),
+        (helper.replica_engines[0], "replica"),
+    ):
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(Users).values(id=1, name=name, api_key=name)
+            )
+
+    def make_request(api_key: str) -> Request:
+        return Request(
+            {"type": "http", "headers": [(b"api-key", api_key.encode())]}
+        )
+
+    async def read_name(request: Request) -> str | None:
+        sessions = helper.read_session_dependency(request)
+        session = await anext(sessions)
+        name = await session.scalar(select(Users.name))
+        await sessions.aclose()
+        return name
+
+    try:
+        assert await read_name(make_request("writer")) == "replica"
+
+        sessions = helper.session_dependency(make_request("writer"))
+        session = await anext(sessions)
+        await session.execute(
+            insert(Users).values(id=2, name="new", api_key="new")
+        )
+        await session.commit()
+        await sessions.aclose()
+
+        assert await read_name(make_request("writer")) == "primary"
+        assert await read_name(make_request("reader")) == "replica"
+    finally:
+        await helper.dispose()
@@ -0,0 +1,243 @@
+import re
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from fastapi import UploadFile
+from sqlalchemy import event, insert, text, update
+
+from server.api.crud import crud_likes, crud_medias, crud_tweets, crud_users
+from server.core.config import settings
+from server.core.dependencies.principal import Principal
+from server.core.models import (
+    Base,
+    DatabaseHelper,
+    Likes,
+    Medias,
+    PendingDeletions,
+    Timelines,
+    Tweets,
+    Users,
+    followers_association_table,
+)
+from server.core.schemas.schemas_likes import LikeAction
+from server.core.schemas.schemas_tweets import TweetCreate
+from server.core.schemas.schemas_users import FollowAction
+from server.utils import media_writer
+from server.utils.hashed_api_key import digest_api_key, hash_api_key
+
+USERS_COUNT = 2000
+FOLLOWING_PER_USER = 10
+LIKES_PER_USER = 5
+
+# Полный просмотр таблицы в плане SQLite: "SCAN likes" или "SCAN TABLE likes"
+# в старых версиях (просмотр по индексу - "SCAN likes USING COVERING INDEX")
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?\w+$")
+# Голова очереди в порядке первичного ключа с LIMIT (pending_deletions)
+# в плане тоже "SCAN <table>", но читаются только первые LIMIT строк
+QUEUE_HEAD = re.compile(r"ORDER BY (\w+)\.id\s+LIMIT")
+
+
+async def seed(helper: DatabaseHelper, medias_dir: Path) -> None:
+    """Заполнение бд: у каждого пользователя твит с медиа,
+    подписки, лайки, лента и файл в очереди на удаление;
+    статистика для планировщика (ANALYZE)
+
+    Настоящий bcrypt-хэш api_key только у первого пользователя.
+    Пути медиа указывают в medias_dir: фоновые функции удаляют
+    файлы по ним.
+    """
+
+    user_ids = range(1, USERS_COUNT + 1)
+
+    def shift(user_id: int, step: int) -> int:
+        return (user_id + step - 1) % USERS_COUNT + 1
+
+    async with helper.engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(
+            insert(Users),
+            [
+                {
+                    "id": idx,
+                    "name": f"user_{idx}",
+                    "api_key": f"key_{idx}",
+                    "api_key_digest": digest_api_key(f"key_{idx}"),
+                }
+                for idx in user_ids
+            ],
+        )
+        await conn.execute(
+            update(Users)
+            .where(Users.id == 1)
+            .values(api_key=hash_api_key("key_1"))
+        )
+        await conn.execute(
+            insert(Tweets),
+            [
+                {"tweet_id": idx, "tweet_data": "tweet", "user_id": idx}
+                for idx in user_ids
+            ],
+        )
+        await conn.execute(
+            insert(Medias),
+            [
+                {"media_path": str(medias_dir / f"{idx}.jpg"), "tweet_id": idx}
+                for idx in user_ids
+            ],
+        )
+        await conn.execute(
+            insert(followers_association_table),
+            [
+                {"follower_id": idx, "following_id": shift(idx, step)}
+                for idx in user_ids
+                for step in range(1, FOLLOWING_PER_USER + 1)
+            ],
+        )
+        await conn.execute(
+            insert(Likes),
+            [
+                {"tweet_id": shift(idx, step), "user_id": idx}
+                for idx in user_ids
+                for step in range(1, LIKES_PER_USER + 1)
+            ],
+        )
+        await conn.execute(
+            insert(Timelines),
+            [
+                {"owner_id": idx, "tweet_id": shift(idx, step)}
+                for idx in user_ids
+                for step in range(FOLLOWING_PER_USER + 1)
+            ],
+        )
+        await conn.execute(
+            insert(PendingDeletions),
+            [
+                {"media_path": str(medias_dir / f"deleted_{idx}.jpg")}
+                for idx in user_ids
+            ],
+        )
+        await conn.execute(text("ANALYZE"))
+
+
+@pytest.mark.asyncio
+async def test_crud_queries_use_indexes_success(tmp_path, monkeypatch):
+    """Тест планов запросов crud-функций на заполненной бд:
+    ни один запрос не просматривает таблицу целиком
+    """
+
+    helper = DatabaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'plans.db'}", name="plans"
+    )
+    medias_dir: Path = tmp_path / "medias"
+    monkeypatch.setattr(media_writer, "BASE_MEDIAS_DIR", medias_dir)
+    await seed(helper, medias_dir=medias_dir)
+
+    statements: list[tuple[str, tuple]] = []
+
+    def collect(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and not statement.startswith("BEGIN"):
+            statements.append((statement, parameters))
+
+    user = Users(id=1, name="user_1")
+    event.listen(helper.engine.sync_engine, "before_cursor_execute", collect)
+    try:
+        async with helper.session_factory() as session:
+            await crud_users.get_user_by_api_key(
+                session=session, api_key="key_1"
+            )
+            await crud_users.find_user_by_api_key(
+                session=session, api_key="unknown"
+            )
+            await crud_users.get_user_by_id(session=session, user_id=1)
+            await crud_users.get_user_compact_by_id(session=session, user_id=1)
+            await crud_users.get_followers(session=session, user_id=1, limit=5)
+            await crud_users.get_following(session=session, user_id=1, limit=5)
+            await crud_users.create_follow(
+                session=session, current_user=user, user_id=100
+            )
+            await crud_users.delete_follow(
+                session=session, current_user=user, user_id=100
+            )
+            await crud_users.apply_follow_actions(
+                session=session,
+                current_user=user,
+                actions=[FollowAction(user_id=100, action="follow")],
+            )
+
+            await crud_tweets.get_tweets(
+                session=session, current_user=user, offset=0, limit=10
+            )
+            await crud_tweets.get_tweets(
+                session=session,
+                current_user=user,
+                offset=0,
+                limit=10,
+                cursor=(0, 5),
+            )
+            monkeypatch.setattr(settings.timeline, "timeline_enabled", True)
+            await crud_tweets.get_tweets(
+                session=session, current_user=user, offset=0, limit=10
+            )
+            media: Medias = await crud_medias.create_media(
+                session=session,
+                file=UploadFile(filename="plan.jpg", file=BytesIO(b"plan")),
+            )
+            await crud_tweets.create_tweet(
+                session=session,
+                user=Principal(id=1, name="user_1"),
+                tweet_in=TweetCreate(
+                    tweet_data="tweet", tweet_media_ids=[media.media_id]
+                ),
+            )
+            monkeypatch.setattr(settings.timeline, "timeline_enabled", False)
+
+            await crud_likes.create_like(
+                session=session, tweet_id=100, current_user=user
+            )
+            await crud_likes.delete_like(
+                session=session, tweet_id=100, current_user=user
+            )
+            await crud_likes.apply_like_actions(
+                session=session,
+                current_user=user,
+                actions=[LikeAction(tweet_id=100, action="like")],
+            )
+            await crud_likes.apply_like_events(
+                session=session,
+                events={(100, 2): "like", (100, 1): "unlike"},
+            )
+
+            await crud_tweets.delete_tweet(
+                session=session, tweet_id=1, current_user=user
+            )
+            await crud_medias.reclaim_orphan_medias(
+                session=session, grace_period=0, batch_size=10
+            )
+            await crud_medias.sweep_pending_deletions(
+                session=session, batch_size=10
+            )
+    finally:
+        event.remove(
+            helper.engine.sync_engine, "before_cursor_execute", collect
+        )
+
+    full_scans: list[str] = []
+    try:
+        async with helper.engine.connect() as conn:
+            for statement, parameters in statements:
+                if QUEUE_HEAD.search(statement):
+                    continue
+                plan = await conn.exec_driver_sql(
+                    f"EXPLAIN QUERY PLAN {statement}", parameters
+                )
+                full_scans.extend(
+                    f"{row.detail}: {statement}"
+                    for row in plan
+                    if FULL_SCAN.fullmatch(row.detail)
+                )
+    finally:
+        await helper.dispose()
+
+    assert statements
+    assert not full_scans
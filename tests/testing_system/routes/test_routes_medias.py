@@ -1,5 +1,10 @@
+from pathlib import Path
+
 import pytest
+from sqlalchemy import select
 
+from server.core.models import Medias
+from server.utils.media_variants import get_variant_paths
 from tests.data.data_db_mock import MEDIA_PATH, users_correct
 
 
@@ -7,6 +12,9 @@ from tests.data.data_db_mock import MEDIA_PATH, users_correct
 async def test_create_media_success(client, sample_media_jpg, db_session):
     """Тест успешного запроса к API
     POST /api/medias
+
+    После ответа фоновая задача создаёт копии изображения
+    в собственной сессии и сохраняет их пути в Medias.variants
     """
 
     user_api_key = users_correct[0]["api_key"]
@@ -21,3 +29,15 @@ async def test_create_media_success(client, sample_media_jpg, db_session):
 
     assert response.status_code == 201
     assert data["result"] is True
+
+    stmt = select(Medias.media_path, Medias.variants).where(
+        Medias.media_id == data["media_id"]
+    )
+    media_path, variants = (await db_session.execute(stmt)).one()
+    variant_paths: list[Path] = get_variant_paths(Path(media_path))
+
+    for variant_path in variant_paths:
+        variant_path.unlink()
+
+    assert variants is not None
+    assert sorted(Path(path) for path in variants.values()) == variant_paths
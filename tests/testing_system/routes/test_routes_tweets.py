@@ -1,9 +1,14 @@
 import json
 
 import pytest
+from prometheus_client import REGISTRY
 from sqlalchemy import Result, select
 
+from server.api.crud import crud_feed_cache
+from server.core.config import settings
 from server.core.models import Likes, Tweets
+from server.utils.like_buffer import like_buffer
+from tests.conftest import _db_helper, query_budget
 from tests.data.data_db_for_tests import (
     tweet_media_valid,
     tweet_no_data_invalid,
@@ -84,6 +89,278 @@ async def test_get_tweets_success(client):
     assert data["result"] is True
 
 
+@pytest.mark.asyncio
+async def test_get_tweets_query_budget_success(client, monkeypatch):
+    """Тест бюджета SQL-запросов GET /api/tweets: количество запросов
+    не зависит от количества лайков и медиа на странице (нет N+1),
+    значения записываются в гистограммы db_request_*
+    """
+
+    monkeypatch.setattr(settings.feed_cache, "feed_cache_enabled", False)
+    labels = {"method": "GET", "handler": "/api/tweets"}
+    observed_before = (
+        REGISTRY.get_sample_value("db_request_queries_count", labels) or 0
+    )
+    likes = {"actions": [{"tweet_id": 1, "action": "like"}]}
+    likes["actions"].append({"tweet_id": 2, "action": "like"})
+
+    for user in users_correct:
+        await client.post(
+            "/api/tweets/likes/batch",
+            json=likes,
+            headers={"api-key": user["api_key"]},
+        )
+    try:
+        with query_budget(max_queries=6) as stats:
+            response = await client.get(
+                "/api/tweets", headers={"api-key": users_correct[0]["api_key"]}
+            )
+    finally:
+        for like_action in likes["actions"]:
+            like_action["action"] = "unlike"
+        for user in users_correct:
+            await client.post(
+                "/api/tweets/likes/batch",
+                json=likes,
+                headers={"api-key": user["api_key"]},
+            )
+
+    assert response.status_code == 200
+    assert stats.count > 0
+    observed = REGISTRY.get_sample_value("db_request_queries_count", labels)
+    assert observed == observed_before + 1
+    assert REGISTRY.get_sample_value("db_request_seconds_count", labels)
+
+
+@pytest.mark.asyncio
+async def test_create_delete_tweet_query_budget_success(client):
+    """Тест бюджета SQL-запросов POST /api/tweets
+    и DELETE /api/tweets/{tweet_id} без кэша аутентификации
+    """
+
+    user_api_key = users_correct[0]["api_key"]
+
+    with query_budget(max_queries=4):
+        create_response = await client.post(
+            "/api/tweets",
+            json=tweet_media_valid,
+            headers={"api-key": user_api_key},
+        )
+    tweet_id: int = create_response.json()["tweet_id"]
+
+    with query_budget(max_queries=7):
+        delete_response = await client.delete(
+            f"/api/tweets/{tweet_id}", headers={"api-key": user_api_key}
+        )
+
+    assert create_response.status_code == 201
+    assert delete_response.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_get_tweets_cursor_success(client):
+    """Тест успешного запроса к API
+    GET /api/tweets с keyset-пагинацией через курсор
+    """
+
+    user_api_key = users_correct[0]["api_key"]
+
+    first_response = await client.get(
+        "/api/tweets", params={"limit": 1}, headers={"api-key": user_api_key}
+    )
+    first_data = first_response.json()
+    next_cursor = first_data["next_cursor"]
+
+    assert first_response.status_code == 200
+    assert len(first_data["tweets"]) == 1
+    assert next_cursor
+
+    second_response = await client.get(
+        "/api/tweets",
+        params={"limit": 1, "cursor": next_cursor},
+        headers={"api-key": user_api_key},
+    )
+    second_data = second_response.json()
+
+    assert second_response.status_code == 200
+    assert len(second_data["tweets"]) == 1
+    assert second_data["tweets"][0]["id"] != first_data["tweets"][0]["id"]
+
+
+@pytest.mark.asyncio
+async def test_get_tweets_cursor_ignores_offset_success(client):
+    """Тест успешного запроса к API
+    GET /api/tweets с курсором и offset одновременно:
+    offset игнорируется, страница определяется курсором
+    """
+
+    user_api_key = users_correct[0]["api_key"]
+
+    first_response = await client.get(
+        "/api/tweets", params={"limit": 1}, headers={"api-key": user_api_key}
+    )
+    next_cursor = first_response.json()["next_cursor"]
+
+    cursor_response = await client.get(
+        "/api/tweets",
+        params={"limit": 1, "cursor": next_cursor},
+        headers={"api-key": user_api_key},
+    )
+    both_response = await client.get(
+        "/api/tweets",
+        params={"limit": 1, "cursor": next_cursor, "offset": 5},
+        headers={"api-key": user_api_key},
+    )
+
+    assert both_response.status_code == 200
+    assert both_response.json()["tweets"] == cursor_response.json()["tweets"]
+
+
+@pytest.mark.asyncio
+async def test_get_tweets_invalid_cursor_error(client):
+    """Тест обработки ошибки при запросе к API
+    GET /api/tweets с использованием повреждённого курсора
+    """
+
+    user_api_key = users_correct[0]["api_key"]
+    cursor = "invalid"
+
+    response = await client.get(
+        "/api/tweets",
+        params={"cursor": cursor},
+        headers={"api-key": user_api_key},
+    )
+    data = response.json()
+
+    assert response.status_code == 400
+    assert data["result"] is False
+    assert data["error_message"] == f"Invalid cursor '{cursor}'!"
+
+
+@pytest.mark.asyncio
+async def test_get_tweets_cache_invalidation_success(client, monkeypatch):
+    """Тест кэша страниц ленты: повторный запрос отдаётся из кэша
+    без изменений, а лайк к твиту из ленты делает страницу устаревшей
+    """
+
+    reader_api_key = users_correct[0]["api_key"]
+    liker_api_key = users_correct[1]["api_key"]
+
+    def cache_hits() -> float:
+        sample = REGISTRY.get_sample_value(
+            "cache_hits_total", {"cache": "feed_pages"}
+        )
+        return sample or 0
+
+    first_response = await client.get(
+        "/api/tweets", headers={"api-key": reader_api_key}
+    )
+    hits_before = cache_hits()
+    cached_response = await client.get(
+        "/api/tweets", headers={"api-key": reader_api_key}
+    )
+
+    assert cache_hits() == hits_before + 1
+    assert cached_response.content == first_response.content
+    assert cached_response.headers["api-key"] == reader_api_key
+
+    monkeypatch.setattr(settings.feed_cache, "feed_cache_enabled", False)
+    uncached_response = await client.get(
+        "/api/tweets", headers={"api-key": reader_api_key}
+    )
+    monkeypatch.undo()
+
+    assert uncached_response.content == first_response.content
+
+    tweet = first_response.json()["tweets"][0]
+    await client.post(
+        f"/api/tweets/{tweet['id']}/likes", headers={"api-key": liker_api_key}
+    )
+    liked_response = await client.get(
+        "/api/tweets", headers={"api-key": reader_api_key}
+    )
+    await client.delete(
+        f"/api/tweets/{tweet['id']}/likes", headers={"api-key": liker_api_key}
+    )
+
+    liked_tweet = next(
+        item
+        for item in liked_response.json()["tweets"]
+        if item["id"] == tweet["id"]
+    )
+    assert len(liked_tweet["likes"]) == len(tweet["likes"]) + 1
+
+
+@pytest.mark.asyncio
+async def test_get_tweets_not_modified_success(client):
+    """Тест условного запроса к API GET /api/tweets:
+    ответ 304 по текущему ETag и новый ETag после лайка
+    """
+
+    reader_api_key = users_correct[0]["api_key"]
+    liker_api_key = users_correct[1]["api_key"]
+
+    response = await client.get(
+        "/api/tweets", headers={"api-key": reader_api_key}
+    )
+    etag = response.headers["etag"]
+
+    not_modified_response = await client.get(
+        "/api/tweets",
+        headers={"api-key": reader_api_key, "if-none-match": etag},
+    )
+
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.content == b""
+    assert not_modified_response.headers["etag"] == etag
+
+    tweet_id = response.json()["tweets"][0]["id"]
+    await client.post(
+        f"/api/tweets/{tweet_id}/likes", headers={"api-key": liker_api_key}
+    )
+    modified_response = await client.get(
+        "/api/tweets",
+        headers={"api-key": reader_api_key, "if-none-match": etag},
+    )
+    await client.delete(
+        f"/api/tweets/{tweet_id}/likes", headers={"api-key": liker_api_key}
+    )
+
+    assert modified_response.status_code == 200
+    assert modified_response.headers["etag"] != etag
+
+
+@pytest.mark.asyncio
+async def test_get_tweets_fresh_version_primary_success(
+    replica_client, monkeypatch
+):
+    """Тест запроса к API GET /api/tweets с отстающей репликой:
+    после недавнего изменения версий страница читается из основной
+    бд, и в кэш и ETag не попадает страница с реплики
+    """
+
+    monkeypatch.setattr(settings.feed_cache, "feed_cache_enabled", True)
+    client, helper = replica_client
+    headers = {"api-key": "reader"}
+
+    replica_response = await client.get("/api/tweets", headers=headers)
+
+    async with helper.session_factory() as session:
+        session.add(Tweets(tweet_data="primary only", user_id=1000))
+        await session.commit()
+    await crud_feed_cache.invalidate_authors(1000)
+
+    fresh_response = await client.get("/api/tweets", headers=headers)
+    cached_response = await client.get("/api/tweets", headers=headers)
+
+    assert replica_response.json()["tweets"] == []
+    assert [tweet["content"] for tweet in fresh_response.json()["tweets"]] == [
+        "primary only"
+    ]
+    assert fresh_response.headers["etag"] != replica_response.headers["etag"]
+    assert cached_response.content == fresh_response.content
+
+
 @pytest.mark.asyncio
 async def test_delete_tweet_success(client, db_session):
     """Тест успешного обращения к API
@@ -235,3 +512,83 @@ async def test_delete_like_success(client, db_session):
     like: Likes | None = db_response.scalar_one_or_none()
 
     assert like is None
+
+
+@pytest.mark.asyncio
+async def test_apply_likes_batch_success(client):
+    """Тест успешного запроса к API
+    POST /api/tweets/likes/batch
+    """
+
+    user_api_key = users_correct[0]["api_key"]
+    actions = [
+        {"tweet_id": 2, "action": "like"},
+        {"tweet_id": 2, "action": "unlike"},
+    ]
+
+    response = await client.post(
+        "/api/tweets/likes/batch",
+        json={"actions": actions},
+        headers={"api-key": user_api_key},
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["result"] is True
+    assert data["results"] == [
+        {"tweet_id": 2, "action": "unlike", "status": "unchanged"}
+    ]
+
+
+@pytest.mark.asyncio
+async def test_apply_likes_batch_like_buffer_success(
+    client, db_session, tmp_path, monkeypatch
+):
+    """Тест пакета лайков при включённом буфере лайков: ожидающий
+    в буфере лайк отбрасывается и не перезаписывает удаление
+    лайка из пакета при следующей записи буфера
+    """
+
+    monkeypatch.setattr(settings.like_buffer, "like_buffer_enabled", True)
+    monkeypatch.setattr(like_buffer, "journal_path", tmp_path / "journal")
+    user_api_key = users_correct[0]["api_key"]
+    tweet_id = 2
+
+    try:
+        await client.post(
+            f"/api/tweets/{tweet_id}/likes", headers={"api-key": user_api_key}
+        )
+        response = await client.post(
+            "/api/tweets/likes/batch",
+            json={"actions": [{"tweet_id": tweet_id, "action": "unlike"}]},
+            headers={"api-key": user_api_key},
+        )
+        await like_buffer.flush(session_factory=_db_helper.session_factory)
+    finally:
+        like_buffer.close()
+
+    stmt = select(Likes).where(
+        Likes.tweet_id == tweet_id,
+        Likes.user_id == users_correct[0]["id"],
+    )
+
+    assert response.status_code == 200
+    assert len(like_buffer) == 0
+    assert (await db_session.scalars(stmt)).all() == []
+
+
+@pytest.mark.asyncio
+async def test_apply_likes_batch_empty_error(client):
+    """Тест обработки ошибки при запросе к API
+    POST /api/tweets/likes/batch с пустым пакетом
+    """
+
+    user_api_key = users_correct[0]["api_key"]
+
+    response = await client.post(
+        "/api/tweets/likes/batch",
+        json={"actions": []},
+        headers={"api-key": user_api_key},
+    )
+
+    assert response.status_code == 422
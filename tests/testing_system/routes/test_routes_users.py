@@ -1,7 +1,14 @@
 import pytest
-from sqlalchemy import Result, select
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import Result, event, insert, select
 
+from server.api.crud import crud_feed_cache
+from server.core.dependencies.principal import principal_cache
+from server.core.models import Base, DatabaseHelper, Users, db_helper
 from server.core.models import followers_association_table as fat
+from server.main import app
+from server.utils.hashed_api_key import digest_api_key, hash_api_key
+from tests.conftest import _db_helper, query_budget
 from tests.data.data_db_mock import users_correct
 
 
@@ -20,6 +27,134 @@ async def test_users_me_success(client):
     assert data["user"]["id"]
 
 
+@pytest.mark.asyncio
+async def test_users_me_single_user_select_success(client):
+    """Тест запроса к API GET /api/users/me без кэша
+    аутентификации: пользователь загружается из бд один раз,
+    эндпоинт берёт его из сессии аутентификации
+    """
+
+    statements: list[str] = []
+
+    def collect(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    principal_cache.clear()
+    engine = _db_helper.engine.sync_engine
+    event.listen(engine, "before_cursor_execute", collect)
+    try:
+        response = await client.get(
+            "/api/users/me", headers={"api-key": "test"}
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", collect)
+
+    user_selects: list[str] = [
+        statement
+        for statement in statements
+        if "FROM users" in statement
+        if "followers_association" not in statement
+    ]
+
+    assert response.status_code == 200
+    assert response.json()["user"]["id"] == users_correct[0]["id"]
+    assert len(user_selects) == 1
+
+
+@pytest.mark.asyncio
+async def test_users_me_replica_single_checkout_success(tmp_path):
+    """Тест запроса к API GET /api/users/me с репликами
+    без кэша аутентификации: аутентификация и эндпоинт работают
+    в одной сессии - из пулов выдаётся одно соединение с реплики
+
+    Используется отдельный id пользователя: версия профиля
+    не должна меняться в других тестах, иначе профиль читается
+    из основной бд.
+    """
+
+    helper = DatabaseHelper(
+        url=f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}",
+        name="test_single_checkout",
+        replica_urls=[f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}"],
+    )
+    engines = {
+        "primary": helper.engine,
+        "replica": helper.replica_engines[0],
+    }
+    for engine in engines.values():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(
+                insert(Users).values(
+                    id=1002,
+                    name="reader",
+                    api_key=hash_api_key("reader"),
+                    api_key_digest=digest_api_key("reader"),
+                )
+            )
+
+    checkouts: dict[str, int] = {name: 0 for name in engines}
+
+    def counter(name: str):
+        def count(*args) -> None:
+            checkouts[name] += 1
+
+        return count
+
+    listeners = [
+        (engine.sync_engine, counter(name)) for name, engine in engines.items()
+    ]
+    for target, listener in listeners:
+        event.listen(target, "checkout", listener)
+
+    app.dependency_overrides[db_helper.session_dependency] = (
+        helper.session_dependency
+    )
+    app.dependency_overrides[db_helper.read_session_dependency] = (
+        helper.read_session_dependency
+    )
+    principal_cache.clear()
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://test"
+        ) as client:
+            response = await client.get(
+                "/api/users/me", headers={"api-key": "reader"}
+            )
+    finally:
+        app.dependency_overrides.clear()
+        principal_cache.clear()
+        for target, listener in listeners:
+            event.remove(target, "checkout", listener)
+        await helper.dispose()
+
+    assert response.status_code == 200
+    assert response.json()["user"]["name"] == "reader"
+    assert checkouts == {"primary": 0, "replica": 1}
+
+
+@pytest.mark.asyncio
+async def test_users_query_budget_success(client):
+    """Тест бюджета SQL-запросов GET /api/users/me
+    и GET /api/users/{user_id} без кэша аутентификации
+    """
+
+    user_api_key = users_correct[0]["api_key"]
+    user_id = users_correct[1]["id"]
+
+    with query_budget(max_queries=4):
+        me_response = await client.get(
+            "/api/users/me", headers={"api-key": user_api_key}
+        )
+    with query_budget(max_queries=4):
+        user_response = await client.get(
+            f"/api/users/{user_id}", headers={"api-key": user_api_key}
+        )
+
+    assert me_response.status_code == 200
+    assert user_response.status_code == 200
+
+
 @pytest.mark.asyncio
 async def test_users_me_error(client):
     """Тест обработки ошибки при запросе к API
@@ -55,6 +190,76 @@ async def test_get_user_success(client):
     assert data["user"]["id"] == user_id
 
 
+@pytest.mark.asyncio
+async def test_get_user_not_modified_success(client):
+    """Тест условного запроса к API GET /api/users/{user_id}:
+    ответ 304 по текущему ETag и новый ETag после подписки
+    """
+
+    user_id = users_correct[0]["id"]
+    follower_api_key = users_correct[1]["api_key"]
+
+    response = await client.get(f"/api/users/{user_id}")
+    etag = response.headers["etag"]
+
+    not_modified_response = await client.get(
+        f"/api/users/{user_id}", headers={"if-none-match": etag}
+    )
+
+    assert not_modified_response.status_code == 304
+    assert not_modified_response.content == b""
+
+    await client.post(
+        f"/api/users/{user_id}/follow", headers={"api-key": follower_api_key}
+    )
+    modified_response = await client.get(
+        f"/api/users/{user_id}", headers={"if-none-match": etag}
+    )
+    await client.delete(
+        f"/api/users/{user_id}/follow", headers={"api-key": follower_api_key}
+    )
+
+    assert modified_response.status_code == 200
+    assert modified_response.headers["etag"] != etag
+    assert modified_response.json()["user"]["followers"]
+
+
+@pytest.mark.asyncio
+async def test_get_user_fresh_version_primary_success(replica_client):
+    """Тест запроса к API GET /api/users/{user_id} и GET /api/users/me
+    с отстающей репликой: после недавнего изменения версии профиля
+    он читается из основной бд, и новый ETag отдаётся вместе
+    с актуальными подписчиками
+    """
+
+    client, helper = replica_client
+    headers = {"api-key": "reader"}
+
+    replica_response = await client.get("/api/users/1000")
+
+    async with helper.session_factory() as session:
+        await session.execute(
+            insert(Users).values(
+                id=1001, name="follower", api_key=hash_api_key("follower")
+            )
+        )
+        await session.execute(
+            insert(fat).values(follower_id=1001, following_id=1000)
+        )
+        await session.commit()
+    await crud_feed_cache.invalidate_graph(1000, 1001)
+
+    user_response = await client.get("/api/users/1000")
+    me_response = await client.get("/api/users/me", headers=headers)
+
+    assert replica_response.json()["user"]["followers"] == []
+    assert user_response.headers["etag"] != replica_response.headers["etag"]
+    for response in (user_response, me_response):
+        assert [
+            follower["id"] for follower in response.json()["user"]["followers"]
+        ] == [1001]
+
+
 @pytest.mark.asyncio
 async def test_get_user_error(client):
     """Тест обработки ошибки при запросе к API
@@ -156,3 +361,116 @@ async def test_delete_follow_success(client, db_session):
     followers: fat | None = db_response.scalar_one_or_none()
 
     assert followers is None
+
+
+@pytest.mark.asyncio
+async def test_apply_follows_batch_success(client, db_session):
+    """Тест успешного запроса к API
+    POST /api/users/follow/batch
+    """
+
+    user_id_1 = users_correct[0]["id"]
+    user_api_key_1 = users_correct[0]["api_key"]
+    user_id_2 = users_correct[1]["id"]
+    fake_user_id = 123456789
+
+    response = await client.post(
+        "/api/users/follow/batch",
+        json={
+            "actions": [
+                {"user_id": user_id_2, "action": "follow"},
+                {"user_id": fake_user_id, "action": "follow"},
+            ]
+        },
+        headers={"api-key": user_api_key_1},
+    )
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["result"] is True
+    assert data["results"] == [
+        {"user_id": user_id_2, "action": "follow", "status": "applied"},
+        {"user_id": fake_user_id, "action": "follow", "status": "not_found"},
+    ]
+
+    await client.delete(
+        f"/api/users/{user_id_2}/follow", headers={"api-key": user_api_key_1}
+    )
+    stmt = select(fat).where(fat.c.follower_id == user_id_1)
+    db_response: Result = await db_session.execute(stmt)
+
+    assert db_response.first() is None
+
+
+@pytest.mark.asyncio
+async def test_get_user_compact_success(client):
+    """Тест успешного запроса к API
+    GET /api/users/{user_id}?compact=true
+    """
+
+    user_id = users_correct[0]["id"]
+
+    response = await client.get(f"/api/users/{user_id}?compact=true")
+    data = response.json()
+
+    assert response.status_code == 200
+    assert data["result"] is True
+    assert data["user"] == {
+        "id": user_id,
+        "name": users_correct[0]["name"],
+        "followers_count": 0,
+        "following_count": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_get_followers_success(client):
+    """Тест успешного запроса к API
+    GET /api/users/{user_id}/followers
+    """
+
+    user_api_key_1 = users_correct[0]["api_key"]
+    user_1 = {"id": users_correct[0]["id"], "name": users_correct[0]["name"]}
+    user_id_2 = users_correct[1]["id"]
+
+    await client.post(
+        f"/api/users/{user_id_2}/follow", headers={"api-key": user_api_key_1}
+    )
+    response = await client.get(f"/api/users/{user_id_2}/followers?limit=1")
+    next_response = await client.get(
+        f"/api/users/{user_id_2}/followers",
+        params={"limit": 1, "cursor": response.json()["next_cursor"]},
+    )
+    profile_response = await client.get(f"/api/users/{user_id_2}")
+    await client.delete(
+        f"/api/users/{user_id_2}/follow", headers={"api-key": user_api_key_1}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["users"] == [user_1]
+    assert response.json()["next_cursor"]
+    assert next_response.json() == {
+        "result": True,
+        "users": [],
+        "next_cursor": None,
+    }
+    assert profile_response.json()["user"]["followers"] == [user_1]
+    assert profile_response.json()["user"]["followers_count"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_following_invalid_cursor_error(client):
+    """Тест обработки ошибки при запросе к API
+    GET /api/users/{user_id}/following с повреждённым курсором
+    """
+
+    user_id = users_correct[0]["id"]
+
+    response = await client.get(
+        f"/api/users/{user_id}/following", params={"cursor": "!"}
+    )
+    data = response.json()
+
+    assert response.status_code == 400
+    assert data["result"] is False
+    assert data["error_message"] == "Invalid cursor '!'!"
@@ -1,12 +1,14 @@
+import orjson
 import pytest
 from pydantic import ValidationError
 
 from server.api.crud import crud_tweets, crud_users
-from server.core.models import Tweets, Users
+from server.core.models import Likes, Medias, Tweets, Users
 from server.core.schemas.schemas_tweets import (
     TweetCreate,
     TweetRead,
     TweetsRead,
+    dump_tweets_read,
 )
 from tests.data.data_db_for_tests import (
     tweet_media_valid,
@@ -108,3 +110,39 @@ async def test_tweets_read_success(db_session):
 
     assert tweets_read.tweets
     assert tweets_read.tweets[0].tweet_id == tweets[0].tweet_id
+
+
+@pytest.mark.parametrize("next_cursor", [None, "MTI6NDI"])
+def test_dump_tweets_read_matches_schema_success(next_cursor):
+    """Тест быстрой сериализации ленты: результат побайтово
+    совпадает с сериализацией по схеме TweetsRead
+    """
+
+    author = Users(id=1, name="Nick Ivanov")
+    liker = Users(id=2, name="Ivan Petrov")
+    tweets: list[Tweets] = [
+        Tweets(
+            tweet_id=1,
+            tweet_data="Tweet with media!",
+            user=author,
+            likes=[Likes(user=liker), Likes(user=author)],
+            medias=[
+                Medias(media_path="/medias/ab/cd/abcd.jpg"),
+                Medias(
+                    media_path="/medias/ef/01/ef01.png",
+                    variants={
+                        "webp": "/medias/ef/01/ef01_webp.webp",
+                        "w320": "/medias/ef/01/ef01_w320.webp",
+                    },
+                ),
+            ],
+        ),
+        Tweets(tweet_id=2, tweet_data="Привет!", user=liker),
+    ]
+
+    page = TweetsRead.model_validate(
+        {"tweets": tweets, "next_cursor": next_cursor}, from_attributes=True
+    )
+    expected: bytes = orjson.dumps(page.model_dump(mode="json", by_alias=True))
+
+    assert dump_tweets_read(tweets=tweets, next_cursor=next_cursor) == expected
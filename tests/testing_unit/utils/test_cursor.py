@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+
+from server.utils.cursor import decode_cursor, encode_cursor
+
+
+def test_encode_decode_cursor_success():
+    """Тест успешного кодирования и декодирования курсора"""
+
+    cursor: str = encode_cursor(12, 42)
+
+    assert decode_cursor(cursor=cursor, size=2) == (12, 42)
+
+
+@pytest.mark.parametrize("cursor", ["invalid", "%%%", encode_cursor(1)])
+def test_decode_cursor_invalid_error(cursor):
+    """Тест обработки ошибки при декодировании повреждённого курсора
+    или курсора с неверным количеством значений
+    """
+
+    with pytest.raises(HTTPException) as exc_info:
+        decode_cursor(cursor=cursor, size=2)
+
+    assert exc_info.value.status_code == 400
@@ -0,0 +1,22 @@
+import pytest
+
+from server.utils.etag import etag_matches, make_etag
+
+
+@pytest.mark.parametrize(
+    "if_none_match",
+    ['"abc"', 'W/"abc"', '"old", "abc"', "*"],
+)
+def test_etag_matches_success(if_none_match):
+    """Тест совпадения ETag с заголовком If-None-Match:
+    одиночный, слабый, из списка и "*"
+    """
+
+    assert etag_matches(if_none_match, make_etag("abc")) is True
+
+
+@pytest.mark.parametrize("if_none_match", [None, "", '"old"', "abc"])
+def test_etag_matches_mismatch(if_none_match):
+    """Тест несовпадения ETag с заголовком If-None-Match"""
+
+    assert etag_matches(if_none_match, make_etag("abc")) is False
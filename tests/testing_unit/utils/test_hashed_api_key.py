@@ -0,0 +1,88 @@
+import asyncio
+import threading
+
+import pytest
+from prometheus_client import REGISTRY
+
+from server.utils.hashed_api_key import (
+    digest_api_key,
+    hash_api_key_async,
+    validate_api_key,
+    validate_api_key_async,
+)
+from server.utils.worker_pool import WorkerPool
+
+
+def test_digest_api_key_success():
+    """Тест детерминированности дайджеста api_key"""
+
+    assert digest_api_key("test") == digest_api_key("test")
+    assert digest_api_key("test") != digest_api_key("dev")
+
+
+@pytest.mark.asyncio
+async def test_hash_and_validate_api_key_async_success():
+    """Тест успешного хэширования и проверки api_key в пуле воркеров"""
+
+    hashed_api_key: str = await hash_api_key_async(api_key="test")
+
+    assert validate_api_key(api_key="test", hashed_api_key=hashed_api_key)
+    assert await validate_api_key_async(
+        api_key="test", hashed_api_key=hashed_api_key
+    )
+    assert not await validate_api_key_async(
+        api_key="dev", hashed_api_key=hashed_api_key
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_concurrency_limit_success():
+    """Тест ограничения количества одновременно выполняемых задач:
+    пока пул занят, остальные задачи ждут в очереди
+    """
+
+    max_workers = 2
+    jobs_count = 5
+    pool = WorkerPool(name="test_limit", max_workers=max_workers)
+    release = threading.Event()
+    lock = threading.Lock()
+    running: list[int] = [0]
+    peak: list[int] = [0]
+
+    def job(number: int) -> int:
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+        release.wait(timeout=5)
+        with lock:
+            running[0] -= 1
+        return number**2
+
+    tasks = [
+        asyncio.create_task(pool.run(job, number))
+        for number in range(jobs_count)
+    ]
+    for _ in range(500):
+        if running[0] == max_workers:
+            break
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+
+    queue_depth = REGISTRY.get_sample_value(
+        "worker_pool_queue_depth", {"pool": "test_limit"}
+    )
+    assert running[0] == max_workers
+    assert queue_depth == jobs_count - max_workers
+
+    release.set()
+    results: list[int] = await asyncio.gather(*tasks)
+
+    assert results == [0, 1, 4, 9, 16]
+    assert peak[0] == max_workers
+    assert pool._in_flight == 0
+    queue_depth = REGISTRY.get_sample_value(
+        "worker_pool_queue_depth", {"pool": "test_limit"}
+    )
+    assert queue_depth == 0
+
+    pool.shutdown()
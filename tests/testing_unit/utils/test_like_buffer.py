@@ -0,0 +1,67 @@
+import pytest
+
+from server.utils.like_buffer import LikeBuffer
+
+
+@pytest.mark.asyncio
+async def test_like_buffer_coalesce_success(tmp_path):
+    """Тест буфера лайков: для пары (твит, пользователь) остаётся
+    последнее действие, при заполнении буфера запрашивается запись
+    """
+
+    buffer = LikeBuffer(journal_path=tmp_path / "likes.journal", max_events=2)
+    await buffer.add(tweet_id=1, user_id=1, action="like")
+    await buffer.add(tweet_id=1, user_id=1, action="unlike")
+    await buffer.add(tweet_id=1, user_id=1, action="like")
+
+    assert len(buffer) == 1
+    assert not buffer.flush_needed.is_set()
+
+    await buffer.add(tweet_id=2, user_id=1, action="unlike")
+
+    assert len(buffer) == 2
+    assert buffer.flush_needed.is_set()
+    buffer.close()
+
+
+@pytest.mark.asyncio
+async def test_like_buffer_recover_success(tmp_path):
+    """Тест восстановления буфера лайков из журнала после падения
+    процесса: недописанная строка пропускается, журнал сжимается
+    """
+
+    journal_path = tmp_path / "likes.journal"
+    buffer = LikeBuffer(journal_path=journal_path, max_events=100)
+    await buffer.add(tweet_id=1, user_id=1, action="like")
+    await buffer.add(tweet_id=2, user_id=1, action="like")
+    await buffer.add(tweet_id=1, user_id=1, action="unlike")
+    buffer.close()
+    with open(journal_path, "ab") as journal:
+        journal.write(b'[3, 1, "li')
+
+    recovered = LikeBuffer(journal_path=journal_path, max_events=100)
+
+    assert await recovered.recover() == 2
+    assert len(journal_path.read_bytes().splitlines()) == 2
+    assert await recovered.recover() == 2
+
+
+@pytest.mark.asyncio
+async def test_like_buffer_bypass_success(tmp_path):
+    """Тест прямой записи в обход буфера: ожидающие события
+    к тем же парам удаляются из буфера и из журнала
+    """
+
+    journal_path = tmp_path / "likes.journal"
+    buffer = LikeBuffer(journal_path=journal_path, max_events=100)
+    await buffer.add(tweet_id=1, user_id=1, action="like")
+    await buffer.add(tweet_id=2, user_id=1, action="like")
+
+    async with buffer.bypass([(1, 1), (3, 1)]):
+        assert len(buffer) == 1
+
+    buffer.close()
+    recovered = LikeBuffer(journal_path=journal_path, max_events=100)
+
+    assert await recovered.recover() == 1
+    assert recovered._pending == {(2, 1): "like"}
@@ -0,0 +1,104 @@
+from pathlib import Path
+
+import pytest
+from PIL import Image
+from sqlalchemy import select
+
+from server.core.models import Medias
+from server.utils.media_variants import (
+    generate_variants,
+    get_variant_paths,
+    render_variants,
+)
+from tests.conftest import _db_helper
+
+
+@pytest.fixture
+def sample_image_path(path_to_medias_dir):
+    """Создание png-изображения 1000x500 в директории
+    для временных тестовых медиа-файлов
+    """
+
+    path_to_medias_dir.mkdir(parents=True, exist_ok=True)
+    image_path: Path = path_to_medias_dir / "image.png"
+    Image.new("RGB", (1000, 500), color="red").save(image_path)
+
+    yield image_path
+
+    for variant_path in get_variant_paths(image_path):
+        variant_path.unlink()
+    image_path.unlink()
+
+
+def test_render_variants_success(sample_image_path):
+    """Тест создания WebP-копии в исходном размере и уменьшенных
+    копий (копии шире оригинала не создаются)
+    """
+
+    variants: dict[str, str] = render_variants(
+        file_path=str(sample_image_path), widths=[320, 2000], quality=80
+    )
+
+    assert set(variants) == {"webp", "w320"}
+    assert get_variant_paths(sample_image_path) == sorted(
+        Path(path) for path in variants.values()
+    )
+
+    with Image.open(variants["w320"]) as image:
+        assert image.format == "WEBP"
+        assert image.size == (320, 160)
+
+
+@pytest.mark.asyncio
+async def test_generate_variants_success(db_session, sample_image_path):
+    """Тест сохранения путей копий медиа в Medias.variants"""
+
+    media = Medias(media_path=str(sample_image_path))
+    db_session.add(media)
+    await db_session.commit()
+
+    await generate_variants(
+        session_factory=_db_helper.session_factory,
+        media_id=media.media_id,
+        media_path=media.media_path,
+        author_id=1,
+    )
+
+    stmt = select(Medias.variants).where(Medias.media_id == media.media_id)
+    variants: dict[str, str] | None = await db_session.scalar(stmt)
+
+    await db_session.delete(media)
+    await db_session.commit()
+
+    assert variants is not None
+    assert Path(variants["webp"]).exists()
+
+
+@pytest.mark.asyncio
+async def test_generate_variants_invalid_image(db_session, path_to_medias_dir):
+    """Тест обработки повреждённого изображения: копии
+    не создаются, Medias.variants остаётся пустым
+    """
+
+    path_to_medias_dir.mkdir(parents=True, exist_ok=True)
+    media_path: Path = path_to_medias_dir / "broken.jpg"
+    media_path.write_bytes(b"not an image")
+
+    media = Medias(media_path=str(media_path))
+    db_session.add(media)
+    await db_session.commit()
+
+    await generate_variants(
+        session_factory=_db_helper.session_factory,
+        media_id=media.media_id,
+        media_path=media.media_path,
+        author_id=1,
+    )
+    await db_session.refresh(media)
+
+    assert media.variants is None
+    assert get_variant_paths(media_path) == []
+
+    await db_session.delete(media)
+    await db_session.commit()
+    media_path.unlink()
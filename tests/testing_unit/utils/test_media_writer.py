@@ -1,12 +1,15 @@
+import hashlib
+from io import BytesIO
 from pathlib import Path
 
 import pytest
-from fastapi import HTTPException
+from fastapi import HTTPException, UploadFile
 
 from server.utils.media_writer import (
+    StreamedMedia,
     create_medias_directory,
-    delete_media,
     save_media,
+    stream_media,
     validate_media,
 )
 
@@ -20,20 +23,20 @@ async def test_create_medias_directory_success(path_to_medias_dir):
 
 
 @pytest.mark.asyncio
-async def test_save_and_delete_media_success(
-    sample_media_jpg, path_to_medias_dir
-):
-    """Тест успешного сохранения и удаления медиа"""
+async def test_save_media_success(sample_media_jpg, path_to_medias_dir):
+    """Тест успешного сохранения медиа"""
 
     file_path: Path | None = await save_media(
         file=sample_media_jpg, path_to_save=path_to_medias_dir
     )
+    sha256: str = hashlib.sha256(b"fake media").hexdigest()
+
     assert file_path.exists()
-    assert file_path.parent == path_to_medias_dir
+    assert file_path.parent == path_to_medias_dir / sha256[:2] / sha256[2:4]
+    assert file_path.name == f"{sha256}.jpg"
     assert file_path.suffix == ".jpg"
 
-    await delete_media(file_path=file_path)
-    assert not file_path.exists()
+    file_path.unlink(missing_ok=True)
 
 
 @pytest.mark.asyncio
@@ -48,3 +51,83 @@ async def test_validate_media_not_allowed_ext(sample_media_pdf):
         await validate_media(file_name=file_name)
 
     assert exc_info.value.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_stream_media_chunks_success(path_to_medias_dir):
+    """Тест потокового копирования медиа блоками
+    с подсчётом размера и sha256 содержимого
+    """
+
+    content = b"0123456789" * 10
+    file = UploadFile(filename="test.jpg", file=BytesIO(content))
+    await create_medias_directory(path=path_to_medias_dir)
+
+    streamed_media: StreamedMedia = await stream_media(
+        file=file, path_to_save=path_to_medias_dir, chunk_size=7
+    )
+
+    assert streamed_media.temp_path.read_bytes() == content
+    assert streamed_media.size == len(content)
+    assert streamed_media.sha256 == hashlib.sha256(content).hexdigest()
+
+    streamed_media.temp_path.unlink()
+
+
+@pytest.mark.asyncio
+async def test_stream_media_too_large_error(path_to_medias_dir):
+    """Тест обработки ошибки при копировании медиа
+    с размером больше допустимого: запись прерывается,
+    временный файл удаляется
+    """
+
+    file = UploadFile(filename="test.jpg", file=BytesIO(b"x" * 100))
+    await create_medias_directory(path=path_to_medias_dir)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await stream_media(
+            file=file, path_to_save=path_to_medias_dir, max_size=50
+        )
+
+    assert exc_info.value.status_code == 413
+    assert not list(path_to_medias_dir.glob("*.part"))
+
+
+@pytest.mark.asyncio
+async def test_stream_media_known_size_too_large_error(path_to_medias_dir):
+    """Тест отклонения медиа с заранее известным размером
+    больше допустимого без чтения содержимого
+    """
+
+    file = UploadFile(filename="test.jpg", file=BytesIO(b"x" * 100), size=100)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await stream_media(
+            file=file, path_to_save=path_to_medias_dir, max_size=50
+        )
+
+    assert exc_info.value.status_code == 413
+    assert file.file.tell() == 0
+
+
+@pytest.mark.asyncio
+async def test_save_media_deduplication_success(path_to_medias_dir):
+    """Тест повторного сохранения медиа с тем же содержимым:
+    возвращается путь до уже сохранённого файла
+    """
+
+    content = b"same media"
+    first_path: Path | None = await save_media(
+        file=UploadFile(filename="first.jpg", file=BytesIO(content)),
+        path_to_save=path_to_medias_dir,
+    )
+    second_path: Path | None = await save_media(
+        file=UploadFile(filename="second.JPG", file=BytesIO(content)),
+        path_to_save=path_to_medias_dir,
+    )
+
+    assert first_path == second_path
+    assert first_path.read_bytes() == content
+    assert not list(path_to_medias_dir.glob("*.part"))
+
+    first_path.unlink(missing_ok=True)
@@ -0,0 +1,56 @@
+import time
+
+from server.utils.ttl_cache import TTLCache
+
+
+def test_ttl_cache_get_set_success():
+    """Тест успешного сохранения и получения значения из кэша"""
+
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+
+
+def test_ttl_cache_lru_eviction_success():
+    """Тест вытеснения давно не использованной записи
+    при переполнении кэша
+    """
+
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert len(cache) == 2
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expired_success():
+    """Тест получения записи с истёкшим временем жизни"""
+
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=2, ttl=0.01)
+    cache.set("a", 1)
+    time.sleep(0.02)
+
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_delete_where_success():
+    """Тест удаления записей кэша по условию"""
+
+    cache: TTLCache[str, int] = TTLCache(name="test", maxsize=10, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.set("c", 1)
+
+    cache.delete_where(lambda _, value: value == 1)
+
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.get("c") is None